@@ -0,0 +1,365 @@
+"""
+ETag-validated local content cache shared by the research_datastream tools.
+
+Objects are stored under <root>/objects/ and tracked in <root>/index.json,
+keyed by "bucket/key" with the ETag they were fetched at. A cached copy is
+only served when its ETag still matches the object in S3, either because the
+caller already knows the current ETag (from a listing) or because a
+conditional request (If-None-Match) came back 304. Total size is bounded;
+the least recently used entries are evicted first.
+
+Several tools may share one cache directory: save() merges with the index on
+disk under a file lock instead of overwriting it, and files in objects/ that
+no index entry references (left by a crash, an unsaved run or an older index
+version) are removed when the cache is opened.
+
+Usage:
+    cache = ContentCache("local_cache", max_bytes=512 * 1024**2)
+    body = cache.get_s3(s3_client, bucket, key, etag=listing_etag)
+    status, body = cache.get_url(requests_session, url)
+    cache.save()
+    print(cache.report())
+"""
+
+import collections
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+DEFAULT_CACHE_DIR = "local_cache"
+DEFAULT_MAX_MB = 512
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 2
+LOCK_NAME = "index.lock"
+# Unreferenced files younger than this may belong to a run that has not saved yet
+ORPHAN_GRACE_S = 3600
+
+
+class ContentCache:
+    """
+    Size-bounded LRU cache of object bodies validated by ETag.
+
+    Entries validated during this process are trusted for the rest of it, so
+    a tool that reads the same file twice only revalidates it once per run.
+    Thread-safe; the index is written by save().
+    """
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, INDEX_NAME)
+        self.lock_path = os.path.join(root, LOCK_NAME)
+        self.lock = threading.Lock()
+        # "bucket/key" -> {"etag", "file", "size", "atime"}, least recently used first
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.validated = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_fetched = 0
+        self.orphans_removed = 0
+        self._dirty = False
+        os.makedirs(self.objects_dir, exist_ok=True)
+        with self._index_lock():
+            self._load()
+            self._remove_orphans()
+
+    def _index_lock(self):
+        """Exclusive lock on the index, held while it is read-merged-written."""
+        lock_file = open(self.lock_path, 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file  # closing it releases the lock
+
+    def _read_index(self) -> dict:
+        """Entries of the index on disk whose files exist, or {}."""
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if index.get("version") != INDEX_VERSION:
+            return {}
+        return {name: entry for name, entry in index.get("entries", {}).items()
+                if os.path.exists(os.path.join(self.objects_dir, entry["file"]))}
+
+    def _load(self):
+        for name, entry in sorted(self._read_index().items(), key=lambda item: item[1].get("atime", 0)):
+            self.entries[name] = entry
+            self.total_bytes += entry["size"]
+
+    def _remove_orphans(self):
+        """Deletes object files no index entry references (after a grace period)."""
+        referenced = {entry["file"] for entry in self.entries.values()}
+        cutoff = time.time() - ORPHAN_GRACE_S
+        for file_name in os.listdir(self.objects_dir):
+            if file_name in referenced:
+                continue
+            path = os.path.join(self.objects_dir, file_name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    self.orphans_removed += 1
+            except OSError:
+                pass
+
+    @staticmethod
+    def _name(bucket: str, key: str) -> str:
+        return f"{bucket}/{key}"
+
+    def _read(self, name: str, etag: Optional[str]) -> Optional[bytes]:
+        """Returns the cached body if present and (when etag is given) current."""
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None or (etag is not None and entry["etag"] != etag):
+                return None
+            path = os.path.join(self.objects_dir, entry["file"])
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            with self.lock:
+                self._drop(name)
+            return None
+        with self.lock:
+            if name in self.entries:
+                entry["atime"] = time.time()
+                self.entries.move_to_end(name)
+                self._dirty = True
+            self.validated.add(name)
+            self.hits += 1
+        return body
+
+    def _drop(self, name: str):
+        entry = self.entries.pop(name, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry["size"]
+        self.validated.discard(name)
+        self._dirty = True
+        try:
+            os.remove(os.path.join(self.objects_dir, entry["file"]))
+        except OSError:
+            pass
+
+    def _store(self, name: str, etag: str, body: bytes):
+        # One file per object version, so processes sharing the directory never
+        # overwrite a body another index entry still points at
+        file_name = hashlib.sha256(f"{name}\n{etag}".encode()).hexdigest()
+        path = os.path.join(self.objects_dir, file_name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        with self.lock:
+            os.replace(tmp_path, path)
+            old = self.entries.pop(name, None)
+            if old is not None:
+                self.total_bytes -= old["size"]
+                if old["file"] != file_name:
+                    try:
+                        os.remove(os.path.join(self.objects_dir, old["file"]))
+                    except OSError:
+                        pass
+            self.entries[name] = {"etag": etag, "file": file_name, "size": len(body), "atime": time.time()}
+            self.total_bytes += len(body)
+            self.validated.add(name)
+            self.misses += 1
+            self.bytes_fetched += len(body)
+            self._dirty = True
+            # Evict least recently used, but never the entry just stored
+            self._evict()
+
+    def _evict(self):
+        """Drops least recently used entries until the size bound holds (caller holds the lock)."""
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _revalidation(self, name: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Returns (body, None) for an entry already validated in this process,
+        otherwise (None, cached ETag or None) to send as If-None-Match.
+        """
+        with self.lock:
+            entry = self.entries.get(name)
+            cached_etag = entry["etag"] if entry else None
+            trusted = name in self.validated
+        if trusted:
+            body = self._read(name, None)
+            if body is not None:
+                return body, None
+        return None, cached_etag
+
+    @staticmethod
+    def _url_name(url: str) -> str:
+        host, _, path = url.split("://", 1)[-1].partition("/")
+        return ContentCache._name(host, path)
+
+    def get(self, bucket: str, key: str, etag: str, fetch: Callable[[], bytes]) -> bytes:
+        """
+        Returns the body of bucket/key at the given ETag, calling fetch() on a miss.
+        """
+        name = self._name(bucket, key)
+        body = self._read(name, etag)
+        if body is None:
+            body = fetch()
+            self._store(name, etag, body)
+        return body
+
+    def get_s3(self, s3_client, bucket: str, key: str, etag: Optional[str] = None) -> bytes:
+        """
+        Returns the body of an S3 object. Without a known ETag, a cached copy is
+        revalidated with a conditional GetObject (once per process).
+        """
+        name = self._name(bucket, key)
+        if etag is not None:
+            return self.get(bucket, key, etag, lambda: s3_client.get_object(Bucket=bucket, Key=key)['Body'].read())
+
+        body, cached_etag = self._revalidation(name)
+        if body is not None:
+            return body
+
+        kwargs = {'IfNoneMatch': cached_etag} if cached_etag else {}
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=key, **kwargs)
+        except ClientError as e:
+            if cached_etag and e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                body = self._read(name, cached_etag)
+                if body is not None:
+                    return body
+                response = s3_client.get_object(Bucket=bucket, Key=key)
+            else:
+                raise
+        body = response['Body'].read()
+        self._store(name, response['ETag'], body)
+        return body
+
+    def get_url(self, session, url: str, timeout: float = 10) -> Tuple[int, Optional[bytes]]:
+        """
+        Fetches a public object over HTTP(S) with a conditional GET.
+
+        Args:
+            session: requests module or requests.Session.
+            url (str): Object URL. Its host and path form the cache key.
+
+        Returns:
+            tuple: (status_code, body). body is None for non-200 responses; a
+            revalidated cached copy is reported as 200.
+        """
+        name = self._url_name(url)
+        body, cached_etag = self._revalidation(name)
+        if body is not None:
+            return 200, body
+
+        headers = {'If-None-Match': cached_etag} if cached_etag else {}
+        r = session.get(url, headers=headers, timeout=timeout)
+        if r.status_code == 304 and cached_etag:
+            body = self._read(name, cached_etag)
+            if body is not None:
+                return 200, body
+            r = session.get(url, timeout=timeout)
+        if r.status_code != 200:
+            return r.status_code, None
+        etag = r.headers.get('ETag')
+        if etag:
+            self._store(name, etag, r.content)
+        return 200, r.content
+
+    async def aget_s3(self, s3_client, bucket: str, key: str) -> bytes:
+        """
+        get_s3 for an aiobotocore client (revalidated with a conditional GetObject).
+        """
+        name = self._name(bucket, key)
+        body, cached_etag = self._revalidation(name)
+        if body is not None:
+            return body
+
+        kwargs = {'IfNoneMatch': cached_etag} if cached_etag else {}
+        try:
+            response = await s3_client.get_object(Bucket=bucket, Key=key, **kwargs)
+        except ClientError as e:
+            if cached_etag and e.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+                body = self._read(name, cached_etag)
+                if body is not None:
+                    return body
+                response = await s3_client.get_object(Bucket=bucket, Key=key)
+            else:
+                raise
+        async with response['Body'] as stream:
+            body = await stream.read()
+        self._store(name, response['ETag'], body)
+        return body
+
+    async def aget_url(self, session, url: str) -> Tuple[int, Optional[bytes]]:
+        """
+        get_url for an aiohttp.ClientSession (timeouts come from the session).
+        """
+        name = self._url_name(url)
+        body, cached_etag = self._revalidation(name)
+        if body is not None:
+            return 200, body
+
+        headers = {'If-None-Match': cached_etag} if cached_etag else {}
+        async with session.get(url, headers=headers) as r:
+            status, etag = r.status, r.headers.get('ETag')
+            content = await r.read() if status == 200 else None
+        if status == 304 and cached_etag:
+            body = self._read(name, cached_etag)
+            if body is not None:
+                return 200, body
+            async with session.get(url) as r:
+                status, etag = r.status, r.headers.get('ETag')
+                content = await r.read() if status == 200 else None
+        if status != 200:
+            return status, None
+        if etag:
+            self._store(name, etag, content)
+        return 200, content
+
+    def save(self):
+        """
+        Merges this process's entries into the index on disk and persists it
+        atomically. Entries saved meanwhile by another process are kept (the
+        most recently used version of a key wins) and the size bound is
+        applied to the merged index.
+        """
+        with self.lock:
+            if not self._dirty:
+                return
+        with self._index_lock():
+            on_disk = self._read_index()
+            with self.lock:
+                for name, entry in on_disk.items():
+                    current = self.entries.get(name)
+                    if current is not None and current.get("atime", 0) >= entry.get("atime", 0):
+                        continue
+                    if current is not None:
+                        self.total_bytes -= current["size"]
+                    self.entries[name] = entry
+                    self.total_bytes += entry["size"]
+                self.entries = collections.OrderedDict(
+                    sorted(self.entries.items(), key=lambda item: item[1].get("atime", 0)))
+                self._evict()
+                index = {"version": INDEX_VERSION, "entries": dict(self.entries)}
+                self._dirty = False
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f"Content cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+                f"{self.bytes_fetched / 1024**2:.1f} MiB fetched, {self.evictions} evicted, "
+                f"{self.orphans_removed} orphaned files removed, "
+                f"{len(self.entries)} entries / {self.total_bytes / 1024**2:.1f} of "
+                f"{self.max_bytes / 1024**2:.0f} MiB")
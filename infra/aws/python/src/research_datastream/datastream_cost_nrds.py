@@ -6,11 +6,27 @@
 import argparse
 import boto3
 import json
+import numpy as np
 import pandas as pd
 import re
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime, timedelta, timezone
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
+import threading
+import time
+
+try:
+    from research_datastream.content_cache import ContentCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+except ImportError:
+    from content_cache import ContentCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+
+try:
+    from research_datastream.profile_parser import duration_matrix, parse_profile
+except ImportError:
+    from profile_parser import duration_matrix, parse_profile
 
 NCATCHMENTS = {
     "forcing":830353,
@@ -50,6 +66,174 @@ RUN_TYPE_INITS_PER_DAY = {
     "analysis_assim_extend" : 1,
 }
 
+# Init cycles and ensemble members published per day, used by the full-period mode
+RUN_TYPE_INIT_CYCLES = {
+    "short_range" : [f"{i:02d}" for i in range(24)],
+    "medium_range" : ["00", "06", "12", "18"],
+    "analysis_assim_extend" : ["16"],
+}
+
+RUN_TYPE_MEMBERS = {
+    "medium_range" : [str(i) for i in range(1, 8)],
+}
+
+# Executions sharing one Name tag per day (the tag names the VPU and run type, not the init or member)
+EXECUTIONS_PER_TAG_DAY = {run_type: n * len(RUN_TYPE_MEMBERS.get(run_type, [""]))
+                          for run_type, n in RUN_TYPE_INITS_PER_DAY.items()}
+
+NRDS_BUCKET = "ciroh-community-ngen-datastream"
+NRDS_BASE_PREFIX = "v2.2/ngen."
+NRDS_FILE_PATTERNS = ["execution.json",
+                      "profile.txt",
+                      "profile_fp.txt",
+                      "filenamelist.txt",
+                      "conf_datastream.json",
+                      "ngen-run.tar.gz",
+                      "merkdir.file",
+                      ".nc"]
+NRDS_KEY_PATTERN = r"VPU_\d{2}[A-Za-z]?"
+NRDS_VPUS = {k for k in NCATCHMENTS if k.startswith("VPU_")}
+DEFAULT_PREFIX_WORKERS = 8
+
+# Columns materialized from the cost ledger, with their storage type
+LEDGER_COLUMNS = {
+    "Domain": "str",
+    "Number of Catchments": "int",
+    "Run Type": "str",
+    "Instance Type": "str",
+    "Retry Attempt": "float",
+    "Name Tag": "str",
+    "Execution Date": "str",
+    "Init Cycle": "str",
+    "Member": "str",
+    "Component": "str",
+    "Core Count": "float",
+    "Estimated Compute Cost/Execution (BoxUsage)": "float",
+    "Estimated Volume Cost / Execution (EBS:VolumeUsage)": "float",
+    "Output Data Size in S3 (GB)": "float",
+    "S3 Cost/Month/Execution": "float",
+    "Effective Total Cost/Execution": "float",
+}
+
+# Cost Explorer keeps revising the most recent days; only older days are cached
+CE_SETTLE_DAYS = 2
+
+# Late init cycles (e.g. medium_range, 23z short_range) upload into the next day;
+# --mode full only persists init cycles of days older than this
+PERIOD_SETTLE_DAYS = 2
+
+# Region code -> Pricing API location string (same table as the start_ami lambda)
+REGION_NAME_MAP = {
+    "us-east-1": "US East (N. Virginia)",
+    "us-east-2": "US East (Ohio)",
+    "us-west-1": "US West (N. California)",
+    "us-west-2": "US West (Oregon)",
+    "eu-west-1": "EU (Ireland)",
+    "eu-west-2": "EU (London)",
+    "eu-central-1": "EU (Frankfurt)",
+}
+
+DEFAULT_INSTANCE_CACHE = "local_cache/instance_cache.json"
+DEFAULT_INSTANCE_CACHE_TTL_HOURS = 168
+
+# Output artifacts whose size (not content) feeds the S3 storage cost
+SIZE_FILE_TYPES = ["merkdir.file", "ngen-run.tar.gz", ".nc"]
+DEFAULT_FETCH_THREADS = 32
+
+
+class InstanceCache:
+    """
+    Memoizes instance metadata and on-demand pricing keyed by (instance type,
+    region, operating system).
+
+    Entries live in memory for the life of the process and, when a path is given,
+    are persisted as JSON so later runs skip the EC2 and Pricing APIs until the TTL
+    expires. The file holds {"<instance_type>|<region>[|<os>]": {"vcpu",
+    "memory_gib", "platform", "cost_per_hour", "fetched"}}; the os suffix
+    is omitted for Linux. Entries missing any field are treated as misses. Lookups
+    that fail are never persisted.
+
+    The EC2 and Pricing clients are created once per cache and reused.
+    """
+
+    ENTRY_FIELDS = ("vcpu", "memory_gib", "platform", "cost_per_hour")
+
+    def __init__(self, path=None, ttl_hours=DEFAULT_INSTANCE_CACHE_TTL_HOURS):
+        self.path = path
+        self.ttl_s = ttl_hours * 3600
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._ec2_clients = {}
+        self._pricing_client = None
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable instance cache {path}: {e}")
+
+    @staticmethod
+    def key(instance_type, region, operating_system="Linux"):
+        if operating_system == "Linux":
+            return f"{instance_type}|{region}"
+        return f"{instance_type}|{region}|{operating_system}"
+
+    def ec2_client(self, region):
+        if region not in self._ec2_clients:
+            self._ec2_clients[region] = boto3.client('ec2', region_name=region)
+        return self._ec2_clients[region]
+
+    def pricing_client(self):
+        if self._pricing_client is None:
+            self._pricing_client = boto3.client('pricing', region_name='us-east-1')  # Pricing API is in us-east-1
+        return self._pricing_client
+
+    def get(self, instance_type, region, operating_system="Linux"):
+        entry = self.entries.get(self.key(instance_type, region, operating_system))
+        if (entry and all(field in entry for field in self.ENTRY_FIELDS)
+                and time.time() - entry.get("fetched", 0) < self.ttl_s):
+            return entry
+        return None
+
+    def put(self, instance_type, region, operating_system="Linux", **fields):
+        fields["fetched"] = time.time()
+        self.entries[self.key(instance_type, region, operating_system)] = fields
+        self._dirty = True
+
+    def lookup(self, instance_type, region='us-east-1', operating_system="Linux"):
+        """
+        Returns (vcpu, memory_gib, platform, cost_per_hour), fetching on a miss.
+        """
+        with self.lock:
+            entry = self.get(instance_type, region, operating_system)
+            if entry is not None:
+                self.hits += 1
+                return entry["vcpu"], entry["memory_gib"], entry["platform"], entry["cost_per_hour"]
+            self.misses += 1
+            details = fetch_instance_details(instance_type, self.pricing_client(), region=region,
+                                             ec2_client=self.ec2_client(region),
+                                             operating_system=operating_system)
+            vcpu, memory_gib, platform, cost_per_hour = details
+            if vcpu is not None and cost_per_hour > 0:
+                self.put(instance_type, region, operating_system, vcpu=vcpu, memory_gib=memory_gib,
+                         platform=platform, cost_per_hour=cost_per_hour)
+            return details
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
 def get_aws_cost(start_date: str, end_date: str, tag_key: str, tag_value: str, granularity="MONTHLY"):
     """
     Retrieve AWS costs filtered by a cost allocation tag within a given date range.
@@ -79,26 +263,133 @@ def get_aws_cost(start_date: str, end_date: str, tag_key: str, tag_value: str, g
     
     return total_cost
 
-def parse_profile_date(profile_content):
+
+def get_observed_costs(start_date: str, end_date: str, tag_key: str = "Name", cache_dir=DEFAULT_CACHE_DIR, ce_client=None):
     """
-    Parses profile.txt and computes durations for each profiling step.
+    Retrieve daily AWS costs for every value of a cost allocation tag over a date range.
+
+    Costs are fetched with Cost Explorer grouped by the tag, so one paginated
+    get_cost_and_usage call covers every execution in a contiguous run of
+    uncached days. Each day is cached in <cache_dir>/cost_explorer/<tag_key>/<date>.json
+    once it is older than CE_SETTLE_DAYS, since Cost Explorer revises recent days.
+
+    :param start_date: Start date in YYYY-MM-DD format.
+    :param end_date: End date in YYYY-MM-DD format (exclusive).
+    :param tag_key: Cost allocation tag key.
+    :param cache_dir: Directory for the per-day cache.
+    :param ce_client: Cost Explorer client to reuse. Created if None.
+    :return: Dict of {(date YYYY-MM-DD, tag value): unblended cost}.
+    """
+    day_dir = os.path.join(cache_dir, "cost_explorer", tag_key)
+    settled = (datetime.now(timezone.utc) - timedelta(days=CE_SETTLE_DAYS)).strftime('%Y-%m-%d')
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    days = [(start + timedelta(days=i)).strftime('%Y-%m-%d')
+            for i in range((datetime.strptime(end_date, '%Y-%m-%d') - start).days)]
+
+    costs = {}
+    missing = []
+    for day in days:
+        path = os.path.join(day_dir, f"{day}.json")
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                costs.update({(day, value): cost for value, cost in json.load(f).items()})
+        else:
+            missing.append(day)
+
+    # Contiguous runs of uncached days, one query each
+    ranges = []
+    for day in missing:
+        if ranges and (datetime.strptime(day, '%Y-%m-%d') - datetime.strptime(ranges[-1][1], '%Y-%m-%d')).days == 1:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+
+    if ranges and ce_client is None:
+        ce_client = boto3.client("ce")
+    n_calls = 0
+    for first, last in ranges:
+        by_day = {day: {} for day in days if first <= day <= last}
+        end = (datetime.strptime(last, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        kwargs = {
+            "TimePeriod": {"Start": first, "End": end},
+            "Granularity": "DAILY",
+            "Metrics": ["UnblendedCost"],
+            "GroupBy": [{"Type": "TAG", "Key": tag_key}],
+        }
+        while True:
+            response = ce_client.get_cost_and_usage(**kwargs)
+            n_calls += 1
+            for item in response["ResultsByTime"]:
+                day = item["TimePeriod"]["Start"]
+                for group in item.get("Groups", []):
+                    value = group["Keys"][0].split("$", 1)[-1]  # "Name$datastream_short_range_02"
+                    amount = float(group["Metrics"]["UnblendedCost"]["Amount"])
+                    by_day.setdefault(day, {})[value] = by_day.get(day, {}).get(value, 0.0) + amount
+            if not response.get("NextPageToken"):
+                break
+            kwargs["NextPageToken"] = response["NextPageToken"]
+
+        for day, values in by_day.items():
+            costs.update({(day, value): cost for value, cost in values.items()})
+            if day < settled:
+                os.makedirs(day_dir, exist_ok=True)
+                with open(os.path.join(day_dir, f"{day}.json"), 'w') as f:
+                    json.dump(values, f)
+
+    print(f"Observed costs: {len(days) - len(missing)} days cached, {len(missing)} fetched in {n_calls} Cost Explorer calls")
+    return costs
+
+
+def apply_observed_costs(df, observed_costs, executions_per_day=None):
+    """
+    Joins daily tag costs onto executions and recomputes the observed and effective cost columns.
+
+    A tag's daily cost covers every execution that ran under that Name tag that
+    day (one per init cycle and member), so it is split evenly across them.
 
     Args:
-        profile_content (str): Content of profile.txt.
+        df (pd.DataFrame): Executions from build_dataframe_from_files.
+        observed_costs (dict): {(date, tag value): cost} from get_observed_costs.
+        executions_per_day (dict): Run type -> executions per tag per day. If None,
+                                   the executions present in df are counted instead.
 
     Returns:
-        dict: A dictionary with profiling step names as keys and durations (in seconds) as values.
+        pd.DataFrame: df with the Observed columns and Effective Total Cost/Execution updated.
     """
+    if df.empty:
+        return df
+    if "Name Tag" not in df.columns:
+        print("Executions have no Name Tag column (cached before it was added); rerun with --refresh to join observed costs")
+        return df
+    df = df.copy()
+    df["Execution Date"] = df["Execution Date"].fillna("")
+    df["Name Tag"] = df["Name Tag"].fillna("")
+    keys = pd.MultiIndex.from_arrays([df["Execution Date"], df["Name Tag"]])
+    day_cost = pd.Series(observed_costs, dtype=float).reindex(keys).fillna(0.0).to_numpy()
+    if executions_per_day is None:
+        executions = df.groupby(["Execution Date", "Name Tag"])["Name Tag"].transform("size").to_numpy(float)
+    else:
+        executions = df["Run Type"].map(executions_per_day).fillna(1).to_numpy(float)
+    observed = day_cost / executions
+
+    timesteps = df["Run Type"].map(RUN_TYPE_TIMESTEPS).fillna(1).to_numpy(float)
+    ncatch = df["Number of Catchments"].to_numpy(float)
+    df["Observed Total Cost/Execution"] = observed
+    df["Observed Total Cost/Timesteps"] = observed / timesteps
+    df['(Catchment * Timesteps) / Observed Total Cost Per Execution'] = safe_divide(ncatch * timesteps, observed)
+    estimated_total = (df["Estimated Compute Cost/Execution (BoxUsage)"]
+                       + df['Estimated Volume Cost / Execution (EBS:VolumeUsage)'].fillna(0)).to_numpy()
+    df["Effective Total Cost/Execution"] = np.where(observed > 0, observed, estimated_total)
+    return df
 
-    # Parse start and end times for each step
-    for line in profile_content.splitlines():
-        match = re.match(r"(\w+)_START: (\d+)", line)
-        if match:
-            try:
-                date = datetime.strptime(match.group(2), "%Y%m%d%H%M%S")
-                return date
-            except ValueError as ve:
-                print(f"Timestamp parsing error in line: '{line}' - {ve}")
+def parse_profile_date(profile_content):
+    """
+    Returns the first *_START timestamp of profile.txt as a datetime, or None.
+
+    Args:
+        profile_content (str): Content of profile.txt.
+    """
+    return parse_profile(profile_content).start_datetime()
 
 
 def parse_profile_durations(profile_content):
@@ -111,55 +402,26 @@ def parse_profile_durations(profile_content):
     Returns:
         dict: A dictionary with profiling step names as keys and durations (in seconds) as values.
     """
-    timestamps = {}
-    durations = {}
-
-    # Parse start and end times for each step
-    for line in profile_content.splitlines():
-        match = re.match(r"(\w+)_START: (\d+)", line)
-        if match:
-            step = match.group(1)
-            try:
-                timestamps[f"{step}_START"] = datetime.strptime(match.group(2), "%Y%m%d%H%M%S")
-            except ValueError as ve:
-                print(f"Timestamp parsing error in line: '{line}' - {ve}")
-
-        match = re.match(r"(\w+)_END: (\d+)", line)
-        if match:
-            step = match.group(1)
-            try:
-                timestamps[f"{step}_END"] = datetime.strptime(match.group(2), "%Y%m%d%H%M%S")
-            except ValueError as ve:
-                print(f"Timestamp parsing error in line: '{line}' - {ve}")
-
-    # Calculate durations
-    for key in timestamps.keys():
-        step = re.sub(r'_(START|END)$', '', key)  # Remove _START or _END from the key
-        start_key = f"{step}_START"
-        end_key = f"{step}_END"
-        
-        if start_key in timestamps and end_key in timestamps:
-            duration = (timestamps[end_key] - timestamps[start_key]).total_seconds()
-            durations[step] = duration
-        else:
-            print(f"Missing start or end timestamp for step: {step}")
-
-    return durations
+    return parse_profile(profile_content).durations()
 
-def fetch_instance_details(instance_type, pricing_client):
+def fetch_instance_details(instance_type, pricing_client, region='us-east-1', ec2_client=None, operating_system="Linux"):
     """
     Fetches core count, memory, platform, and cost per hour from AWS for a given instance type.
+    Uncached; use InstanceCache.lookup to avoid repeating the calls.
 
     Args:
         instance_type (str): The EC2 instance type (e.g., 't4g.2xlarge').
         pricing_client (boto3.client): The AWS Pricing client.
+        region (str): AWS region code the instance runs in.
+        ec2_client (boto3.client): EC2 client to reuse. Created for the region if None.
+        operating_system (str): Operating system to price ("Linux", "Windows", etc.).
 
     Returns:
         tuple: (vcpu, memory_gib, platform, cost_per_hour)
     """
     try:
-        # Initialize EC2 client for instance details
-        ec2_client = boto3.client('ec2', region_name='us-east-1')  # Pricing API is in us-east-1
+        if ec2_client is None:
+            ec2_client = boto3.client('ec2', region_name=region)
 
         # Describe instance types to get vCPU and memory
         response = ec2_client.describe_instance_types(InstanceTypes=[instance_type])
@@ -170,7 +432,9 @@ def fetch_instance_details(instance_type, pricing_client):
         platform = 'arm' if instance['ProcessorInfo']['SupportedArchitectures'] == ['arm64'] else 'x86'
 
         # Fetch instance cost using Pricing API
-        cost_per_hour = get_instance_cost(instance_type, pricing_client)
+        cost_per_hour = get_instance_cost(instance_type, pricing_client,
+                                          region=REGION_NAME_MAP.get(region, REGION_NAME_MAP['us-east-1']),
+                                          operating_system=operating_system)
 
         return vcpu, memory_gib, platform, cost_per_hour
 
@@ -178,7 +442,7 @@ def fetch_instance_details(instance_type, pricing_client):
         print(f"Error fetching details for instance type {instance_type}: {e}")
         return None, None, "Unknown", 0.0
 
-def get_instance_cost(instance_type, pricing_client, region='US East (N. Virginia)'):
+def get_instance_cost(instance_type, pricing_client, region='US East (N. Virginia)', operating_system="Linux"):
     """
     Fetches real-time instance pricing using AWS Pricing API.
 
@@ -186,6 +450,7 @@ def get_instance_cost(instance_type, pricing_client, region='US East (N. Virgini
         instance_type (str): The EC2 instance type.
         pricing_client (boto3.client): The AWS Pricing client.
         region (str): The AWS region name as per AWS Pricing API (e.g., 'US East (N. Virginia)').
+        operating_system (str): Operating system as per AWS Pricing API (e.g., 'Linux').
 
     Returns:
         float: Cost per hour in USD.
@@ -196,7 +461,7 @@ def get_instance_cost(instance_type, pricing_client, region='US East (N. Virgini
             {'Type': 'TERM_MATCH', 'Field': 'instanceType', 'Value': instance_type},
             {'Type': 'TERM_MATCH', 'Field': 'location', 'Value': region},
             {'Type': 'TERM_MATCH', 'Field': 'preInstalledSw', 'Value': 'NA'},
-            {'Type': 'TERM_MATCH', 'Field': 'operatingSystem', 'Value': 'Linux'},
+            {'Type': 'TERM_MATCH', 'Field': 'operatingSystem', 'Value': operating_system},
             {'Type': 'TERM_MATCH', 'Field': 'tenancy', 'Value': 'Shared'},
             {'Type': 'TERM_MATCH', 'Field': 'capacitystatus', 'Value': 'Used'}
         ]
@@ -230,205 +495,279 @@ def get_instance_cost(instance_type, pricing_client, region='US East (N. Virgini
         print(f"Error fetching pricing for instance type {instance_type}: {e}")
         return 0.0
 
-def build_dataframe_from_files(file_contents, selected_vpus=None):
+def parse_run_type(tag_value):
+    """
+    Extracts the run type from an instance Name tag (e.g. datastream_short_range_02 -> short_range).
+    """
+    if tag_value == "datastream_test":
+        tag_value = "datastream_short_range_02"
+    parts = tag_value.split('_')
+    return '_'.join(parts[1:-1]) if len(parts) > 2 else tag_value
+
+
+def safe_divide(numerator, denominator):
+    """
+    Element-wise numerator / denominator, 0 where the denominator is not positive.
+    """
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def build_dataframe_from_files(file_contents, selected_vpus=None, instance_cache=None, region='us-east-1'):
     """
     Builds a pandas DataFrame from parsed S3 file contents.
 
+    Raw fields are extracted from each execution once into column arrays,
+    instance details are looked up once per distinct instance type, and every
+    derived cost and throughput metric is computed as a vectorized expression.
+
     Args:
         file_contents (dict): Dictionary of file contents grouped by file type and keys (e.g., VPU_02).
         selected_vpus (list): List of selected VPUs to include. If None, include all.
+        instance_cache (InstanceCache): Shared instance metadata/pricing cache. In-memory only if None.
+        region (str): AWS region code the executions ran in.
 
     Returns:
         pd.DataFrame: DataFrame with execution details and profiling step durations.
     """
-    rows = []
+    if instance_cache is None:
+        instance_cache = InstanceCache()
 
-    # Initialize AWS Pricing client
-    pricing_client = boto3.client('pricing', region_name='us-east-1')
+    profiles = file_contents.get("profile.txt", {})
+    forcing_profile = file_contents.get("profile_fp.txt", {}).get("forcing")
+    run_sizes = file_contents.get("ngen-run.tar.gz", {})
+    merkdir_sizes = file_contents.get("merkdir.file", {})
+    forcing_size = sum(file_contents.get(".nc", {}).values())
+
+    # Raw fields, one entry per execution
+    domains, ncatch, parsed_profiles, execution_duration = [], [], [], []
+    run_types, instance_types, retries, output_size = [], [], [], []
+    name_tags, execution_dates = [], []
+    has_volume, volume_types, volume_sizes = [], [], []
 
-    # Iterate over execution.json files
     for vpu_key, execution_data in file_contents.get("execution.json", {}).items():
-        if vpu_key == "VPU_16":
-            pass
         if selected_vpus and vpu_key not in selected_vpus and vpu_key != "forcing":
             continue
-        ii_forcing = False
-        profile_data = file_contents.get("profile.txt", {}).get(vpu_key)
-        if profile_data is None:
-            ii_forcing = True
-            profile_data = file_contents.get("profile_fp.txt", {}).get("forcing")        
-
+        profile_data = profiles.get(vpu_key)
+        ii_forcing = profile_data is None
         if ii_forcing:
-            domain = "conus"
-        else:
-            domain = vpu_key
-
-        row = {
-            "Domain": domain,  # Extracted key (e.g., VPU_02)
-        }
-
-        ncatch = NCATCHMENTS.get(vpu_key, 0)
-        row['Number of Catchments'] = ncatch
-
-        if profile_data:
-            durations = parse_profile_durations(profile_data)
-            start_date = parse_profile_date(profile_data)
-            end_date = start_date + timedelta(days=1)
-            for step, duration in durations.items():
-                row[f"{step} Duration (s)"] = duration
-        else:
+            profile_data = forcing_profile
+        if not profile_data:
             continue
 
+        profile = parse_profile(profile_data)
+        main_step = 'FORCINGPROCESSOR' if ii_forcing else 'DATASTREAM'
+        main_duration = profile.duration(main_step)
+        if main_duration is None:
+            # No duration means no cost; leave the execution out (it is reported as missing)
+            print(f"Skipping {vpu_key}: its profile has no complete {main_step} step")
+            continue
         if ii_forcing:
-            execution_duration = durations['FORCINGPROCESSOR']
+            execution_duration.append(main_duration)
+            output_size.append(forcing_size)
         else:
-            execution_duration = durations['DATASTREAM'] + durations.get('S3_MOVE',5)
+            execution_duration.append(main_duration + profile.duration('S3_MOVE', 5))
+            output_size.append(run_sizes.get(vpu_key, 0) + merkdir_sizes.get(vpu_key, 0))
+        domains.append("conus" if ii_forcing else vpu_key)
+        ncatch.append(NCATCHMENTS.get(vpu_key, 0))
+        parsed_profiles.append(profile)
 
-        # Extract instance parameters
         instance_params = execution_data.get("instance_parameters", {})
-        instance_type = instance_params.get("InstanceType", "N/A")
-        run_type = instance_params.get("TagSpecifications", {})[0].get("Tags", [{}])[0].get("Value", "")
-        if run_type == "datastream_test": run_type = "datastream_short_range_02"
-        run_type_parts = run_type.split('_')
-        run_type = '_'.join(run_type_parts[1:-1]) if len(run_type_parts) > 2 else run_type
-        row["Run Type"] = run_type    
-        row["Instance Type"] = instance_type
-
-        # Fetch dynamic instance details and cost
-        vcpu, memory_gib, platform, cost_per_hour = fetch_instance_details(instance_type, pricing_client)
-        row["Core Count"] = vcpu if vcpu is not None else "N/A"
-        row["Memory (GiB)"] = memory_gib if memory_gib is not None else "N/A"
-        row["Platform"] = platform
-        row["Instance Cost/hr (InstanceType)"] = cost_per_hour
-        estimated_cost_per_execution = cost_per_hour * execution_duration / 3600
-        row["Estimated Compute Cost/Execution (BoxUsage)"] = estimated_cost_per_execution
-        row["Estimated Compute Cost/Timesteps"] = estimated_cost_per_execution / RUN_TYPE_TIMESTEPS.get(run_type, 1)
-        row['Estimated (Catchment * Timesteps) / $'] = (ncatch * RUN_TYPE_TIMESTEPS.get(run_type, 1)) / estimated_cost_per_execution if estimated_cost_per_execution > 0 else 0
-        row['Estimated Catchments / Core / Timestep / Second'] = ncatch / (vcpu or 1) / RUN_TYPE_TIMESTEPS.get(run_type, 1) / execution_duration if execution_duration > 0 else 0
-        row['Estimated (Catchments * Timesteps) / (Core * Second)'] = (ncatch * RUN_TYPE_TIMESTEPS.get(run_type, 1)) / ((vcpu or 1) * execution_duration) if execution_duration > 0 else 0
-
-        tag_key = instance_params.get("TagSpecifications", {})[0].get("Tags", [{}])[0].get("Key", "")
-        tag_value = instance_params.get("TagSpecifications", {})[0].get("Tags", [{}])[0].get("Value", "")
-        # observed_cost_per_execution = get_aws_cost(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), tag_key, tag_value, "DAILY")
-        observed_cost_per_execution = 0
-        row["Observed Total Cost/Execution"] = observed_cost_per_execution
-        row["Observed Total Cost/Timesteps"] = observed_cost_per_execution / RUN_TYPE_TIMESTEPS.get(run_type, 1)
-        row['(Catchment * Timesteps) / Observed Total Cost Per Execution'] = (ncatch * RUN_TYPE_TIMESTEPS.get(run_type, 1)) / observed_cost_per_execution if observed_cost_per_execution > 0 else 0
-        row['Observed Catchments / Core / Timestep / Second'] = ncatch / (vcpu or 1) / RUN_TYPE_TIMESTEPS.get(run_type, 1) / execution_duration if execution_duration > 0 else 0
-        row['Observed (Catchments * Timesteps) / (Core * Second)'] = (ncatch * RUN_TYPE_TIMESTEPS.get(run_type, 1)) / ((vcpu or 1) * execution_duration) if execution_duration > 0 else 0
-
-        if ii_forcing:
-            total_run_size_GB = sum(file_contents.get(".nc", {}).values())
-        else:
-            total_run_size_GB = file_contents.get("ngen-run.tar.gz", {}).get(vpu_key, 0) + file_contents.get("merkdir.file", {}).get(vpu_key, 0)
-        row["Output Data Size in S3 (GB)"] = total_run_size_GB
-        row["S3 Cost/Month/GB"] = 0.023
-        row["S3 Cost/Month/Execution"] = 0.023 * total_run_size_GB
+        tag = instance_params.get("TagSpecifications", {})[0].get("Tags", [{}])[0]
+        run_types.append(parse_run_type(tag.get("Value", "")))
+        name_tags.append(tag.get("Value", ""))
+        start_date = profile.start_datetime()
+        execution_dates.append(start_date.strftime('%Y-%m-%d') if start_date else "")
+        instance_types.append(instance_params.get("InstanceType", "N/A"))
+        retries.append(execution_data.get("retry_attempt", 0))
 
-        # Extract volume parameters
         block_device_mappings = instance_params.get("BlockDeviceMappings", [])
-        if block_device_mappings:
-            ebs = block_device_mappings[0].get("Ebs", {})
-            volume_type = ebs.get("VolumeType", "N/A")
-            volume_size = ebs.get("VolumeSize", "N/A")
-            row["Run Type"] = run_type
-            row["Timesteps"] = RUN_TYPE_TIMESTEPS.get(run_type, 1)
-            row["Volume Type"] = volume_type
-            row["Volume Size (GB)"] = volume_size
-
-            # Fetch volume cost
-            volume_cost_per_hr = 0.08 / 30 / 24
-            row["Cost/hr (Volume)"] = volume_cost_per_hr * volume_size  # Total volume cost per hour            
-            estimated_volume_cost = volume_cost_per_hr * volume_size * execution_duration / 3600
-            row['Estimated Volume Cost / Execution (EBS:VolumeUsage)'] = estimated_volume_cost
-        else:
-            row["Volume Type"] = "N/A"
-            row["Volume Size (GB)"] = "N/A"
-            row["Cost/hr (Volume)"] = 0.0
-            estimated_volume_cost = 0.0
-
+        ebs = block_device_mappings[0].get("Ebs", {}) if block_device_mappings else {}
+        has_volume.append(bool(block_device_mappings))
+        volume_types.append(ebs.get("VolumeType", "N/A"))
+        volume_sizes.append(ebs.get("VolumeSize", "N/A") if block_device_mappings else "N/A")
+
+    if not domains:
+        return pd.DataFrame()
+
+    # Instance details once per distinct instance type
+    details = {it: instance_cache.lookup(it, region) for it in dict.fromkeys(instance_types)}
+    vcpu = pd.Series([details[it][0] for it in instance_types], dtype=float)
+    cost_per_hour = np.array([details[it][3] for it in instance_types], dtype=float)
+
+    ncatch = np.array(ncatch, dtype=float)
+    duration = np.array(execution_duration, dtype=float)
+    timesteps = np.array([RUN_TYPE_TIMESTEPS.get(rt, 1) for rt in run_types], dtype=float)
+    cores = vcpu.fillna(0).replace(0, 1).to_numpy()  # (vcpu or 1)
+    catchment_timesteps = ncatch * timesteps
+    has_volume = np.array(has_volume)
+    volume_gb = np.where(has_volume, pd.to_numeric(pd.Series(volume_sizes), errors="coerce").fillna(0), 0.0)
+    volume_cost_per_hr = 0.08 / 30 / 24
+
+    estimated_compute = cost_per_hour * duration / 3600
+    estimated_volume = volume_cost_per_hr * volume_gb * duration / 3600
+    # Observed costs are joined later by apply_observed_costs; until then they are written as 0
+    observed = np.zeros(len(domains), dtype=int)
+    catchments_per_core = safe_divide(ncatch / cores / timesteps, duration)
+    catchment_timesteps_per_core = safe_divide(catchment_timesteps, cores * duration)
+    size_gb = np.array(output_size, dtype=float)
+
+    columns = {
+        "Domain": domains,
+        "Number of Catchments": ncatch.astype(int),
+    }
+    # Step durations in order of first appearance
+    steps, durations = duration_matrix(parsed_profiles)
+    for j, step in enumerate(steps):
+        if not np.isnan(durations[:, j]).all():
+            columns[f"{step} Duration (s)"] = durations[:, j]
+    columns.update({
+        "Run Type": run_types,
+        "Instance Type": instance_types,
+        "Retry Attempt": retries,
+        "Name Tag": name_tags,
+        "Execution Date": execution_dates,
+        # Raw lookup values, so the CSVs keep integral core counts (8, not 8.0)
+        "Core Count": [details[it][0] if details[it][0] is not None else "N/A" for it in instance_types],
+        "Memory (GiB)": [details[it][1] if details[it][1] is not None else "N/A" for it in instance_types],
+        "Platform": [details[it][2] for it in instance_types],
+        "Instance Cost/hr (InstanceType)": cost_per_hour,
+        "Estimated Compute Cost/Execution (BoxUsage)": estimated_compute,
+        "Estimated Compute Cost/Timesteps": estimated_compute / timesteps,
+        'Estimated (Catchment * Timesteps) / $': safe_divide(catchment_timesteps, estimated_compute),
+        'Estimated Catchments / Core / Timestep / Second': catchments_per_core,
+        'Estimated (Catchments * Timesteps) / (Core * Second)': catchment_timesteps_per_core,
+        "Observed Total Cost/Execution": observed,
+        "Observed Total Cost/Timesteps": observed / timesteps,
+        '(Catchment * Timesteps) / Observed Total Cost Per Execution': observed,
+        'Observed Catchments / Core / Timestep / Second': catchments_per_core,
+        'Observed (Catchments * Timesteps) / (Core * Second)': catchment_timesteps_per_core,
+        "Output Data Size in S3 (GB)": size_gb,
+        "S3 Cost/Month/GB": 0.023,
+        "S3 Cost/Month/Execution": 0.023 * size_gb,
+        "Timesteps": np.where(has_volume, timesteps, np.nan),
+        "Volume Type": volume_types,
+        "Volume Size (GB)": volume_sizes,
+        "Cost/hr (Volume)": volume_cost_per_hr * volume_gb,
+        'Estimated Volume Cost / Execution (EBS:VolumeUsage)': np.where(has_volume, estimated_volume, np.nan),
         # Effective cost: use observed if >0, else estimated compute + volume
-        estimated_total = row["Estimated Compute Cost/Execution (BoxUsage)"] + estimated_volume_cost
-        row["Effective Total Cost/Execution"] = observed_cost_per_execution if observed_cost_per_execution > 0 else estimated_total
+        "Effective Total Cost/Execution": np.where(observed > 0, observed, estimated_compute + estimated_volume),
+    })
+    df = pd.DataFrame(columns)
 
-        rows.append(row)
+    return df
 
-    # Convert rows to a DataFrame
-    df = pd.DataFrame(rows)
 
-    return df
+def list_matching_objects(s3_client, bucket_name, prefix, accepted_file_types, key_pattern):
+    """
+    Lists objects under a prefix and classifies them by accepted file type.
+
+    Returns:
+        list: (file_type, extracted_key, key, size_bytes, etag) tuples, in listing order.
+    """
+    matches = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            for file_type in accepted_file_types:
+                if key.endswith(file_type):
+                    # Extract the desired portion of the prefix using the regex pattern
+                    match = re.search(key_pattern, key)
+                    extracted_key = match.group(0) if match else "forcing"  # e.g. VPU_02
+                    matches.append((file_type, extracted_key, key, obj['Size'], obj['ETag']))
+    return matches
+
+
+def fetch_file_content(content_cache, s3_client, bucket_name, file_type, key, etag):
+    """
+    Reads one metadata file through the ETag-validated content cache and parses it.
+
+    Returns:
+        The parsed JSON for *.json files, raw text otherwise.
+    """
+    content = content_cache.get_s3(s3_client, bucket_name, key, etag=etag).decode('utf-8')
+    return json.loads(content) if file_type.endswith('.json') else content
 
 
-def read_files_from_s3(bucket_name, prefix, accepted_file_types, key_pattern):
+def read_files_from_s3(bucket_name, prefix, accepted_file_types, key_pattern,
+                       max_workers=DEFAULT_FETCH_THREADS, s3_client=None, content_cache=None, verbose=True,
+                       strict=False):
     """
     Reads files from an S3 bucket matching a prefix and accepted file types.
     Groups file contents by file type and keys extracted using a regex pattern.
+
+    The prefix is listed first. Sizes for output artifacts (ngen-run.tar.gz,
+    merkdir.file, .nc) come straight from the listing; the remaining files are
+    fetched concurrently on a bounded thread pool, served from the content
+    cache when the listed ETag matches the cached copy.
     
     Args:
         bucket_name (str): The name of the S3 bucket.
         prefix (str): The prefix (folder path or key prefix) to filter files.
         accepted_file_types (list): List of file types (suffixes) to include.
         key_pattern (str): A regex pattern to extract a key from the file path.
+        max_workers (int): Maximum number of concurrent downloads.
+        s3_client (boto3.client): S3 client to reuse. One sized for max_workers is created if None.
+        content_cache (ContentCache): Local object cache. The default local_cache/ is used if None.
+        verbose (bool): Print every file read and empty prefixes.
+        strict (bool): Raise once all fetches are done if any file could not be read or parsed,
+                       instead of leaving it out of the result.
         
     Returns:
         dict: A dictionary where keys are file types and values are dictionaries.
               The inner dictionaries have extracted keys as keys and file contents as values.
+              Size file types hold GB, summed over all objects sharing an extracted key.
+
+    Raises:
+        RuntimeError: With strict, if any listed file could not be read or parsed.
     """
-    # Initialize S3 client
-    s3_client = boto3.client('s3')
-    
+    if s3_client is None:
+        s3_client = boto3.client('s3', config=Config(max_pool_connections=max(10, max_workers)))
+    if content_cache is None:
+        content_cache = ContentCache()
+
     # Initialize a dictionary to store file contents grouped by file type
     file_contents = {file_type: {} for file_type in accepted_file_types}
-    
-    # List all objects under the specified prefix
-    paginator = s3_client.get_paginator('list_objects_v2')
-    has_content = False
-    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
-        if 'Contents' in page:
-            has_content = True
-        for obj in page.get('Contents', []):
-            key = obj['Key']
-            
-            # Check if the file matches any accepted file type
-            for file_type in accepted_file_types:
-                if key.endswith(file_type):
-                    # Extract the desired portion of the prefix using the regex pattern
-                    match = re.search(key_pattern, key)
-                    if not match:
-                        extracted_key = "forcing"
-                    else:
-                        extracted_key = match.group(0)  # Extracted string (e.g., VPU_02)
-                    
-
-                    if file_type in ["merkdir.file", "ngen-run.tar.gz", ".nc"]:
-                        response = s3_client.head_object(Bucket=bucket_name, Key=key)
-                        file_contents[file_type][extracted_key] = response['ContentLength'] / 1000000000               
-                    else:
-                        # Download to local cache
-                        local_dir = "local_cache/" + prefix.replace('/', '_')
-                        os.makedirs(local_dir, exist_ok=True)
-                        local_path = local_dir + '/' + extracted_key + '_' + key.split('/')[-1]
-                        if not os.path.exists(local_path):
-                            s3_client.download_file(bucket_name, key, local_path)
-                        with open(local_path, 'r') as f:
-                            content = f.read()
-                        
-                        try:
-                            # If file is JSON, parse content. Otherwise, store as raw text.
-                            if file_type.endswith('.json'):
-                                data = json.loads(content)
-                            else:
-                                data = content
-                            
-                            # Store content under the extracted key
-                            file_contents[file_type][extracted_key] = data
-                            print(f"Successfully read file: {key} (Extracted key: {extracted_key})")
-                        except Exception as e:
-                            print(f"Failed to read or parse file {key}: {e}")
-    
-    if not has_content:
-        print(f"No contents found for prefix: {prefix}")
-    
+
+    matches = list_matching_objects(s3_client, bucket_name, prefix, accepted_file_types, key_pattern)
+    if not matches:
+        if verbose:
+            print(f"No contents found for prefix: {prefix}")
+        return file_contents
+
+    downloads = []
+    for file_type, extracted_key, key, size, etag in matches:
+        if file_type in SIZE_FILE_TYPES:
+            sizes = file_contents[file_type]
+            sizes[extracted_key] = sizes.get(extracted_key, 0) + size / 1000000000
+        else:
+            downloads.append((file_type, extracted_key, key, etag))
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(downloads) or 1))) as executor:
+        futures = {
+            executor.submit(fetch_file_content, content_cache, s3_client, bucket_name, file_type, key, etag):
+                (file_type, extracted_key, key)
+            for file_type, extracted_key, key, etag in downloads
+        }
+        for future in as_completed(futures):
+            file_type, extracted_key, key = futures[future]
+            try:
+                # Store content under the extracted key
+                file_contents[file_type][extracted_key] = future.result()
+                if verbose:
+                    print(f"Successfully read file: {key} (Extracted key: {extracted_key})")
+            except Exception as e:
+                print(f"Failed to read or parse file {key}: {e}")
+                failed.append(key)
+
+    content_cache.save()
+    if strict and failed:
+        raise RuntimeError(f"{len(failed)} files under {prefix} could not be read: {', '.join(sorted(failed))}")
     return file_contents
 
 def list_subdirectories(bucket_name, prefix):
@@ -455,137 +794,546 @@ def list_subdirectories(bucket_name, prefix):
     
     return result
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--start_date", required=True, help="Start date in YYYYMMDD format")
-    parser.add_argument("--end_date", required=True, help="End date in YYYYMMDD format")
-    parser.add_argument("--run_types", nargs='+', required=True, help="Run types, space separated")
-    parser.add_argument("--init_cycles", type=str, required=True, help="Init cycles: 'all' or space separated list like 00 06 12 18")
-    parser.add_argument("--vpus", type=str, required=True, help="VPUs: 'all' or space separated list like VPU_01 VPU_02")
-    parser.add_argument("--sample_date", required=True, help="Sample date in YYYYMMDD format")
-    parser.add_argument("--sample_init", required=True, help="Sample init cycle like 06")
-    args = parser.parse_args()
+def execution_prefixes(date_str, run_type, init):
+    """
+    Enumerates the NRDS execution prefixes published for one date, run type and init cycle.
 
-    bucket = "ciroh-community-ngen-datastream"
-    base_prefix = "v2.2/ngen."
-    file_patterns = ["execution.json",
-                     "profile.txt",
-                     "profile_fp.txt",
-                     "filenamelist.txt",
-                     "conf_datastream.json",
-                     "ngen-run.tar.gz",
-                     "merkdir.file",
-                     ".nc"]
-    key_pattern = r"VPU_\d{2}[A-Za-z]?"
+    Returns:
+        list: (component, member, prefix) tuples. component is "ngen" (one prefix
+              per ensemble member, holding every VPU) or "forcing".
+    """
+    prefixes = []
+    for member in RUN_TYPE_MEMBERS.get(run_type, [""]):
+        member_part = f"{member}/" if member else ""
+        prefixes.append(("ngen", member, f"{NRDS_BASE_PREFIX}{date_str}/{run_type}/{init}/{member_part}"))
+    prefixes.append(("forcing", "", f"{NRDS_BASE_PREFIX}{date_str}/forcing_{run_type}/{init}/"))
+    return prefixes
 
-    start = datetime.strptime(args.start_date, '%Y%m%d')
-    end = datetime.strptime(args.end_date, '%Y%m%d')
-    num_days = (end - start).days + 1
 
-    if args.vpus == "all":
-        all_vpus = [k for k in NCATCHMENTS if k.startswith("VPU_")]
-    else:
-        all_vpus = args.vpus.split()
+def ingest_prefix(prefix, component, s3_client, content_cache, instance_cache, region, fetch_threads):
+    """
+    Reads one execution prefix (every VPU; selection is applied later).
 
-    total_system_cost = 0.0
+    Returns:
+        tuple: (rows, listed). listed is False when the prefix holds none of the
+               expected files, i.e. the execution provably does not exist.
 
-    all_df_ngen = []
-    all_df_forcing = []
-    missing_executions = []
+    Raises:
+        RuntimeError: A listed file could not be read or parsed.
+    """
+    files = read_files_from_s3(NRDS_BUCKET, prefix, NRDS_FILE_PATTERNS, NRDS_KEY_PATTERN,
+                               max_workers=fetch_threads, s3_client=s3_client,
+                               content_cache=content_cache, verbose=False, strict=True)
+    listed = any(files.values())
+    df = build_dataframe_from_files(files, instance_cache=instance_cache, region=region)
+    if component == "ngen" and not df.empty:
+        df = df[df["Domain"].str.startswith("VPU_")]
+    return df, listed
 
-    for run_type in args.run_types:
-        if run_type == "analysis_assim_extend":
-            sample_d = (datetime.strptime(args.sample_date, '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d')
-            sample_i = "16"
-        else:
-            sample_d = args.sample_date
-            sample_i = args.sample_init
 
-        if args.init_cycles == "all":
-            num_inits = RUN_TYPE_INITS_PER_DAY.get(run_type, 1)
-        else:
-            num_inits = len(args.init_cycles.split())
-            if run_type == "analysis_assim_extend":
-                num_inits = 1  # Override for analysis_assim_extend
+def prefix_complete(df, component):
+    """
+    Whether one execution prefix yielded every expected execution: a row per
+    NRDS VPU for an ngen member, one row for forcing.
+    """
+    if df.empty:
+        return False
+    if component == "forcing":
+        return True
+    return NRDS_VPUS <= set(df["Domain"])
 
-        ens_mems = 1
-        if run_type == "medium_range":
-            ens_mems = 7
 
-        # Fetch for ngen
-        ngen_prefix = base_prefix + sample_d + "/" + run_type + "/" + sample_i + "/"
-        files_ngen = read_files_from_s3(bucket, ngen_prefix, file_patterns, key_pattern)
-        df_ngen = build_dataframe_from_files(files_ngen, selected_vpus=all_vpus if args.vpus == "all" else None)
+def period_cache_path(cache_dir, date_str, run_type, init):
+    return os.path.join(cache_dir, "period", date_str, f"{run_type}_{init}.csv")
 
-        # Check missing VPUs for NGEN
-        present_vpus = set(df_ngen['Domain']) if not df_ngen.empty else set()
-        for v in all_vpus:
-            if v not in present_vpus:
-                missing_executions.append(f"run_type: {run_type}, vpu: {v}, date: {sample_d}, init: {sample_i}")
 
-        # Fetch for forcing
-        forcing_prefix = base_prefix + sample_d + "/" + "forcing_" + run_type + "/" + sample_i + "/"
-        files_forcing = read_files_from_s3(bucket, forcing_prefix, file_patterns, key_pattern)
-        df_forcing = build_dataframe_from_files(files_forcing)
+def load_period_cache(path):
+    """
+    Reads a period cache CSV back with the dtypes ingestion produced: identifier
+    columns as text ("" where empty, e.g. the Member of single-member run types),
+    empty cells as NaN and the numeric LEDGER_COLUMNS as numbers.
+    """
+    text_columns = ["Date", "NRDS Run Type"] + [name for name, kind in LEDGER_COLUMNS.items() if kind == "str"]
+    try:
+        # Only empty cells are missing; "N/A" placeholders stay text like in a fresh ingest
+        df = pd.read_csv(path, dtype={name: str for name in text_columns}, keep_default_na=False, na_values=[""])
+    except pd.errors.EmptyDataError:
+        # Init cycle with no executions
+        return pd.DataFrame()
+    for name in df.columns.intersection(text_columns):
+        df[name] = df[name].fillna("")
+    for name, kind in LEDGER_COLUMNS.items():
+        if kind != "str" and name in df.columns:
+            df[name] = pd.to_numeric(df[name], errors="coerce")
+    return df
+
 
-        # Check missing for forcing
-        if df_forcing.empty:
-            missing_executions.append(f"run_type: forcing_{run_type}, date: {sample_d}, init: {sample_i}")
+def ingest_period(dates, init_cycles, s3_client, content_cache, instance_cache, region,
+                  fetch_threads=DEFAULT_FETCH_THREADS, prefix_workers=DEFAULT_PREFIX_WORKERS,
+                  cache_dir=DEFAULT_CACHE_DIR, refresh=False, ledger=None):
+    """
+    Ingests every execution (date x run type x init x member x VPU, plus forcing) in a period.
 
-        # Calculate costs per init
-        ngen_cost_per_init = df_ngen["Effective Total Cost/Execution"].sum()
-        forcing_cost_per_init = df_forcing["Effective Total Cost/Execution"].sum()
+    Prefixes from all days are fetched concurrently. An init cycle is written to
+    <cache_dir>/period/<date>/<run_type>_<init>.csv and read back on later runs
+    instead of being ingested again only once it is settled: its day is older
+    than PERIOD_SETTLE_DAYS, every file was read, and it either has every
+    expected execution (all NRDS VPUs per member, plus forcing) or none of its
+    prefixes exist at all. Anything else is returned but ingested again next
+    time. With a ledger, settled init cycles are appended to it instead and
+    already-ingested ones are neither fetched nor loaded.
 
-        cost_per_init = ngen_cost_per_init * ens_mems + forcing_cost_per_init
-        cost_per_day = cost_per_init * num_inits 
-        cost_for_period = cost_per_day * num_days
+    Args:
+        dates (list): Dates as YYYYMMDD strings.
+        init_cycles (dict): Run type -> init cycles to ingest.
+        ledger (CostLedger): Ledger to append to instead of the CSV period cache.
 
-        # Add to total
-        total_system_cost += cost_for_period
+    Returns:
+        pd.DataFrame: One row per execution with Date, Init Cycle, Member,
+                      Component and NRDS Run Type columns added. With a ledger,
+                      only the executions that were not persisted to it.
+    """
+    settled = (datetime.now(timezone.utc) - timedelta(days=PERIOD_SETTLE_DAYS)).strftime('%Y%m%d')
+    frames = []
+    pending = {}
+    n_cached = 0
+    for date_str in dates:
+        for run_type, inits in init_cycles.items():
+            for init in inits:
+                path = period_cache_path(cache_dir, date_str, run_type, init)
+                if ledger is not None and not refresh and date_str < settled and ledger.has(date_str, run_type, init):
+                    n_cached += 1
+                elif ledger is None and not refresh and date_str < settled and os.path.exists(path):
+                    frames.append(load_period_cache(path))
+                    n_cached += 1
+                else:
+                    pending[(date_str, run_type, init)] = execution_prefixes(date_str, run_type, init)
+
+    n_prefixes = sum(len(p) for p in pending.values())
+    print(f"Period: {n_cached} init cycles cached, {len(pending)} to ingest ({n_prefixes} prefixes, "
+          f"{prefix_workers} workers)")
+
+    unit_frames = {unit: [] for unit in pending}
+    remaining = {unit: len(prefixes) for unit, prefixes in pending.items()}
+    failed = set()
+    incomplete = set()
+    listed_units = set()
+    unsettled = 0
+    done = 0
+    with ThreadPoolExecutor(max_workers=prefix_workers) as executor:
+        futures = {}
+        for unit, prefixes in pending.items():
+            for component, member, prefix in prefixes:
+                future = executor.submit(ingest_prefix, prefix, component, s3_client, content_cache,
+                                         instance_cache, region, fetch_threads)
+                futures[future] = (unit, component, member, prefix)
+
+        for future in as_completed(futures):
+            unit, component, member, prefix = futures[future]
+            date_str, run_type, init = unit
+            try:
+                df, listed = future.result()
+            except Exception as e:
+                print(f"Failed to ingest {prefix}: {e}")
+                failed.add(unit)
+                df, listed = pd.DataFrame(), True
+            if listed:
+                listed_units.add(unit)
+            if not prefix_complete(df, component):
+                incomplete.add(unit)
+            if not df.empty:
+                df = df.assign(**{"Date": date_str, "Init Cycle": init, "Member": member,
+                                  "Component": component, "NRDS Run Type": run_type})
+                unit_frames[unit].append(df)
+
+            remaining[unit] -= 1
+            if remaining[unit]:
+                continue
+            parts = unit_frames.pop(unit)
+            df_unit = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+            # Partial init cycles may still be uploading (or have failed reads); empty
+            # ones are only final when the listing proved none of their prefixes exist
+            persist = (date_str < settled and unit not in failed
+                       and (unit not in incomplete or unit not in listed_units))
+            if ledger is not None and persist:
+                ledger.write(date_str, run_type, init, df_unit)
+            else:
+                frames.append(df_unit)
+            if ledger is None and persist:
+                path = period_cache_path(cache_dir, date_str, run_type, init)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                df_unit.to_csv(path, index=False)
+            unsettled += not persist
+            done += 1
+            if done % 24 == 0 or done == len(pending):
+                print(f"Ingested {done}/{len(pending)} init cycles (last: {date_str} {run_type} {init}z)")
+                content_cache.save()
+
+    if unsettled:
+        print(f"{unsettled} init cycles are recent, incomplete or had read errors; they are not cached "
+              f"and will be ingested again")
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+class CostLedger:
+    """
+    Persistent execution ledger stored as Hive-partitioned Parquet (needs pyarrow).
+
+    Layout: <root>/date=<YYYYMMDD>/run_type=<run_type>/init=<init>.parquet, one file
+    per ingested init cycle, plus <root>/_manifest.json recording every ingested
+    (date, run type, init), including those with no executions. New init cycles
+    are appended as new files; ingested ones are skipped. Reads prune partitions
+    by date and run type and only materialize LEDGER_COLUMNS.
+    """
+
+    def __init__(self, root):
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("Error: --ledger requires pyarrow (pip install pyarrow)", file=sys.stderr)
+            sys.exit(1)
+        self.pa, self.ds, self.pq = pa, ds, pq
+        self.root = root
+        self.manifest_path = os.path.join(root, "_manifest.json")
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        self.schema = pa.schema([(name, pa.string() if kind == "str" else pa.int64() if kind == "int" else pa.float64())
+                                 for name, kind in LEDGER_COLUMNS.items()])
+        self.partitioning = ds.partitioning(pa.schema([("date", pa.string()), ("run_type", pa.string())]),
+                                            flavor="hive")
+
+    @staticmethod
+    def unit_key(date_str, run_type, init):
+        return f"{date_str}/{run_type}/{init}"
+
+    def has(self, date_str, run_type, init):
+        return self.unit_key(date_str, run_type, init) in self.manifest
+
+    def write(self, date_str, run_type, init, df):
+        """
+        Stores one init cycle's executions, replacing any earlier copy.
+        """
+        if not df.empty:
+            df = df.drop(columns=["Date", "NRDS Run Type"], errors="ignore")
+            for name, kind in LEDGER_COLUMNS.items():
+                if name not in df.columns:
+                    continue
+                if kind == "str":
+                    df[name] = df[name].astype(str)
+                else:
+                    df[name] = pd.to_numeric(df[name], errors="coerce")  # "N/A" placeholders -> null
+            # Remaining object columns (placeholders mixed into numbers) are stored as text
+            for name in df.columns[df.dtypes == object]:
+                df[name] = df[name].astype(str)
+            directory = os.path.join(self.root, f"date={date_str}", f"run_type={run_type}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"init={init}.parquet")
+            # "_"-prefixed files are skipped by dataset discovery, so a partial write never breaks read()
+            tmp_path = os.path.join(directory, f"_init={init}.parquet.{os.getpid()}.{threading.get_ident()}.tmp")
+            self.pq.write_table(self.pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+        with self.lock:
+            self.manifest[self.unit_key(date_str, run_type, init)] = {
+                "rows": len(df), "ingested": datetime.now(timezone.utc).isoformat()}
+            tmp_manifest = self.manifest_path + ".tmp"
+            with open(tmp_manifest, 'w') as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp_manifest, self.manifest_path)
+
+    def read(self, dates, run_types, init_cycles=None):
+        """
+        Loads LEDGER_COLUMNS for the given dates and run types.
+
+        The date and run type predicates prune partition directories before any
+        file is opened; the init cycle predicate is pushed into the Parquet scan.
+        """
+        dataset = self.ds.dataset(self.root, format="parquet", partitioning=self.partitioning,
+                                  schema=self.schema.append(self.pa.field("date", self.pa.string()))
+                                                    .append(self.pa.field("run_type", self.pa.string())))
+        ds = self.ds
+        predicate = ds.field("date").isin(list(dates)) & ds.field("run_type").isin(list(run_types))
+        if init_cycles is not None:
+            predicate &= ds.field("Init Cycle").isin(sorted({i for inits in init_cycles.values() for i in inits}))
+        table = dataset.to_table(filter=predicate)
+        df = table.to_pandas().rename(columns={"date": "Date", "run_type": "NRDS Run Type"})
+        return df
+
+
+def find_missing_executions(df, dates, run_types, init_cycles, vpus):
+    """
+    Lists expected executions with no row in the ingested period.
+    """
+    present = set()
+    if not df.empty:
+        present = set(zip(df["Date"], df["NRDS Run Type"], df["Init Cycle"], df["Member"],
+                          df["Component"], df["Domain"]))
+    present_forcing = {p[:4] for p in present if p[4] == "forcing"}
+    missing = []
+    for date_str in dates:
+        for run_type in run_types:
+            for init in init_cycles[run_type]:
+                if (date_str, run_type, init, "") not in present_forcing:
+                    missing.append(f"run_type: forcing_{run_type}, date: {date_str}, init: {init}")
+                for member in RUN_TYPE_MEMBERS.get(run_type, [""]):
+                    for vpu in vpus:
+                        if (date_str, run_type, init, member, "ngen", vpu) not in present:
+                            member_part = f", member: {member}" if member else ""
+                            missing.append(f"run_type: {run_type}, vpu: {vpu}, date: {date_str}, init: {init}{member_part}")
+    return missing
+
+
+def report_period(df, missing_executions, write_executions=True):
+    """
+    Prints and saves the observed period cost, per-day totals and the per-execution cost distribution.
+    """
+    cost_col = "Effective Total Cost/Execution"
+    total = df[cost_col].sum() if not df.empty else 0.0
+    print(f"Total cost for the system over the period (all executions): {total}")
+    if df.empty:
+        return
+
+    if write_executions:
+        df.to_csv('period_executions.csv', index=False)
+
+    by_day = df.groupby(["Date", "NRDS Run Type", "Component"])[cost_col].sum().unstack(["NRDS Run Type", "Component"])
+    by_day["Total"] = by_day.sum(axis=1)
+    by_day.to_csv('period_cost_by_day.csv')
+    daily = by_day["Total"]
+    print(f"\nDaily cost: mean {daily.mean():.2f}, std {daily.std():.2f}, min {daily.min():.2f}, max {daily.max():.2f}")
+
+    distribution = df.groupby(["Component", "NRDS Run Type"])[cost_col].describe(percentiles=[0.5, 0.9, 0.99])
+    distribution["total"] = df.groupby(["Component", "NRDS Run Type"])[cost_col].sum()
+    distribution.to_csv('period_cost_distribution.csv')
+    print("\nPer-execution cost distribution:")
+    print(distribution)
+
+    retried = df[pd.to_numeric(df["Retry Attempt"], errors="coerce").fillna(0) > 0]
+    print(f"\nRetried executions: {len(retried)} of {len(df)}, ${retried[cost_col].sum():.2f}")
+
+    ngen = df[df["Component"] == "ngen"]
+    ngen_cost_by_vpu = ngen.groupby('Domain')[cost_col].sum().sort_values(ascending=False)
+    ngen_cost_by_vpu.to_csv('period_ngen_cost_by_vpu.csv')
+    print("\nMost costly VPUs for NGEN:")
+    print(ngen_cost_by_vpu)
 
-        # Add column for period cost
-        df_ngen['Projected Cost Over Period'] = df_ngen["Effective Total Cost/Execution"] * num_inits * num_days * ens_mems
-        df_forcing['Projected Cost Over Period'] = df_forcing["Effective Total Cost/Execution"] * num_inits * num_days
+    with open('missing_executions.txt', 'w') as f:
+        for missing in missing_executions:
+            f.write(missing + '\n')
+    print(f"\n{len(missing_executions)} missing executions written to missing_executions.txt")
 
-        all_df_ngen.append(df_ngen)
-        all_df_forcing.append(df_forcing)
 
-        # Optionally print dfs
-        # print(f"NGEN for {run_type}:\n{df_ngen}")
-        # print(f"Forcing for {run_type}:\n{df_forcing}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start_date", required=True, help="Start date in YYYYMMDD format")
+    parser.add_argument("--end_date", required=True, help="End date in YYYYMMDD format")
+    parser.add_argument("--run_types", nargs='+', required=True, help="Run types, space separated")
+    parser.add_argument("--init_cycles", type=str, required=True, help="Init cycles: 'all' or space separated list like 00 06 12 18")
+    parser.add_argument("--vpus", type=str, required=True, help="VPUs: 'all' or space separated list like VPU_01 VPU_02")
+    parser.add_argument("--mode", choices=["sample", "full"], default="sample",
+                        help="sample: extrapolate one sampled init over the period. full: ingest every execution in the period")
+    parser.add_argument("--sample_date", help="Sample date in YYYYMMDD format (sample mode)")
+    parser.add_argument("--sample_init", help="Sample init cycle like 06 (sample mode)")
+    parser.add_argument("--region", default="us-east-1", help="AWS region the executions ran in")
+    parser.add_argument("--instance_cache", default=DEFAULT_INSTANCE_CACHE,
+                        help="JSON file caching instance metadata and pricing across runs ('' to disable)")
+    parser.add_argument("--instance_cache_ttl", type=float, default=DEFAULT_INSTANCE_CACHE_TTL_HOURS,
+                        help="Hours before a cached instance entry is fetched again")
+    parser.add_argument("--fetch_threads", type=int, default=DEFAULT_FETCH_THREADS,
+                        help="Concurrent S3 downloads per prefix")
+    parser.add_argument("--prefix_workers", type=int, default=DEFAULT_PREFIX_WORKERS,
+                        help="Execution prefixes ingested concurrently (full mode)")
+    parser.add_argument("--ledger", default=None,
+                        help="Directory of the partitioned Parquet cost ledger to append to and report from (full mode, needs pyarrow)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Re-ingest days already in the per-day period cache (full mode)")
+    parser.add_argument("--observed_cost", action="store_true",
+                        help="Fill the Observed cost columns from Cost Explorer daily costs grouped by the Name tag")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR, help="Directory for the local content cache")
+    parser.add_argument("--cache_max_mb", type=float, default=DEFAULT_MAX_MB,
+                        help="Size bound of the content cache in MiB, least recently used files are evicted")
+    args = parser.parse_args()
+    if args.mode == "sample" and not (args.sample_date and args.sample_init):
+        parser.error("--sample_date and --sample_init are required in sample mode")
+    if args.ledger and args.mode != "full":
+        parser.error("--ledger requires --mode full")
 
-    print(f"Total projected cost for the system over the period: {total_system_cost}")
+    instance_cache = InstanceCache(args.instance_cache or None, args.instance_cache_ttl)
+    concurrent_prefixes = args.prefix_workers if args.mode == "full" else 1
+    s3_client = boto3.client('s3', config=Config(max_pool_connections=max(10, args.fetch_threads * concurrent_prefixes)))
+    content_cache = ContentCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
 
-    # Combine dataframes
-    combined_df_ngen = pd.concat(all_df_ngen, ignore_index=True)
-    combined_df_forcing = pd.concat(all_df_forcing, ignore_index=True)
+    bucket = NRDS_BUCKET
+    base_prefix = NRDS_BASE_PREFIX
+    file_patterns = NRDS_FILE_PATTERNS
+    key_pattern = NRDS_KEY_PATTERN
 
-    # Save to CSV
-    combined_df_ngen.to_csv('ngen_data.csv', index=False)
-    combined_df_forcing.to_csv('forcing_data.csv', index=False)
+    start = datetime.strptime(args.start_date, '%Y%m%d')
+    end = datetime.strptime(args.end_date, '%Y%m%d')
+    num_days = (end - start).days + 1
 
-    # Analysis for most costly aspects
-    # For NGEN: group by Run Type and Domain (VPU)
-    ngen_cost_by_run_type = combined_df_ngen.groupby('Run Type')['Projected Cost Over Period'].sum().sort_values(ascending=False)
-    ngen_cost_by_vpu = combined_df_ngen.groupby('Domain')['Projected Cost Over Period'].sum().sort_values(ascending=False)
+    if args.vpus == "all":
+        all_vpus = [k for k in NCATCHMENTS if k.startswith("VPU_")]
+    else:
+        all_vpus = args.vpus.split()
 
-    # For Forcing: group by Run Type (since no VPU)
-    forcing_cost_by_run_type = combined_df_forcing.groupby('Run Type')['Projected Cost Over Period'].sum().sort_values(ascending=False)
+    if args.mode == "full":
+        dates = [(start + timedelta(days=i)).strftime('%Y%m%d') for i in range(num_days)]
+        init_cycles = {}
+        for run_type in args.run_types:
+            allowed = RUN_TYPE_INIT_CYCLES.get(run_type, ["00"])
+            selected = allowed if args.init_cycles == "all" else [i for i in args.init_cycles.split() if i in allowed]
+            init_cycles[run_type] = selected or allowed  # analysis_assim_extend only runs at 16
+        ledger = CostLedger(args.ledger) if args.ledger else None
+        df_period = ingest_period(dates, init_cycles, s3_client, content_cache, instance_cache, args.region,
+                                  fetch_threads=args.fetch_threads, prefix_workers=args.prefix_workers,
+                                  cache_dir=args.cache_dir, refresh=args.refresh, ledger=ledger)
+        if ledger is not None:
+            frames = [f for f in (ledger.read(dates, args.run_types, init_cycles), df_period) if not f.empty]
+            df_period = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if not df_period.empty:
+            df_period = df_period[(df_period["Component"] == "forcing") | df_period["Domain"].isin(all_vpus)]
+        if args.observed_cost and not df_period.empty:
+            # Executions may start the day before (analysis_assim_extend) their folder date
+            observed_costs = get_observed_costs((start - timedelta(days=1)).strftime('%Y-%m-%d'),
+                                                (end + timedelta(days=1)).strftime('%Y-%m-%d'),
+                                                cache_dir=args.cache_dir)
+            # Count the executions actually ingested per tag and day unless only some inits were read
+            per_day = None if args.init_cycles == "all" else EXECUTIONS_PER_TAG_DAY
+            df_period = apply_observed_costs(df_period, observed_costs, per_day)
+        missing_executions = find_missing_executions(df_period, dates, args.run_types, init_cycles, all_vpus)
+
+        instance_cache.save()
+        content_cache.save()
+        print(f"Instance cache: {instance_cache.hits} hits, {instance_cache.misses} API lookups")
+        print(content_cache.report())
+        report_period(df_period, missing_executions, write_executions=ledger is None)
+    else:
+        observed_costs = {}
+        if args.observed_cost:
+            sample_day = datetime.strptime(args.sample_date, '%Y%m%d')
+            observed_costs = get_observed_costs((sample_day - timedelta(days=2)).strftime('%Y-%m-%d'),
+                                                (sample_day + timedelta(days=1)).strftime('%Y-%m-%d'),
+                                                cache_dir=args.cache_dir)
 
-    # Print summaries
-    print("\nMost costly run_types for NGEN:")
-    print(ngen_cost_by_run_type)
-    print("\nMost costly VPUs for NGEN:")
-    print(ngen_cost_by_vpu)
-    print("\nMost costly run_types for Forcing:")
-    print(forcing_cost_by_run_type)
+        total_system_cost = 0.0
 
-    # Optionally save summaries
-    ngen_cost_by_run_type.to_csv('ngen_cost_by_run_type.csv')
-    ngen_cost_by_vpu.to_csv('ngen_cost_by_vpu.csv')
-    forcing_cost_by_run_type.to_csv('forcing_cost_by_run_type.csv')   
+        all_df_ngen = []
+        all_df_forcing = []
+        missing_executions = []
 
-    # Write missing executions to file
-    with open('missing_executions.txt', 'w') as f:
-        for missing in missing_executions:
-            f.write(missing + '\n')
\ No newline at end of file
+        for run_type in args.run_types:
+            if run_type == "analysis_assim_extend":
+                sample_d = (datetime.strptime(args.sample_date, '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d')
+                sample_i = "16"
+            else:
+                sample_d = args.sample_date
+                sample_i = args.sample_init
+
+            if args.init_cycles == "all":
+                num_inits = RUN_TYPE_INITS_PER_DAY.get(run_type, 1)
+            else:
+                num_inits = len(args.init_cycles.split())
+                if run_type == "analysis_assim_extend":
+                    num_inits = 1  # Override for analysis_assim_extend
+
+            ens_mems = 1
+            if run_type == "medium_range":
+                ens_mems = 7
+
+            # Fetch for ngen
+            ngen_prefix = base_prefix + sample_d + "/" + run_type + "/" + sample_i + "/"
+            files_ngen = read_files_from_s3(bucket, ngen_prefix, file_patterns, key_pattern,
+                                            max_workers=args.fetch_threads, s3_client=s3_client,
+                                            content_cache=content_cache)
+            df_ngen = build_dataframe_from_files(files_ngen, selected_vpus=all_vpus if args.vpus == "all" else None,
+                                                 instance_cache=instance_cache, region=args.region)
+
+            # Check missing VPUs for NGEN
+            present_vpus = set(df_ngen['Domain']) if not df_ngen.empty else set()
+            for v in all_vpus:
+                if v not in present_vpus:
+                    missing_executions.append(f"run_type: {run_type}, vpu: {v}, date: {sample_d}, init: {sample_i}")
+
+            # Fetch for forcing
+            forcing_prefix = base_prefix + sample_d + "/" + "forcing_" + run_type + "/" + sample_i + "/"
+            files_forcing = read_files_from_s3(bucket, forcing_prefix, file_patterns, key_pattern,
+                                               max_workers=args.fetch_threads, s3_client=s3_client,
+                                               content_cache=content_cache)
+            df_forcing = build_dataframe_from_files(files_forcing, instance_cache=instance_cache, region=args.region)
+
+            if args.observed_cost:
+                df_ngen = apply_observed_costs(df_ngen, observed_costs, EXECUTIONS_PER_TAG_DAY)
+                df_forcing = apply_observed_costs(df_forcing, observed_costs, EXECUTIONS_PER_TAG_DAY)
+
+            # Check missing for forcing
+            if df_forcing.empty:
+                missing_executions.append(f"run_type: forcing_{run_type}, date: {sample_d}, init: {sample_i}")
+
+            # Calculate costs per init
+            ngen_cost_per_init = df_ngen["Effective Total Cost/Execution"].sum()
+            forcing_cost_per_init = df_forcing["Effective Total Cost/Execution"].sum()
+
+            cost_per_init = ngen_cost_per_init * ens_mems + forcing_cost_per_init
+            cost_per_day = cost_per_init * num_inits 
+            cost_for_period = cost_per_day * num_days
+
+            # Add to total
+            total_system_cost += cost_for_period
+
+            # Add column for period cost
+            df_ngen['Projected Cost Over Period'] = df_ngen["Effective Total Cost/Execution"] * num_inits * num_days * ens_mems
+            df_forcing['Projected Cost Over Period'] = df_forcing["Effective Total Cost/Execution"] * num_inits * num_days
+
+            all_df_ngen.append(df_ngen)
+            all_df_forcing.append(df_forcing)
+
+            # Optionally print dfs
+            # print(f"NGEN for {run_type}:\n{df_ngen}")
+            # print(f"Forcing for {run_type}:\n{df_forcing}")
+
+        instance_cache.save()
+        print(f"Instance cache: {instance_cache.hits} hits, {instance_cache.misses} API lookups")
+        print(content_cache.report())
+
+        print(f"Total projected cost for the system over the period: {total_system_cost}")
+
+        # Combine dataframes
+        combined_df_ngen = pd.concat(all_df_ngen, ignore_index=True)
+        combined_df_forcing = pd.concat(all_df_forcing, ignore_index=True)
+
+        # Save to CSV
+        combined_df_ngen.to_csv('ngen_data.csv', index=False)
+        combined_df_forcing.to_csv('forcing_data.csv', index=False)
+
+        # Analysis for most costly aspects
+        # For NGEN: group by Run Type and Domain (VPU)
+        ngen_cost_by_run_type = combined_df_ngen.groupby('Run Type')['Projected Cost Over Period'].sum().sort_values(ascending=False)
+        ngen_cost_by_vpu = combined_df_ngen.groupby('Domain')['Projected Cost Over Period'].sum().sort_values(ascending=False)
+
+        # For Forcing: group by Run Type (since no VPU)
+        forcing_cost_by_run_type = combined_df_forcing.groupby('Run Type')['Projected Cost Over Period'].sum().sort_values(ascending=False)
+
+        # Print summaries
+        print("\nMost costly run_types for NGEN:")
+        print(ngen_cost_by_run_type)
+        print("\nMost costly VPUs for NGEN:")
+        print(ngen_cost_by_vpu)
+        print("\nMost costly run_types for Forcing:")
+        print(forcing_cost_by_run_type)
+
+        # Optionally save summaries
+        ngen_cost_by_run_type.to_csv('ngen_cost_by_run_type.csv')
+        ngen_cost_by_vpu.to_csv('ngen_cost_by_vpu.csv')
+        forcing_cost_by_run_type.to_csv('forcing_cost_by_run_type.csv')   
+
+        # Write missing executions to file
+        with open('missing_executions.txt', 'w') as f:
+            for missing in missing_executions:
+                f.write(missing + '\n')
\ No newline at end of file
@@ -2,15 +2,26 @@
 import argparse
 import datetime
 from datetime import timezone
+import asyncio
 import requests
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
+import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import boto3
 from urllib.parse import urlparse
 import seaborn as sns
+
+try:
+    from research_datastream.content_cache import ContentCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+except ImportError:
+    from content_cache import ContentCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+
 s3 = boto3.client("s3")
+# ETag-validated cache for execution.json, conf_fp.json and filenamelist.txt; set up in main()
+content_cache = None
 
 plt.style.use('dark_background')
 
@@ -29,6 +40,17 @@ ALL_VPUS = ["01", "02", "03N", "03S", "03W", "04", "05", "06", "07", "08",
 
 ALL_ENSEMBLES = ["1", "2", "3", "4", "5", "6", "7"]
 
+def get_json(url):
+    """
+    GET a JSON metadata file, through the content cache when one is configured.
+    Returns (status_code, data) with data None unless the status is 200.
+    """
+    if content_cache is None:
+        r = requests.get(url, timeout=10)
+        return r.status_code, r.json() if r.status_code == 200 else None
+    status, body = content_cache.get_url(requests, url)
+    return status, json.loads(body) if status == 200 else None
+
 def get_lead_time_minutes(exec_url, end_time):
     """
     Calculate the lead time (lead_time_nwm) of the forecast by taking the difference
@@ -43,9 +65,8 @@ def get_lead_time_minutes(exec_url, end_time):
     lead_time_nwm_minutes = None
 
     conf_fp = exec_url.replace("execution.json", "conf_fp.json")
-    r = requests.get(conf_fp, timeout=10)
-    if r.status_code == 200:
-        data = r.json()
+    status, data = get_json(conf_fp)
+    if status == 200:
         forcing_url = data.get("forcing")
         parsed = urlparse(forcing_url, allow_fragments=False)
         bucket = parsed.netloc
@@ -54,14 +75,18 @@ def get_lead_time_minutes(exec_url, end_time):
         ngen_forcing_end_time = response['LastModified']   
         lead_time_ngen_minutes = end_time - ngen_forcing_end_time 
     else:
-        print(f"Could not fetch conf_fp.json, status={r.status_code}")
+        print(f"Could not fetch conf_fp.json, status={status}")
 
     base_prefix = "/".join(key.split("/")[:-1])
     nwm_forcing_url = f"s3://{bucket}/{base_prefix}/metadata/forcings_metadata/filenamelist.txt"
     parsed = urlparse(nwm_forcing_url, allow_fragments=False)
     bucket = parsed.netloc
     key = parsed.path.lstrip("/")
-    nwm_file = s3.get_object(Bucket=bucket, Key=key)['Body'].read().decode('utf-8').strip().splitlines()[-1]
+    if content_cache is None:
+        filenamelist = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    else:
+        filenamelist = content_cache.get_s3(s3, bucket, key)
+    nwm_file = filenamelist.decode('utf-8').strip().splitlines()[-1]
     parsed = urlparse(nwm_file, allow_fragments=False)
     bucket = parsed.netloc.split(".")[0] 
     key = parsed.path.lstrip("/")
@@ -84,9 +109,8 @@ def fetch_execution_times(exec_json_url, run_url):
 
     # Fetch execution.json start time
     try:
-        r = requests.get(exec_json_url, timeout=10)
-        if r.status_code == 200:
-            data = r.json()
+        status, data = get_json(exec_json_url)
+        if status == 200:
             # Adjust the key based on your JSON structure
             start_time_str = data.get("t0")
             if start_time_str:
@@ -95,7 +119,7 @@ def fetch_execution_times(exec_json_url, run_url):
             else:
                 print(f"No start_time in {exec_json_url}")
         else:
-            print(f"Could not fetch execution.json, status={r.status_code}")
+            print(f"Could not fetch execution.json, status={status}")
     except Exception as e:
         print(f"Error fetching execution.json: {e}")
 
@@ -125,13 +149,18 @@ def fetch_execution_times(exec_json_url, run_url):
 
     return start_time, end_time, execution_time_minutes
 
-def process_run(date_str, run_type, hour, vpu, ens, cached_urls, df_cache):
+def run_urls(date_str, run_type, hour, vpu, ens):
+    """
+    Returns (run_url, exec_json_url) for one NRDS execution.
+    """
     if run_type == "medium_range":
-        run_url = f"{BASE_URL}/ngen.{date_str}/{run_type}/{hour}/{ens}/VPU_{vpu}/ngen-run.tar.gz"
-        exec_json_url = f"{BASE_URL}/ngen.{date_str}/{run_type}/{hour}/{ens}/VPU_{vpu}/datastream-metadata/execution.json"
+        base = f"{BASE_URL}/ngen.{date_str}/{run_type}/{hour}/{ens}/VPU_{vpu}"
     else:
-        run_url = f"{BASE_URL}/ngen.{date_str}/{run_type}/{hour}/VPU_{vpu}/ngen-run.tar.gz"
-        exec_json_url = f"{BASE_URL}/ngen.{date_str}/{run_type}/{hour}/VPU_{vpu}/datastream-metadata/execution.json"
+        base = f"{BASE_URL}/ngen.{date_str}/{run_type}/{hour}/VPU_{vpu}"
+    return f"{base}/ngen-run.tar.gz", f"{base}/datastream-metadata/execution.json"
+
+def process_run(date_str, run_type, hour, vpu, ens, cached_urls, df_cache):
+    run_url, exec_json_url = run_urls(date_str, run_type, hour, vpu, ens)
 
     print(f"Processing run: {run_url}")
 
@@ -171,6 +200,174 @@ def process_run(date_str, run_type, hour, vpu, ens, cached_urls, df_cache):
         "lead_time_ngen_minutes": lead_time_ngen_minutes
     }
 
+async def get_json_async(session, url):
+    """
+    get_json on an aiohttp session. Returns (0, None) on a timeout, connection
+    error or unparseable body, so the run is still reported (as a failure).
+    """
+    try:
+        if content_cache is None:
+            async with session.get(url) as r:
+                status = r.status
+                body = await r.read() if status == 200 else None
+        else:
+            status, body = await content_cache.aget_url(session, url)
+        return status, json.loads(body) if status == 200 else None
+    except Exception:
+        return 0, None
+
+async def head_url_async(session, url):
+    """
+    HEAD a URL. Returns (status_code, Last-Modified as UTC datetime or None); status 0 on error.
+    """
+    try:
+        async with session.head(url) as r:
+            last_modified = r.headers.get("Last-Modified")
+            if r.status != 200 or not last_modified:
+                return r.status, None
+            end_time = datetime.datetime.strptime(last_modified, "%a, %d %b %Y %H:%M:%S %Z")
+            return r.status, end_time.replace(tzinfo=datetime.timezone.utc)
+    except Exception:
+        return 0, None
+
+async def get_lead_time_minutes_async(session, s3_client, exec_url, end_time):
+    """
+    get_lead_time_minutes on an aiohttp session and an aiobotocore S3 client.
+    """
+    conf_fp = exec_url.replace("execution.json", "conf_fp.json")
+    status, data = await get_json_async(session, conf_fp)
+    if status != 200:
+        print(f"Could not fetch conf_fp.json, status={status}")
+        return None, None, None, None
+    parsed = urlparse(data.get("forcing"), allow_fragments=False)
+    bucket = parsed.netloc
+    key = parsed.path.lstrip("/")
+    response = await s3_client.head_object(Bucket=bucket, Key=key)
+    ngen_forcing_end_time = response['LastModified']
+    lead_time_ngen_minutes = end_time - ngen_forcing_end_time
+
+    base_prefix = "/".join(key.split("/")[:-1])
+    key = f"{base_prefix}/metadata/forcings_metadata/filenamelist.txt"
+    if content_cache is None:
+        response = await s3_client.get_object(Bucket=bucket, Key=key)
+        async with response['Body'] as stream:
+            filenamelist = await stream.read()
+    else:
+        filenamelist = await content_cache.aget_s3(s3_client, bucket, key)
+    nwm_file = filenamelist.decode('utf-8').strip().splitlines()[-1]
+    parsed = urlparse(nwm_file, allow_fragments=False)
+    bucket = parsed.netloc.split(".")[0]
+    key = parsed.path.lstrip("/")
+    response = await s3_client.head_object(Bucket=bucket, Key=key)
+    nwm_forcing_end_time = response['LastModified'].astimezone(timezone.utc)
+    lead_time_nwm_minutes = end_time - nwm_forcing_end_time
+
+    return (lead_time_nwm_minutes.total_seconds() / 60, lead_time_ngen_minutes.total_seconds() / 60,
+            nwm_forcing_end_time, ngen_forcing_end_time)
+
+async def process_run_async(session, s3_client, date_str, run_type, hour, vpu, ens, cached_urls, df_cache):
+    """
+    process_run on the async engine. The run file HEAD and the execution.json GET
+    are each made once and issued together, then the lead-time lookups follow.
+    """
+    run_url, exec_json_url = run_urls(date_str, run_type, hour, vpu, ens)
+
+    if run_url in cached_urls:
+        return df_cache[df_cache["run_url"] == run_url].iloc[0].to_dict()
+
+    (status, end_time), (exec_status, data) = await asyncio.gather(
+        head_url_async(session, run_url), get_json_async(session, exec_json_url))
+
+    retry = retries_allowed = start_time = None
+    if exec_status == 200:
+        retry = data.get("retry_attempt")
+        retries_allowed = data.get("run_options", {}).get("n_retries_allowed")
+        if data.get("t0"):
+            start_time = datetime.datetime.fromtimestamp(data["t0"], tz=timezone.utc)
+
+    execution_time_minutes = None
+    if start_time and end_time:
+        execution_time_minutes = (end_time - start_time).total_seconds() / 60
+
+    lead_time_nwm_minutes = lead_time_ngen_minutes = nwm_end_time = ngen_end_time = None
+    if end_time:
+        try:
+            (lead_time_nwm_minutes, lead_time_ngen_minutes,
+             nwm_end_time, ngen_end_time) = await get_lead_time_minutes_async(session, s3_client, exec_json_url, end_time)
+        except Exception as e:
+            print(f"Could not calculate lead times for {run_url}: {e}")
+
+    return {
+        "date": date_str,
+        "run_type": run_type,
+        "init_cycle": hour,
+        "ensemble": ens if run_type == "medium_range" else None,
+        "vpu": vpu,
+        "run_url": run_url,
+        "status_code": status,
+        "status": "success" if status == 200 else "failure",
+        "retry_attempt": retry,
+        "retries_allowed": retries_allowed,
+        "execution_t0": start_time,
+        "output_time": end_time,
+        "execution_time_minutes": execution_time_minutes,
+        "nwm_forcing_end_time": nwm_end_time,
+        "ngen_forcing_end_time": ngen_end_time,
+        "lead_time_nwm_minutes": lead_time_nwm_minutes,
+        "lead_time_ngen_minutes": lead_time_ngen_minutes
+    }
+
+def run_checks_async(runs, cached_urls, df_cache, max_inflight=200):
+    """
+    Checks runs with an asyncio engine: one keep-alive aiohttp session and one
+    aiobotocore S3 client, with at most max_inflight runs in flight. The HTTP
+    pool holds two connections per run, the S3 pool one.
+
+    Args:
+        runs (list): (date_str, run_type, hour, vpu, ens) tuples.
+
+    Returns:
+        list: One row per run, as process_run returns. Runs that raise are reported and skipped.
+    """
+    try:
+        import aiohttp
+        from aiobotocore.config import AioConfig
+        from aiobotocore.session import AioSession
+    except ImportError:
+        print("Error: --engine async requires aiohttp and aiobotocore (pip install aiobotocore)", file=sys.stderr)
+        sys.exit(1)
+
+    async def engine():
+        # Each run has its HEAD and execution.json GET in flight at once
+        connector = aiohttp.TCPConnector(limit=2 * max_inflight, keepalive_timeout=60, ttl_dns_cache=300)
+        # Per-socket timeouts only: a total timeout would also count time queued for a pooled connection
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=10)
+        client_config = AioConfig(max_pool_connections=max_inflight, tcp_keepalive=True,
+                                  retries={'mode': 'standard', 'max_attempts': 5})
+        semaphore = asyncio.Semaphore(max_inflight)
+        done = 0
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session, \
+                AioSession().create_client("s3", config=client_config) as s3_client:
+
+            async def bounded(run):
+                nonlocal done
+                async with semaphore:
+                    try:
+                        row = await process_run_async(session, s3_client, *run, cached_urls, df_cache)
+                    except Exception as e:
+                        print(f"Failed to check run {run}: {e}")
+                        row = None
+                done += 1
+                if done % 500 == 0 or done == len(runs):
+                    print(f"Checked {done}/{len(runs)} runs")
+                return row
+
+            rows = await asyncio.gather(*(bounded(run) for run in runs))
+        return [row for row in rows if row is not None]
+
+    return asyncio.run(engine())
+
 def plot_violin_group(df, output_file, title):
     group_cols = [
         ("date", "By Date"),
@@ -260,9 +457,8 @@ def check_url(url: str) -> int:
 
 def fetch_execution_metadata(url: str):
     try:
-        r = requests.get(url, timeout=10)
-        if r.status_code == 200:
-            data = r.json()
+        status, data = get_json(url)
+        if status == 200:
             retry = data.get("retry_attempt")
             retries_allowed = data.get("run_options", {}).get("n_retries_allowed")
             return retry, retries_allowed
@@ -481,8 +677,21 @@ def main():
     parser.add_argument("--ensembles", default="all", help="Comma-separated ensembles or 'all' (medium_range only)")
     parser.add_argument("--csv", default="datastream_results.csv", help="Output CSV file")
     parser.add_argument("--charts_dir", default="charts", help="Directory to save charts")
+    parser.add_argument("--engine", choices=["thread", "async"], default="thread",
+                        help="Run checks on a 20-thread pool (default) or an asyncio engine with pooled connections")
+    parser.add_argument("--max_inflight", type=int, default=200,
+                        help="Runs checked concurrently by --engine async (default: 200)")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR, help="Directory for the local metadata cache")
+    parser.add_argument("--cache_max_mb", type=float, default=DEFAULT_MAX_MB,
+                        help="Size bound of the metadata cache in MiB, least recently used files are evicted")
 
     args = parser.parse_args()
+    if args.max_inflight < 1:
+        print("Error: --max_inflight must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    global content_cache
+    content_cache = ContentCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
 
     start_date = datetime.datetime.strptime(args.start, "%Y%m%d").date()
     end_date = datetime.datetime.strptime(args.end, "%Y%m%d").date()
@@ -519,27 +728,34 @@ def main():
     print("DEBUG row output:", row)
 
 
-    with ThreadPoolExecutor(max_workers=20) as executor:  # adjust worker count if needed
-        for current_date in daterange(start_date, end_date):
-            date_str = current_date.strftime("%Y%m%d")
-            for run_type in run_types:
-                allowed_hours = INIT_CYCLES_ALLOWED[run_type]
-                hours_to_check = allowed_hours if custom_cycles is None else [h for h in custom_cycles if h in allowed_hours]
-                for hour in hours_to_check:
-                    for vpu in vpus:
-                        if run_type == "medium_range":
-                            for ens in ensembles:
-                                tasks.append(
-                                    executor.submit(process_run, date_str, run_type, hour, vpu, ens, cached_urls, df_cache)
-                                )
-                        else:
-                            tasks.append(
-                                executor.submit(process_run, date_str, run_type, hour, vpu, None, cached_urls, df_cache)
-                            )
-
-        for future in as_completed(tasks):
-            row = future.result()
-            rows.append(row)
+    runs = []
+    for current_date in daterange(start_date, end_date):
+        date_str = current_date.strftime("%Y%m%d")
+        for run_type in run_types:
+            allowed_hours = INIT_CYCLES_ALLOWED[run_type]
+            hours_to_check = allowed_hours if custom_cycles is None else [h for h in custom_cycles if h in allowed_hours]
+            for hour in hours_to_check:
+                for vpu in vpus:
+                    if run_type == "medium_range":
+                        for ens in ensembles:
+                            runs.append((date_str, run_type, hour, vpu, ens))
+                    else:
+                        runs.append((date_str, run_type, hour, vpu, None))
+
+    if args.engine == "async":
+        print(f"Checking {len(runs)} runs with the async engine ({args.max_inflight} in flight)")
+        rows.extend(run_checks_async(runs, cached_urls, df_cache, args.max_inflight))
+    else:
+        with ThreadPoolExecutor(max_workers=20) as executor:  # adjust worker count if needed
+            for run in runs:
+                tasks.append(executor.submit(process_run, *run, cached_urls, df_cache))
+
+            for future in as_completed(tasks):
+                row = future.result()
+                rows.append(row)
+
+    content_cache.save()
+    print(content_cache.report())
 
     # Combine with cache and write CSV
     df_new = pd.DataFrame(rows)
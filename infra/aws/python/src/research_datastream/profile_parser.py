@@ -0,0 +1,184 @@
+"""
+Single-pass parser for NRDS profile.txt / profile_fp.txt files.
+
+A profile holds one "<STEP>_START: YYYYmmddHHMMSS" and one
+"<STEP>_END: YYYYmmddHHMMSS" line per profiled step. Timestamps are decoded
+by fixed-width slicing into integer seconds since the epoch (UTC), which is
+several times faster than datetime.strptime and makes durations plain
+integer subtraction.
+
+Usage:
+    profile = parse_profile(text)
+    profile.durations()          # {"DATASTREAM": 3512.0, ...}
+    profile.start_datetime()     # first *_START timestamp
+    df = load_profiles({"VPU_01": text_01, "VPU_02": text_02})
+"""
+
+import calendar
+import functools
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+TIMESTAMP_WIDTH = 14  # YYYYmmddHHMMSS
+EPOCH = datetime(1970, 1, 1)
+
+
+@functools.lru_cache(maxsize=4096)
+def _epoch_days(ymd: str) -> int:
+    """Days since 1970-01-01 for a YYYYmmdd string (proleptic Gregorian)."""
+    y, m, d = int(ymd[0:4]), int(ymd[4:6]), int(ymd[6:8])
+    if y < 1 or not (1 <= m <= 12 and 1 <= d <= calendar.monthrange(y, m)[1]):
+        raise ValueError(f"invalid date {ymd}")
+    y -= m <= 2
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (m + (-3 if m > 2 else 9)) + 2) // 5 + d - 1
+    return era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + doy - 719468
+
+
+def decode_timestamp(ts: str) -> int:
+    """
+    Decodes a YYYYmmddHHMMSS timestamp into seconds since the epoch.
+
+    Raises:
+        ValueError: The timestamp is not 14 digits or a field is out of range.
+    """
+    if len(ts) != TIMESTAMP_WIDTH or not ts.isdigit():
+        raise ValueError(f"expected {TIMESTAMP_WIDTH} digits, got '{ts}'")
+    h, mi, s = int(ts[8:10]), int(ts[10:12]), int(ts[12:14])
+    if h > 23 or mi > 59 or s > 59:
+        raise ValueError(f"invalid time {ts[8:]}")
+    return _epoch_days(ts[:8]) * 86400 + h * 3600 + mi * 60 + s
+
+
+class Profile(NamedTuple):
+    """
+    Parsed profile. steps are in order of first appearance; starts/ends are
+    epoch seconds (None when the line is missing). first_start is the first
+    *_START timestamp in the file.
+    """
+    steps: Tuple[str, ...]
+    starts: Tuple[Optional[int], ...]
+    ends: Tuple[Optional[int], ...]
+    first_start: Optional[int]
+
+    def duration(self, step: str, default=None):
+        """Seconds between a step's START and END, or default if either is missing."""
+        try:
+            i = self.steps.index(step)
+        except ValueError:
+            return default
+        if self.starts[i] is None or self.ends[i] is None:
+            return default
+        return float(self.ends[i] - self.starts[i])
+
+    def durations(self) -> Dict[str, float]:
+        """Durations in seconds of every complete step."""
+        return {step: float(end - start)
+                for step, start, end in zip(self.steps, self.starts, self.ends)
+                if start is not None and end is not None}
+
+    def start_datetime(self) -> Optional[datetime]:
+        """First *_START timestamp as a naive datetime, or None."""
+        if self.first_start is None:
+            return None
+        return EPOCH + timedelta(seconds=self.first_start)
+
+
+def parse_profile(content: str, warn: bool = True) -> Profile:
+    """
+    Parses a profile in one pass.
+
+    Args:
+        content (str): Text of profile.txt.
+        warn (bool): Print malformed timestamps and steps missing a START or END.
+
+    Returns:
+        Profile
+    """
+    index = {}
+    starts: List[Optional[int]] = []
+    ends: List[Optional[int]] = []
+    first_start = None
+    for line in content.splitlines():
+        name, sep, ts = line.partition(": ")
+        if not sep:
+            continue
+        if name.endswith("_START"):
+            step, is_start = name[:-6], True
+        elif name.endswith("_END"):
+            step, is_start = name[:-4], False
+        else:
+            continue
+        try:
+            seconds = decode_timestamp(ts.strip())
+        except ValueError as ve:
+            if warn:
+                print(f"Timestamp parsing error in line: '{line}' - {ve}")
+            continue
+        i = index.get(step)
+        if i is None:
+            i = index[step] = len(starts)
+            starts.append(None)
+            ends.append(None)
+        if is_start:
+            starts[i] = seconds
+            if first_start is None:
+                first_start = seconds
+        else:
+            ends[i] = seconds
+
+    steps = tuple(index)
+    if warn:
+        for step, start, end in zip(steps, starts, ends):
+            if start is None or end is None:
+                print(f"Missing start or end timestamp for step: {step}")
+    return Profile(steps, tuple(starts), tuple(ends), first_start)
+
+
+def duration_matrix(profiles: Sequence[Profile], steps: Optional[Iterable[str]] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    Stacks step durations of many profiles into one float64 matrix.
+
+    Args:
+        profiles: Parsed profiles, one per row.
+        steps: Column order. Defaults to every step in order of first appearance.
+
+    Returns:
+        tuple: (steps, matrix of shape (len(profiles), len(steps))), NaN where a
+               profile lacks a complete step.
+    """
+    if steps is None:
+        steps = dict.fromkeys(step for profile in profiles for step in profile.steps)
+    steps = list(steps)
+    column = {step: j for j, step in enumerate(steps)}
+    matrix = np.full((len(profiles), len(steps)), np.nan)
+    for i, profile in enumerate(profiles):
+        for step, start, end in zip(profile.steps, profile.starts, profile.ends):
+            j = column.get(step)
+            if j is not None and start is not None and end is not None:
+                matrix[i, j] = end - start
+    return steps, matrix
+
+
+def load_profiles(contents: Mapping[str, str], warn: bool = True) -> pd.DataFrame:
+    """
+    Parses many profiles into one columnar table.
+
+    Args:
+        contents: Key (e.g. VPU_02 or a profile path) -> profile text.
+
+    Returns:
+        pd.DataFrame: Indexed by key, one float64 duration column (seconds) per
+                      step plus a "start" datetime64 column.
+    """
+    keys = list(contents)
+    profiles = [parse_profile(contents[key], warn=warn) for key in keys]
+    steps, matrix = duration_matrix(profiles)
+    df = pd.DataFrame(matrix, index=pd.Index(keys, name="key"), columns=steps)
+    first = np.array([np.nan if p.first_start is None else p.first_start for p in profiles], dtype=float)
+    df["start"] = pd.to_datetime(first, unit="s").to_numpy()  # NaT where no START line
+    return df
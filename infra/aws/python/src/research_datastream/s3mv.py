@@ -8,28 +8,103 @@ jlaser@lynker.com
 """
 
 import argparse
+import collections
+import fnmatch
+import itertools
+import json
+import os
+import re
 import sys
+import queue
+from contextlib import contextmanager, nullcontext
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Tuple, Optional
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Tuple, Optional
 import boto3
 from botocore.exceptions import ClientError
 import threading
 from dataclasses import dataclass
 
+# Error codes worth retrying with backoff
+RETRYABLE_ERRORS = ['SlowDown', 'ServiceUnavailable', 'RequestTimeout']
+
+
+class S3Object(NamedTuple):
+    """A single listing entry, carrying only the fields the mover needs"""
+    key: str
+    size: int = 0
+    etag: Optional[str] = None
+    dest_key: Optional[str] = None  # Set when the move comes from a saved plan
+
+
+@dataclass
+class MoveConfig:
+    """Settings shared by every worker for the duration of a move"""
+    s3_client: object
+    source_bucket: str
+    dest_bucket: str
+    prefix_old: str
+    prefix_new: str
+    contains_pattern: Optional[str] = None
+    ignore_pattern: Optional[str] = None
+    replace_pattern: Optional[str] = None
+    with_pattern: Optional[str] = None
+    dry_run: bool = False
+    deleter: Optional["DeleteBatcher"] = None
+    multipart: Optional["MultipartCopier"] = None
+    limiter: Optional["AdaptiveLimiter"] = None
+    journal: Optional["MoveJournal"] = None
+    sync: Optional["SyncIndex"] = None
+    rules: Optional["RuleSet"] = None
+    verifier: Optional["Verifier"] = None
+    pool: Optional["PoolMonitor"] = None
+    progress_label: str = ""
+
 
 @dataclass
 class MoveStats:
-    """Thread-safe statistics tracker"""
-    def __init__(self):
-        self.total = 0
-        self.moved = 0
-        self.skipped = 0
-        self.errors = 0
-        self.lock = threading.Lock()
-        self.last_print = 0
+    """
+    Statistics tracker shared by many worker threads.
+    
+    Every thread counts into its own shard, registered once on first use, and
+    readers sum the shards, so recording an object takes no lock. Dry-run
+    samples go into bounded reservoirs (first N, last N and the first N that
+    match the replacement pattern), so memory stays flat however many keys
+    are previewed.
+    """
+    FIELDS = ('total', 'moved', 'skipped', 'errors', 'deleted', 'delete_errors',
+              'in_sync', 'samples', 'pattern_samples', 'verified', 'verify_failed')
+    (TOTAL, MOVED, SKIPPED, ERRORS, DELETED, DELETE_ERRORS,
+     IN_SYNC, SAMPLES, PATTERN_SAMPLES, VERIFIED, VERIFY_FAILED) = range(len(FIELDS))
+    
+    def __init__(self, sample_size: int = 2):
+        self.lock = threading.Lock()  # Only taken to register shards and fill the first-N reservoirs
+        self.local = threading.local()
+        self.shards: List[List[int]] = []
+        self.merged = self._new_shard()  # Counts folded in from worker processes
+        self.ticks = itertools.count(1)  # Progress ticker, one tick per finished object
         self.start_time = None
-        self.sample_moves = []  # Store sample moves for dry-run display
-        self.pattern_sample_moves = []  # Store samples that match the replacement pattern
+        self.sample_size = sample_size
+        self.first_samples = []  # Sample moves for dry-run display
+        self.last_samples = collections.deque(maxlen=sample_size)
+        self.pattern_samples = []  # Samples that match the replacement pattern
+    
+    def _new_shard(self) -> List[int]:
+        shard = [0] * len(self.FIELDS)
+        with self.lock:
+            self.shards.append(shard)
+        return shard
+    
+    def _shard(self) -> List[int]:
+        """This thread's counters; only this thread ever writes to them"""
+        try:
+            return self.local.shard
+        except AttributeError:
+            self.local.shard = self._new_shard()
+            return self.local.shard
+    
+    def _sum(self, *fields: int) -> Tuple[int, ...]:
+        shards = list(self.shards)
+        return tuple(sum(shard[field] for shard in shards) for field in fields)
     
     def start(self):
         """Mark the start time"""
@@ -38,58 +113,107 @@ class MoveStats:
     
     def add_sample_move(self, source_bucket: str, source_key: str, dest_bucket: str, dest_key: str, has_pattern: bool = False):
         """Add a sample move for dry-run display"""
-        with self.lock:
-            self.sample_moves.append((source_bucket, source_key, dest_bucket, dest_key))
-            if has_pattern:
-                self.pattern_sample_moves.append((source_bucket, source_key, dest_bucket, dest_key))
+        sample = (source_bucket, source_key, dest_bucket, dest_key)
+        shard = self._shard()
+        shard[self.SAMPLES] += 1
+        if len(self.first_samples) < self.sample_size:
+            with self.lock:
+                if len(self.first_samples) < self.sample_size:
+                    self.first_samples.append(sample)
+        self.last_samples.append(sample)
+        if has_pattern:
+            shard[self.PATTERN_SAMPLES] += 1
+            if len(self.pattern_samples) < self.sample_size:
+                with self.lock:
+                    if len(self.pattern_samples) < self.sample_size:
+                        self.pattern_samples.append(sample)
     
     def get_sample_moves(self, first_n: int = 2, last_n: int = 2):
-        """Get first N and last N sample moves"""
-        with self.lock:
-            total = len(self.sample_moves)
-            if total <= first_n + last_n:
-                return self.sample_moves, []
-            return self.sample_moves[:first_n], self.sample_moves[-last_n:]
+        """Get first N and last N sample moves (at most sample_size each)"""
+        count, = self._sum(self.SAMPLES)
+        first = self.first_samples[:first_n]
+        last = list(self.last_samples)[-last_n:] if last_n else []
+        if count <= first_n + last_n:
+            # Few enough that first and last overlap: return each sample once
+            return first + last[max(0, len(last) - (count - len(first))):], []
+        return first, last
     
     def get_pattern_samples(self, n: int = 2):
         """Get up to N samples that match the pattern"""
+        return self.pattern_samples[:n]
+    
+    def get_sample_counts(self) -> Tuple[int, int]:
+        """Number of (sampled moves, sampled moves matching the pattern)"""
+        return self._sum(self.SAMPLES, self.PATTERN_SAMPLES)
+    
+    def summary(self) -> dict:
+        """Counters and samples in a picklable form, for merging across processes"""
+        summary = dict(zip(self.FIELDS, self._sum(*range(len(self.FIELDS)))))
+        summary['first_samples'] = list(self.first_samples)
+        summary['last_samples'] = list(self.last_samples)
+        summary['pattern_sample_moves'] = list(self.pattern_samples)
+        return summary
+    
+    def merge(self, summary: dict) -> None:
+        """Fold in the summary() of a worker process"""
+        for field, name in enumerate(self.FIELDS):
+            self.merged[field] += summary[name]
         with self.lock:
-            return self.pattern_sample_moves[:n]
+            room = self.sample_size - len(self.first_samples)
+            self.first_samples.extend(summary['first_samples'][:room])
+            room = self.sample_size - len(self.pattern_samples)
+            self.pattern_samples.extend(summary['pattern_sample_moves'][:room])
+        self.last_samples.extend(summary['last_samples'])
     
     def increment_total(self):
-        with self.lock:
-            self.total += 1
+        self._shard()[self.TOTAL] += 1
+        self.local.tick = next(self.ticks)
     
     def increment_moved(self):
-        with self.lock:
-            self.moved += 1
+        self._shard()[self.MOVED] += 1
     
     def increment_skipped(self):
-        with self.lock:
-            self.skipped += 1
+        self._shard()[self.SKIPPED] += 1
     
     def increment_errors(self):
-        with self.lock:
-            self.errors += 1
+        self._shard()[self.ERRORS] += 1
+    
+    def add_deleted(self, n: int):
+        self._shard()[self.DELETED] += n
+    
+    def increment_delete_errors(self):
+        self._shard()[self.DELETE_ERRORS] += 1
+    
+    def increment_in_sync(self):
+        self._shard()[self.IN_SYNC] += 1
+    
+    def increment_verified(self):
+        self._shard()[self.VERIFIED] += 1
+    
+    def increment_verify_failed(self):
+        self._shard()[self.VERIFY_FAILED] += 1
+    
+    def get_verify_stats(self) -> Tuple[int, int]:
+        return self._sum(self.VERIFIED, self.VERIFY_FAILED)
+    
+    def get_in_sync(self) -> int:
+        return self._sum(self.IN_SYNC)[0]
+    
+    def get_delete_stats(self) -> Tuple[int, int]:
+        return self._sum(self.DELETED, self.DELETE_ERRORS)
     
     def get_stats(self) -> Tuple[int, int, int, int]:
-        with self.lock:
-            return self.total, self.moved, self.skipped, self.errors
+        return self._sum(self.TOTAL, self.MOVED, self.SKIPPED, self.ERRORS)
     
     def should_print_progress(self, interval: int = 1000) -> Tuple[bool, int]:
         """
-        Check if we should print progress (every N operations).
+        Check if we should print progress (every N operations), based on the
+        tick this thread drew in its last increment_total. Exactly one thread
+        draws each multiple of the interval, so no lock is needed.
         Returns tuple of (should_print, current_total)
         """
-        with self.lock:
-            # Calculate how many intervals have passed since last print
-            intervals_passed = (self.total // interval) - (self.last_print // interval)
-            
-            if intervals_passed >= 1:
-                # Update last_print to current interval boundary
-                self.last_print = (self.total // interval) * interval
-                return True, self.total
-            return False, self.total
+        tick = getattr(self.local, 'tick', 0)
+        return tick > 0 and tick % interval == 0, tick
     
     def get_rate(self) -> float:
         """Get current processing rate (files/second)"""
@@ -99,191 +223,2204 @@ class MoveStats:
         elapsed = time.time() - self.start_time
         if elapsed == 0:
             return 0.0
+        return self.get_stats()[0] / elapsed
+
+
+class MoveJournal:
+    """
+    Append-only checkpoint of completed source keys in a local SQLite file,
+    so an interrupted move can be resumed without re-copying finished keys.
+    
+    Completions are buffered and written in batches (every flush_size keys or
+    flush_interval seconds) to keep journaling off the hot path. A key is only
+    recorded once its source is gone, so anything lost from the buffer in a
+    crash is simply copied again on resume.
+    """
+    def __init__(self, path: str, flush_size: int = 1000, flush_interval: float = 5.0):
+        import sqlite3
+        import time
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.buffer: List[str] = []
+        self.last_flush = time.monotonic()
+        self.skipped = 0
+        self.lock = threading.Lock()
+        # Several --processes workers may share one journal file
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS completed (key TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS move (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+    
+    def bind(self, source_bucket: str, prefix_old: str, dest_bucket: str, prefix_new: str) -> bool:
+        """
+        Tie the journal to one move. Returns False if it was written by a
+        different move, in which case its keys must not be trusted.
+        """
+        move = {'source': f"s3://{source_bucket}/{prefix_old}", 'dest': f"s3://{dest_bucket}/{prefix_new}"}
+        with self.lock:
+            existing = dict(self.conn.execute("SELECT name, value FROM move").fetchall())
+            if existing and existing != move:
+                return False
+            self.conn.executemany("INSERT OR IGNORE INTO move VALUES (?, ?)", move.items())
+            self.conn.commit()
+        return True
+    
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM completed").fetchone()[0]
+    
+    def record(self, key: str) -> None:
+        self.record_many([key])
+    
+    def record_many(self, keys: List[str]) -> None:
+        import time
+        with self.lock:
+            self.buffer.extend(keys)
+            if (len(self.buffer) >= self.flush_size
+                    or time.monotonic() - self.last_flush >= self.flush_interval):
+                self._flush_locked()
+    
+    def flush(self) -> None:
+        with self.lock:
+            self._flush_locked()
+    
+    def _flush_locked(self) -> None:
+        import time
+        if self.buffer:
+            self.conn.executemany("INSERT OR IGNORE INTO completed VALUES (?)", ((k,) for k in self.buffer))
+            self.conn.commit()
+            self.buffer = []
+        self.last_flush = time.monotonic()
+    
+    def skip_completed(self, objects: Iterable[S3Object], chunk_size: int = 500) -> Iterator[S3Object]:
+        """Filter a listing down to the keys not yet recorded, one chunk at a time"""
+        chunk = []
+        for obj in objects:
+            chunk.append(obj)
+            if len(chunk) >= chunk_size:
+                yield from self._pending(chunk)
+                chunk = []
+        if chunk:
+            yield from self._pending(chunk)
+    
+    def _pending(self, chunk: List[S3Object]) -> List[S3Object]:
+        placeholders = ','.join('?' * len(chunk))
         with self.lock:
-            return self.total / elapsed
+            done = {row[0] for row in self.conn.execute(
+                f"SELECT key FROM completed WHERE key IN ({placeholders})", [obj.key for obj in chunk]
+            )}
+            self.skipped += len(done)
+        return [obj for obj in chunk if obj.key not in done]
+    
+    def close(self) -> None:
+        with self.lock:
+            self._flush_locked()
+            self.conn.close()
+
+
+class DeleteBatcher:
+    """
+    Collects source keys whose copy succeeded and removes them with
+    DeleteObjects in batches of up to 1000 keys, instead of one
+    delete_object call per key.
+    
+    Keys that fail to delete are put on a retry queue and folded into later
+    batches; keys that still fail after max_retries are reported as delete
+    errors and left in place (the copy at the destination is kept).
+    Deleted keys are recorded in the journal, if one is given.
+    """
+    MAX_BATCH_SIZE = 1000  # DeleteObjects limit
+    
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        stats: MoveStats,
+        batch_size: int = 1000,
+        max_retries: int = 3,
+        journal: Optional[MoveJournal] = None
+    ):
+        self.s3_client = s3_client
+        self.journal = journal
+        self.bucket = bucket
+        self.stats = stats
+        self.batch_size = min(batch_size, self.MAX_BATCH_SIZE)
+        self.max_retries = max_retries
+        self.pending: List[Tuple[str, int]] = []  # (key, attempts so far)
+        self.retry_queue: List[Tuple[str, int]] = []
+        self.lock = threading.Lock()
+    
+    def add(self, key: str) -> None:
+        """Queue a source key for deletion, sending a batch once it is full"""
+        batch = self.offer(key)
+        if batch:
+            self._delete_batch(batch)
+    
+    def offer(self, key: str) -> Optional[List[Tuple[str, int]]]:
+        """Queue a source key and return a full batch to send, if there is one"""
+        with self.lock:
+            self.pending.append((key, 0))
+            if len(self.pending) + len(self.retry_queue) >= self.batch_size:
+                return self._take_batch()
+        return None
+    
+    def next_flush_batch(self) -> Tuple[List[Tuple[str, int]], bool]:
+        """Pop the next batch while flushing. Returns (batch, contains_retries)."""
+        with self.lock:
+            had_retries = bool(self.retry_queue)
+            return self._take_batch(), had_retries
+    
+    def _take_batch(self) -> List[Tuple[str, int]]:
+        """Pop up to batch_size keys, retries first. Caller must hold the lock."""
+        batch = self.retry_queue[:self.batch_size]
+        self.retry_queue = self.retry_queue[len(batch):]
+        room = self.batch_size - len(batch)
+        batch.extend(self.pending[:room])
+        self.pending = self.pending[room:]
+        return batch
+    
+    def request(self, batch: List[Tuple[str, int]]) -> dict:
+        """DeleteObjects arguments for a batch"""
+        return {
+            'Bucket': self.bucket,
+            'Delete': {'Objects': [{'Key': key} for key, _ in batch], 'Quiet': True}
+        }
+    
+    @staticmethod
+    def failures_from_response(response: dict) -> dict:
+        # Quiet mode only reports the keys that failed
+        return {err['Key']: f"{err.get('Code', '')}: {err.get('Message', '')}"
+                for err in response.get('Errors', [])}
+    
+    def _delete_batch(self, batch: List[Tuple[str, int]]) -> None:
+        """Send one DeleteObjects request and record the per-key results"""
+        try:
+            response = self.s3_client.delete_objects(**self.request(batch))
+            failures = self.failures_from_response(response)
+        except ClientError as e:
+            failures = {key: str(e) for key, _ in batch}
+        self.record_results(batch, failures)
+    
+    def record_results(self, batch: List[Tuple[str, int]], failures: dict) -> None:
+        """Count deletes, journal them, and queue failed keys for another attempt"""
+        retries = []
+        for key, attempts in batch:
+            if key not in failures:
+                continue
+            if attempts + 1 < self.max_retries:
+                retries.append((key, attempts + 1))
+            else:
+                self.stats.increment_delete_errors()
+                print(f"[ERROR] Error deleting {key} after copy: {failures[key]}", file=sys.stderr)
+        
+        self.stats.add_deleted(len(batch) - len(failures))
+        if self.journal is not None:
+            self.journal.record_many([key for key, _ in batch if key not in failures])
+        if retries:
+            with self.lock:
+                self.retry_queue.extend(retries)
+    
+    def flush(self) -> None:
+        """Delete everything still queued, including retries, with backoff"""
+        import time
+        retry_delay = 1
+        while True:
+            batch, had_retries = self.next_flush_batch()
+            if not batch:
+                return
+            if had_retries:
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+            self._delete_batch(batch)
+
+
+class VerifyEntry(NamedTuple):
+    """A finished copy waiting for verification"""
+    source_key: str
+    dest_key: str
+    size: int
+    etag: Optional[str]
+    check_etag: bool
+
+
+class Verifier:
+    """
+    Checks each copy against the source listing (size, and ETag where it is
+    comparable) before the source is deleted.
+    
+    Copied keys are queued and verified in batches on a dedicated pool, off
+    the copy workers. Within a batch, keys that share a destination
+    directory are checked with one ListObjectsV2 call on that directory once
+    there are at least list_threshold of them; the rest get a HEAD each.
+    Keys that pass are handed to on_verified (which deletes the source);
+    keys that fail go to on_failed and their source is kept.
+    """
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        on_verified,
+        on_failed,
+        threads: int = 10,
+        batch_size: int = 100,
+        list_threshold: int = 4,
+        max_retries: int = 3,
+        compare_etag: bool = True
+    ):
+        self.s3_client = s3_client
+        self.compare_etag = compare_etag
+        self.bucket = bucket
+        self.on_verified = on_verified
+        self.on_failed = on_failed
+        self.batch_size = batch_size
+        self.list_threshold = list_threshold
+        self.max_retries = max_retries
+        self.pending: List[VerifyEntry] = []
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="s3mv-verify")
+        # Bounds the batches in flight so a slow destination pushes back on the copies
+        self.slots = threading.BoundedSemaphore(threads * 2)
+        self.futures = set()
+        self.checked = 0
+        self.heads = 0
+        self.lists = 0
+        self.busy_since = None
+        self.busy_until = None
+        self.latencies = collections.deque(maxlen=100000)  # Seconds per verification request
+    
+    def add(self, source_key: str, dest_key: str, size: int, etag: Optional[str], single_copy: bool = True) -> None:
+        """
+        Queue a finished copy. The ETag is only compared for single
+        CopyObject copies of single-part sources, where S3 keeps it.
+        """
+        check_etag = self.compare_etag and single_copy and bool(etag) and '-' not in etag
+        with self.lock:
+            self.pending.append(VerifyEntry(source_key, dest_key, size, etag, check_etag))
+            if len(self.pending) < self.batch_size:
+                return
+            batch, self.pending = self.pending, []
+        self._submit(batch)
+    
+    def _submit(self, batch: List[VerifyEntry]) -> None:
+        self.slots.acquire()
+        future = self.executor.submit(self._verify_batch, batch)
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self._batch_done)
+    
+    def _batch_done(self, future) -> None:
+        self.slots.release()
+        with self.lock:
+            self.futures.discard(future)
+        if future.exception() is not None:
+            print(f"[ERROR] Verification batch failed: {future.exception()}", file=sys.stderr)
+    
+    def _timed(self, call, **kwargs):
+        """Run one request with retries on throttling, recording its latency"""
+        import time
+        retry_delay = 1
+        for attempt in range(self.max_retries):
+            start = time.monotonic()
+            try:
+                return call(**kwargs)
+            except ClientError as e:
+                error_code = e.response.get('Error', {}).get('Code', '')
+                if error_code in RETRYABLE_ERRORS and attempt < self.max_retries - 1:
+                    time.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, 30)
+                    continue
+                raise
+            finally:
+                self.latencies.append(time.monotonic() - start)
+    
+    def _head(self, key: str) -> Optional[Tuple[int, Optional[str]]]:
+        with self.lock:
+            self.heads += 1
+        try:
+            head = self._timed(self.s3_client.head_object, Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code', '') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return head.get('ContentLength', 0), head.get('ETag')
+    
+    def _list(self, directory: str, last_key: str) -> dict:
+        """Size and ETag of the objects directly under a directory, up to last_key"""
+        found = {}
+        kwargs = {'Bucket': self.bucket, 'Prefix': directory, 'Delimiter': '/'}
+        while True:
+            with self.lock:
+                self.lists += 1
+            page = self._timed(self.s3_client.list_objects_v2, **kwargs)
+            for obj in page.get('Contents', []):
+                found[obj['Key']] = (obj.get('Size', 0), obj.get('ETag'))
+            # Keys come back in order, so stop once the batch is covered
+            if not page.get('IsTruncated') or max(found, default='') >= last_key:
+                return found
+            kwargs['ContinuationToken'] = page['NextContinuationToken']
+    
+    def _check(self, entry: VerifyEntry, meta: Optional[Tuple[int, Optional[str]]]) -> Optional[str]:
+        """Why a copy does not match its source, or None if it does"""
+        if meta is None:
+            return "destination object not found"
+        size, etag = meta
+        if size != entry.size:
+            return f"size {size} != source size {entry.size}"
+        if entry.check_etag and etag and etag != entry.etag:
+            return f"ETag {etag} != source ETag {entry.etag}"
+        return None
+    
+    def _verify_batch(self, batch: List[VerifyEntry]) -> None:
+        import time
+        now = time.monotonic()
+        with self.lock:
+            if self.busy_since is None:
+                self.busy_since = now
+        
+        by_directory = collections.defaultdict(list)
+        for entry in batch:
+            by_directory[entry.dest_key.rpartition('/')[0] + '/'].append(entry)
+        
+        for directory, entries in by_directory.items():
+            listed = None
+            if len(entries) >= self.list_threshold:
+                try:
+                    listed = self._list(directory, max(e.dest_key for e in entries))
+                except ClientError as e:
+                    print(f"[ERROR] Error listing {directory} for verification: {e}", file=sys.stderr)
+            for entry in entries:
+                try:
+                    meta = listed.get(entry.dest_key) if listed is not None else None
+                    if meta is None:
+                        meta = self._head(entry.dest_key)
+                    problem = self._check(entry, meta)
+                except ClientError as e:
+                    problem = f"verification request failed: {e}"
+                if problem is None:
+                    self.on_verified(entry.source_key)
+                else:
+                    self.on_failed(entry.source_key, f"{entry.dest_key}: {problem}")
+        
+        with self.lock:
+            self.checked += len(batch)
+            self.busy_until = time.monotonic()
+    
+    def flush(self) -> None:
+        """Verify whatever is still queued and wait for every batch"""
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if batch:
+            self._submit(batch)
+        while True:
+            with self.lock:
+                futures = list(self.futures)
+            if not futures:
+                break
+            for future in futures:
+                future.exception()
+        self.executor.shutdown(wait=True)
+    
+    def get_report(self) -> Tuple[int, float, float, float, int, int]:
+        """(keys checked, keys/sec while verifying, p50 and p99 request latency in ms, HEADs, LISTs)"""
+        with self.lock:
+            checked = self.checked
+            elapsed = (self.busy_until - self.busy_since) if self.busy_since and self.busy_until else 0.0
+            latencies = sorted(self.latencies)
+        rate = checked / elapsed if elapsed > 0 else 0.0
+        if not latencies:
+            return checked, rate, 0.0, 0.0, self.heads, self.lists
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        return checked, rate, p50, p99, self.heads, self.lists
+
+
+class MultipartCopier:
+    """
+    Server-side copy for large objects using multipart upload_part_copy.
+    
+    CopyObject is limited to 5 GB, so objects at or above the threshold are
+    copied as byte ranges in parallel on a dedicated part pool (separate from
+    the worker pool so a worker waiting on its parts can never starve them).
+    """
+    MAX_SINGLE_COPY_SIZE = 5 * 1024 ** 3  # CopyObject limit
+    MIN_PART_SIZE = 5 * 1024 ** 2  # S3 minimum for every part but the last
+    MAX_PARTS = 10000
+    
+    # Headers that CopyObject carries over but CreateMultipartUpload does not
+    COPIED_HEADERS = ['ContentType', 'ContentEncoding', 'ContentDisposition',
+                      'ContentLanguage', 'CacheControl', 'Metadata']
+    
+    def __init__(self, threshold: int, part_size: int, part_threads: int, max_retries: int = 3):
+        self.threshold = min(threshold, self.MAX_SINGLE_COPY_SIZE)
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self.max_retries = max_retries
+        self.part_threads = part_threads
+        self.executor = ThreadPoolExecutor(max_workers=part_threads, thread_name_prefix="s3mv-part")
+    
+    def should_use(self, size: int) -> bool:
+        return size >= self.threshold
+    
+    def part_ranges(self, size: int) -> List[Tuple[int, int, int]]:
+        """(part_number, first_byte, last_byte) for each part, within MAX_PARTS"""
+        part_size = max(self.part_size, -(-size // self.MAX_PARTS))
+        return [
+            (i + 1, start, min(start + part_size, size) - 1)
+            for i, start in enumerate(range(0, size, part_size))
+        ]
+    
+    def copy(self, s3_client, source_bucket: str, source_key: str, dest_bucket: str, dest_key: str, size: int) -> None:
+        """Copy one object in parallel parts, aborting the upload on failure"""
+        import time
+        head = s3_client.head_object(Bucket=source_bucket, Key=source_key)
+        create_kwargs = {k: head[k] for k in self.COPIED_HEADERS if head.get(k)}
+        upload_id = s3_client.create_multipart_upload(
+            Bucket=dest_bucket, Key=dest_key, **create_kwargs
+        )['UploadId']
+        copy_source = {'Bucket': source_bucket, 'Key': source_key}
+        
+        def copy_part(part: Tuple[int, int, int]) -> dict:
+            part_number, first, last = part
+            retry_delay = 1
+            for attempt in range(self.max_retries):
+                try:
+                    response = s3_client.upload_part_copy(
+                        Bucket=dest_bucket,
+                        Key=dest_key,
+                        UploadId=upload_id,
+                        PartNumber=part_number,
+                        CopySource=copy_source,
+                        CopySourceRange=f"bytes={first}-{last}"
+                    )
+                    return {'PartNumber': part_number, 'ETag': response['CopyPartResult']['ETag']}
+                except ClientError as e:
+                    error_code = e.response.get('Error', {}).get('Code', '')
+                    if error_code in RETRYABLE_ERRORS and attempt < self.max_retries - 1:
+                        time.sleep(retry_delay)
+                        retry_delay *= 2
+                        continue
+                    raise
+        
+        try:
+            parts = list(self.executor.map(copy_part, self.part_ranges(size)))
+            s3_client.complete_multipart_upload(
+                Bucket=dest_bucket,
+                Key=dest_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            try:
+                s3_client.abort_multipart_upload(Bucket=dest_bucket, Key=dest_key, UploadId=upload_id)
+            except ClientError as e:
+                print(f"[ERROR] Could not abort multipart upload for {dest_key}: {e}", file=sys.stderr)
+            raise
+    
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD (additive increase, multiplicative decrease) concurrency control,
+    tracked separately per key prefix because S3 throttles per prefix.
+    
+    Every request takes a slot for its prefix. Each clean response raises
+    that prefix's limit by 1/limit (about +1 per window of requests); a
+    SlowDown/ServiceUnavailable response, or one that botocore had to retry,
+    halves it, at most once per cooldown so a burst of throttles from one
+    window only counts once.
+    """
+    THROTTLE_ERRORS = ['SlowDown', 'ServiceUnavailable']
+    
+    def __init__(
+        self,
+        initial_limit: int,
+        max_limit: int,
+        prefix_depth: int = 3,
+        min_limit: int = 1,
+        cooldown: float = 1.0,
+        max_retries: int = 10
+    ):
+        self.initial_limit = float(max(min(initial_limit, max_limit), min_limit))
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.prefix_depth = prefix_depth
+        self.cooldown = cooldown
+        self.max_retries = max_retries
+        # prefix -> [limit, inflight, last_decrease]
+        self.prefixes = {}
+        self.inflight = 0
+        self.throttles = 0
+        self.condition = threading.Condition()
+    
+    def partition(self, key: str) -> str:
+        return '/'.join(key.split('/', self.prefix_depth)[:self.prefix_depth])
+    
+    def acquire(self, prefix: str) -> None:
+        with self.condition:
+            state = self.prefixes.get(prefix)
+            if state is None:
+                state = self.prefixes[prefix] = [self.initial_limit, 0, 0.0]
+            while state[1] >= int(state[0]):
+                self.condition.wait()
+            state[1] += 1
+            self.inflight += 1
+    
+    def release(self, prefix: str, throttled: bool) -> None:
+        import time
+        with self.condition:
+            state = self.prefixes[prefix]
+            state[1] -= 1
+            self.inflight -= 1
+            if throttled:
+                self.throttles += 1
+                now = time.monotonic()
+                if now - state[2] >= self.cooldown:
+                    state[0] = max(self.min_limit, state[0] / 2)
+                    state[2] = now
+            else:
+                state[0] = min(self.max_limit, state[0] + 1 / state[0])
+            self.condition.notify_all()
+    
+    @contextmanager
+    def slot(self, key: str):
+        """
+        Hold a concurrency slot for the key's prefix for the duration of one
+        request. The yielded dict can be flagged {'throttled': True} by the
+        caller, e.g. when botocore retried the request internally.
+        """
+        prefix = self.partition(key)
+        self.acquire(prefix)
+        outcome = {'throttled': False}
+        try:
+            yield outcome
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code', '') in self.THROTTLE_ERRORS:
+                outcome['throttled'] = True
+            raise
+        finally:
+            self.release(prefix, outcome['throttled'])
+    
+    @staticmethod
+    def was_retried(response: dict) -> bool:
+        return response.get('ResponseMetadata', {}).get('RetryAttempts', 0) > 0
+    
+    def get_concurrency(self) -> Tuple[int, int, float, int]:
+        """Returns (requests in flight, prefixes seen, mean prefix limit, throttled responses)"""
+        with self.condition:
+            n_prefixes = len(self.prefixes)
+            mean_limit = sum(state[0] for state in self.prefixes.values()) / n_prefixes if n_prefixes else self.initial_limit
+            return self.inflight, n_prefixes, mean_limit, self.throttles
+
+
+class PoolMonitor:
+    """
+    Reports how busy a client's connection pool is, from botocore events:
+    requests on the wire (before-send to response-received), their peak,
+    sends made while every pooled connection was already busy, and the
+    urllib3 "Connection pool is full" discards those cause (which are
+    counted here instead of being logged as warnings).
+    """
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.peak = 0
+        self.over = 0
+        self.discarded = 0
+    
+    def attach(self, s3_client) -> "PoolMonitor":
+        s3_client.meta.events.register('before-send.s3', self._sent)
+        s3_client.meta.events.register('response-received.s3', self._received)
+        import logging
+        logging.getLogger('urllib3.connectionpool').addFilter(self)
+        return self
+    
+    def _sent(self, **kwargs) -> None:
+        with self.lock:
+            if self.inflight >= self.pool_size:
+                self.over += 1
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+    
+    def _received(self, **kwargs) -> None:
+        with self.lock:
+            self.inflight -= 1
+    
+    def filter(self, record) -> bool:
+        """logging filter: count pool-full warnings and drop them"""
+        if 'Connection pool is full' in record.getMessage():
+            with self.lock:
+                self.discarded += 1
+            return False
+        return True
+    
+    def get_report(self) -> Tuple[int, int, int, int, int]:
+        """(in flight, pool size, peak in flight, sends over the pool, connections discarded)"""
+        with self.lock:
+            return self.inflight, self.pool_size, self.peak, self.over, self.discarded
+
+
+class SyncIndex:
+    """
+    Destination listing for --sync, used to skip copies whose destination
+    already holds an identical object (same size and ETag).
+    
+    The destination is listed on a background thread while the source
+    listing proceeds; lookups block until the destination listing is done.
+    """
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        prefix: str,
+        depth: int = 0,
+        threads: int = 1,
+        delete_synced: bool = False
+    ):
+        self.delete_synced = delete_synced
+        self.objects = {}
+        self.error: Optional[BaseException] = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(
+            target=self._load, args=(s3_client, bucket, prefix, depth, threads),
+            name="s3mv-sync-index", daemon=True
+        )
+        self.thread.start()
+    
+    def _load(self, s3_client, bucket: str, prefix: str, depth: int, threads: int) -> None:
+        try:
+            for obj in select_listing(s3_client, bucket, prefix, depth, threads):
+                self.objects[obj.key] = (obj.size, obj.etag)
+            print(f"Destination index: {len(self.objects):,} objects at s3://{bucket}/{prefix}/")
+        except BaseException as e:  # SystemExit from the listing included
+            self.error = e
+        finally:
+            self.ready.set()
+    
+    def wait(self) -> None:
+        self.ready.wait()
+        if self.error is not None:
+            raise RuntimeError(f"Destination listing failed: {self.error}")
+    
+    def is_in_sync(self, obj: S3Object, dest_key: str) -> bool:
+        """True if dest_key exists with the same size and ETag as the source"""
+        self.wait()
+        existing = self.objects.get(dest_key)
+        if existing is None:
+            return False
+        size, etag = existing
+        if size != obj.size:
+            return False
+        # Multipart ETags depend on the part size used for the copy, so a
+        # size match is the best available check when either side is multipart
+        if not obj.etag or not etag or '-' in obj.etag or '-' in etag:
+            return True
+        return etag == obj.etag
+
+
+class RuleSet:
+    """
+    Ordered filter and rewrite rules loaded from a JSON rules file, so one
+    listing pass can apply a whole reorganisation. Rules see the key path
+    below --prefix_old, e.g. ngen.20250101/SHORT_RANGE/00/VPU_01/ngen-run.tar.gz
+    
+        {
+          "default": "include",
+          "filters": [
+            {"exclude": "*/datastream-metadata/*"},
+            {"include": "re:/VPU_(0[1-9]|1[0-8])/"}
+          ],
+          "rewrites": [
+            {"replace": "metadata.csv/", "with": ""},
+            {"regex": "(?<=/)[A-Z_]+_(RANGE|ASSIM)(?=/)", "case": "lower"}
+          ]
+        }
+    
+    Filter patterns are globs (fnmatch, matched against the whole path) or,
+    with a "re:" prefix, regular expressions (searched anywhere in the path).
+    All filters are compiled into one alternation of named groups, so a key
+    is classified with a single match and the first rule that matches wins;
+    keys matching no filter get the default action.
+    
+    Rewrites apply in file order, each to the output of the previous one:
+    "replace" substitutes a literal string, "regex" substitutes a pattern
+    with "with" (backreferences allowed) or changes its case with "case".
+    """
+    def __init__(self, filters: List[dict], rewrites: List[dict], default: str = 'include'):
+        if default not in ('include', 'exclude'):
+            raise ValueError(f"default must be 'include' or 'exclude', not {default!r}")
+        self.default = default == 'include'
+        # Kept so the rules can be rebuilt in --processes workers (the compiled rewriters do not pickle)
+        self.spec = (filters, rewrites, default)
+        self.n_filters = len(filters)
+        self.n_rewrites = len(rewrites)
+        
+        # Group name -> include?, for the rule that matched
+        self.actions = {}
+        alternatives = []
+        for i, rule in enumerate(filters):
+            if len(rule) != 1 or next(iter(rule)) not in ('include', 'exclude'):
+                raise ValueError(f"filter {i + 1} must be {{\"include\": pattern}} or {{\"exclude\": pattern}}: {rule}")
+            action, pattern = next(iter(rule.items()))
+            if pattern.startswith('re:'):
+                try:
+                    re.compile(pattern[3:])
+                except re.error as e:
+                    raise ValueError(f"filter {i + 1}: invalid regex {pattern[3:]!r}: {e}")
+                regex = f"(?s:.*?)(?:{pattern[3:]})"
+            else:
+                regex = fnmatch.translate(pattern)
+            name = f"_rule{i}"
+            self.actions[name] = action == 'include'
+            alternatives.append(f"(?P<{name}>{regex})")
+        self.matcher = re.compile('|'.join(alternatives)) if alternatives else None
+        
+        self.rewriters = []
+        for i, rule in enumerate(rewrites):
+            if 'replace' in rule:
+                old, new = rule['replace'], rule.get('with', '')
+                self.rewriters.append(lambda path, old=old, new=new: path.replace(old, new))
+                continue
+            if 'regex' not in rule:
+                raise ValueError(f"rewrite {i + 1} needs \"replace\" or \"regex\": {rule}")
+            try:
+                regex = re.compile(rule['regex'])
+            except re.error as e:
+                raise ValueError(f"rewrite {i + 1}: invalid regex {rule['regex']!r}: {e}")
+            case = rule.get('case')
+            if case is not None:
+                if case not in ('lower', 'upper'):
+                    raise ValueError(f"rewrite {i + 1}: case must be 'lower' or 'upper', not {case!r}")
+                repl = (lambda m: m.group(0).lower()) if case == 'lower' else (lambda m: m.group(0).upper())
+            elif 'with' in rule:
+                repl = rule['with']
+            else:
+                raise ValueError(f"rewrite {i + 1} needs \"with\" or \"case\": {rule}")
+            self.rewriters.append(lambda path, regex=regex, repl=repl: regex.sub(repl, path))
+    
+    def __reduce__(self):
+        return RuleSet, self.spec
+    
+    @classmethod
+    def from_file(cls, path: str) -> "RuleSet":
+        with open(path) as f:
+            rules = json.load(f)
+        return cls(rules.get('filters', []), rules.get('rewrites', []), rules.get('default', 'include'))
+    
+    def accepts(self, relative_path: str) -> bool:
+        """Whether the first matching filter (or the default) includes this path"""
+        if self.matcher is None:
+            return self.default
+        match = self.matcher.match(relative_path)
+        if match is None:
+            return self.default
+        return self.actions[match.lastgroup]
+    
+    def rewrite(self, relative_path: str) -> str:
+        for rewriter in self.rewriters:
+            relative_path = rewriter(relative_path)
+        return relative_path
 
 
 def should_process_object(
     key: str,
     contains_pattern: Optional[str],
-    ignore_pattern: Optional[str]
+    ignore_pattern: Optional[str],
+    rules: Optional[RuleSet] = None,
+    prefix: str = ''
 ) -> Tuple[bool, Optional[str]]:
     """
-    Determine if an object should be processed based on patterns.
+    Determine if an object should be processed based on patterns.
+    
+    Returns:
+        Tuple of (should_process, skip_reason)
+    """
+    # Check contains pattern
+    if contains_pattern and contains_pattern not in key:
+        return False, f"does not contain required pattern '{contains_pattern}'"
+    
+    # Check ignore pattern
+    if ignore_pattern and ignore_pattern in key:
+        return False, f"matches ignore pattern '{ignore_pattern}'"
+    
+    # Check the rules file filters, which see the path below the source prefix
+    if rules is not None and not rules.accepts(key[len(prefix):].lstrip('/')):
+        return False, "excluded by rules"
+    
+    return True, None
+
+
+def move_object(
+    s3_client,
+    source_bucket: str,
+    dest_bucket: str,
+    source_key: str,
+    dest_key: str,
+    dry_run: bool,
+    stats: Optional[MoveStats] = None,
+    replace_pattern: Optional[str] = None,
+    deleter: Optional[DeleteBatcher] = None,
+    size: int = 0,
+    multipart: Optional[MultipartCopier] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    verifier: Optional[Verifier] = None,
+    etag: Optional[str] = None
+) -> Tuple[bool, Optional[str]]:
+    """
+    Move a single S3 object using copy + delete (same as 'aws s3 mv').
+    Supports both same-bucket and cross-bucket moves.
+    Includes retry logic for rate limiting and transient errors.
+    When a deleter is given, the source is queued for a batched delete
+    instead of being deleted immediately. Objects whose listed size is at
+    or above the multipart threshold are copied in parallel parts.
+    With a limiter, each request waits for a slot on its prefix and
+    throttling is retried for longer since the limiter backs off for us.
+    With a verifier, the copy is queued for verification and the verifier
+    deletes the source once the copy checks out.
+    
+    Returns:
+        Tuple of (success, error_message)
+    """
+    if dry_run:
+        # Record sample move for display
+        if stats:
+            has_pattern = replace_pattern and replace_pattern in source_key
+            stats.add_sample_move(source_bucket, source_key, dest_bucket, dest_key, has_pattern)
+        return True, None
+    
+    import time
+    max_retries = limiter.max_retries if limiter is not None else 3
+    retry_delay = 1  # Start with 1 second
+    
+    def request_slot():
+        return limiter.slot(source_key) if limiter is not None else nullcontext({})
+    
+    for attempt in range(max_retries):
+        try:
+            # Copy object (server-side copy for same region, otherwise downloads/uploads)
+            single_copy = multipart is None or not multipart.should_use(size)
+            with request_slot() as outcome:
+                if not single_copy:
+                    multipart.copy(s3_client, source_bucket, source_key, dest_bucket, dest_key, size)
+                else:
+                    copy_source = {'Bucket': source_bucket, 'Key': source_key}
+                    response = s3_client.copy_object(
+                        CopySource=copy_source,
+                        Bucket=dest_bucket,
+                        Key=dest_key
+                    )
+                    outcome['throttled'] = AdaptiveLimiter.was_retried(response)
+            
+            # Delete original
+            if verifier is not None:
+                verifier.add(source_key, dest_key, size, etag, single_copy)
+            elif deleter is not None:
+                deleter.add(source_key)
+            else:
+                with request_slot() as outcome:
+                    response = s3_client.delete_object(Bucket=source_bucket, Key=source_key)
+                    outcome['throttled'] = AdaptiveLimiter.was_retried(response)
+            
+            return True, None
+        
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', '')
+            
+            # Retry on throttling or transient errors
+            if error_code in RETRYABLE_ERRORS and attempt < max_retries - 1:
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)  # Exponential backoff
+                continue
+            
+            error_msg = f"Error moving {source_key}: {str(e)}"
+            return False, error_msg
+    
+    return False, f"Failed after {max_retries} retries"
+
+
+
+
+def print_progress(
+    stats: MoveStats,
+    limiter: Optional[AdaptiveLimiter] = None,
+    label: str = "",
+    pool: Optional[PoolMonitor] = None
+) -> None:
+    """Print a single progress line from the current statistics"""
+    total, moved, skipped, errors = stats.get_stats()
+    rate = stats.get_rate()
+    line = f"{label}Progress: {total:,} processed | {moved:,} moved | {skipped:,} skipped | {errors:,} errors | Rate: {rate:.1f} files/sec"
+    if limiter is not None:
+        inflight, n_prefixes, mean_limit, throttles = limiter.get_concurrency()
+        line += (f" | Concurrency: {inflight} in flight over {n_prefixes:,} prefixes "
+                 f"(avg limit {mean_limit:.1f}, {throttles:,} throttled)")
+    if pool is not None:
+        inflight, pool_size, peak, over, discarded = pool.get_report()
+        line += f" | Pool: {inflight}/{pool_size} busy (peak {peak}, {over:,} over, {discarded:,} discarded)"
+    print(line)
+
+
+def compute_dest_key(object_key: str, config: MoveConfig) -> str:
+    """Rewrite a source key into its destination key"""
+    relative_path = object_key[len(config.prefix_old):].lstrip('/')
+    
+    # Apply pattern replacement if specified
+    if config.replace_pattern is not None:
+        # Allow empty string for with_pattern (to delete the pattern)
+        replacement = config.with_pattern if config.with_pattern is not None else ""
+        relative_path = relative_path.replace(config.replace_pattern, replacement)
+    
+    if config.rules is not None:
+        relative_path = config.rules.rewrite(relative_path)
+    
+    return f"{config.prefix_new}/{relative_path}"
+
+
+def is_self_move(config: MoveConfig, object_key: str, dest_key: str) -> bool:
+    """
+    True if the destination is the source object itself (e.g. an unchanged key
+    with --prefix_new equal to --prefix_old). Such an object is already in
+    place: it is never copied, never counted as in sync and never deleted.
+    """
+    return config.dest_bucket == config.source_bucket and dest_key == object_key
+
+
+def delete_source(config: MoveConfig, object_key: str) -> Tuple[bool, Optional[str]]:
+    """Remove a source object whose destination copy is already in place"""
+    if config.deleter is not None:
+        config.deleter.add(object_key)
+        return True, None
+    try:
+        config.s3_client.delete_object(Bucket=config.source_bucket, Key=object_key)
+    except ClientError as e:
+        return False, f"Error deleting {object_key}: {e}"
+    if config.journal is not None:
+        config.journal.record(object_key)
+    return True, None
+
+
+def record_outcome(
+    config: MoveConfig,
+    stats: MoveStats,
+    progress_interval: int,
+    object_key: Optional[str] = None,
+    success: bool = True,
+    error: Optional[str] = None,
+    skipped: bool = False
+) -> None:
+    """Count one finished object, journal it, and print progress if due"""
+    stats.increment_total()
+    if skipped:
+        stats.increment_skipped()
+    elif success:
+        # A verified copy only counts as moved once the verifier passes it
+        if config.verifier is None:
+            stats.increment_moved()
+        # With batched or verified deletes the key is journaled once its source is deleted
+        if config.journal is not None and config.deleter is None and config.verifier is None and not config.dry_run:
+            config.journal.record(object_key)
+    else:
+        stats.increment_errors()
+        # Always print errors
+        print(f"[ERROR] {error}", file=sys.stderr)
+    
+    # Print progress after incrementing
+    should_print, current_total = stats.should_print_progress(progress_interval)
+    if should_print:
+        print_progress(stats, config.limiter, config.progress_label, config.pool)
+
+
+def process_object(
+    obj: S3Object,
+    config: MoveConfig,
+    stats: MoveStats,
+    progress_interval: int
+) -> None:
+    """
+    Process a single object (check patterns and move if needed).
+    This function is called by worker threads.
+    """
+    object_key = obj.key
+    
+    # Check if object should be processed
+    should_process, skip_reason = should_process_object(
+        object_key, config.contains_pattern, config.ignore_pattern, config.rules, config.prefix_old
+    )
+    
+    if not should_process:
+        record_outcome(config, stats, progress_interval, skipped=True)
+        return
+    
+    # Calculate new key
+    new_key = obj.dest_key or compute_dest_key(object_key, config)
+    if is_self_move(config, object_key, new_key):
+        record_outcome(config, stats, progress_interval, skipped=True)
+        return
+    
+    # In sync mode, identical objects already at the destination are not copied again
+    if config.sync is not None and config.sync.is_in_sync(obj, new_key):
+        stats.increment_in_sync()
+        if config.sync.delete_synced and not config.dry_run:
+            success, error = delete_source(config, object_key)
+            if not success:
+                stats.increment_errors()
+                print(f"[ERROR] {error}", file=sys.stderr)
+        record_outcome(config, stats, progress_interval, skipped=True)
+        return
+    
+    # Move the object
+    success, error = move_object(
+        config.s3_client, config.source_bucket, config.dest_bucket, object_key, new_key,
+        config.dry_run, stats, config.replace_pattern, config.deleter,
+        obj.size, config.multipart, config.limiter, config.verifier, obj.etag
+    )
+    record_outcome(config, stats, progress_interval, object_key, success, error)
+
+
+def iter_objects(s3_client, bucket: str, prefix: str, verbose: bool = True) -> Iterator[S3Object]:
+    """
+    Lazily list all objects with the given prefix, one paginator page at a time.
+    Objects are yielded as soon as their page arrives, so callers can start
+    work before the listing is finished.
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    
+    if verbose:
+        print(f"Listing objects at s3://{bucket}/{prefix}/...")
+    
+    # Ensure prefix ends with / for proper filtering
+    search_prefix = f"{prefix}/" if not prefix.endswith('/') else prefix
+    
+    try:
+        page_count = 0
+        listed = 0
+        for page in paginator.paginate(Bucket=bucket, Prefix=search_prefix):
+            if 'Contents' in page:
+                page_count += 1
+                for obj in page['Contents']:
+                    # Double-check that the object actually starts with our prefix/
+                    # This prevents matching "v2.2abc/" when we want "v2.2/"
+                    if obj['Key'].startswith(search_prefix):
+                        listed += 1
+                        yield S3Object(obj['Key'], obj.get('Size', 0), obj.get('ETag'))
+                
+                # Print progress every 10 pages (10,000 objects)
+                if verbose and page_count % 10 == 0:
+                    print(f"  Listed {listed:,} objects so far...")
+    
+    except ClientError as e:
+        print(f"Error listing objects: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def discover_shards(
+    s3_client,
+    bucket: str,
+    prefix: str,
+    depth: int,
+    threads: int
+) -> Tuple[List[str], List[S3Object]]:
+    """
+    Walk the prefix hierarchy with Delimiter='/' down to the given depth,
+    listing every level concurrently.
+    
+    The NRDS layout (ngen.YYYYMMDD/<run_type>/<init>/[member/]VPU_xx/) fans out
+    quickly, so a depth of 3-4 yields hundreds of independent shards.
+    
+    Returns:
+        Tuple of (shard prefixes to list recursively, objects found directly
+        at intermediate levels above the shard depth)
+    """
+    search_prefix = f"{prefix}/" if not prefix.endswith('/') else prefix
+    
+    def list_level(level_prefix: str) -> Tuple[List[str], List[S3Object]]:
+        children = []
+        direct = []
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=level_prefix, Delimiter='/'):
+            for cp in page.get('CommonPrefixes', []):
+                children.append(cp['Prefix'])
+            for obj in page.get('Contents', []):
+                direct.append(S3Object(obj['Key'], obj.get('Size', 0), obj.get('ETag')))
+        return children, direct
+    
+    shards = [search_prefix]
+    direct_objects = []
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for level in range(depth):
+            next_shards = []
+            for children, direct in executor.map(list_level, shards):
+                next_shards.extend(children)
+                direct_objects.extend(direct)
+            print(f"  Depth {level + 1}: {len(next_shards):,} sub-prefixes")
+            shards = next_shards
+            if not shards:
+                break
+    
+    return shards, direct_objects
+
+
+def iter_objects_sharded(
+    s3_client,
+    bucket: str,
+    prefix: str,
+    depth: int,
+    threads: int,
+    queue_size: int = 100
+) -> Iterator[S3Object]:
+    """
+    List all objects with the given prefix by splitting it into sub-prefix
+    shards and paginating the shards concurrently.
+    
+    Pages are handed back through a bounded queue as soon as any shard
+    returns them, so this can feed --stream mode directly. Unlike
+    iter_objects, the order of the results is not stable between runs.
+    """
+    print(f"Listing objects at s3://{bucket}/{prefix}/ in shards (depth {depth})...")
+    
+    try:
+        shards, direct_objects = discover_shards(s3_client, bucket, prefix, depth, threads)
+    except ClientError as e:
+        print(f"Error listing objects: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    print(f"  Listing {len(shards):,} shards with {threads} threads...")
+    
+    listed = len(direct_objects)
+    yield from direct_objects
+    
+    if not shards:
+        return
+    
+    # Each item is either a list of objects (one page), None (a shard finished),
+    # or an exception raised while listing a shard
+    page_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                page_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def list_shard(shard_prefix: str) -> None:
+        try:
+            paginator = s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=bucket, Prefix=shard_prefix):
+                objs = [
+                    S3Object(obj['Key'], obj.get('Size', 0), obj.get('ETag'))
+                    for obj in page.get('Contents', [])
+                ]
+                if objs and not put(objs):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(None)
+    
+    executor = ThreadPoolExecutor(max_workers=threads)
+    try:
+        for shard_prefix in shards:
+            executor.submit(list_shard, shard_prefix)
+        
+        remaining = len(shards)
+        page_count = 0
+        while remaining:
+            item = page_queue.get()
+            if item is None:
+                remaining -= 1
+                continue
+            if isinstance(item, ClientError):
+                print(f"Error listing objects: {item}", file=sys.stderr)
+                sys.exit(1)
+            if isinstance(item, Exception):
+                raise item
+            page_count += 1
+            listed += len(item)
+            yield from item
+            
+            # Print progress every 10 pages (10,000 objects)
+            if page_count % 10 == 0:
+                print(f"  Listed {listed:,} objects so far...")
+    finally:
+        # Unblock any shard still waiting on a full queue if we stop early
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def list_objects(
+    s3_client,
+    bucket: str,
+    prefix: str,
+    depth: int = 0,
+    threads: int = 1
+) -> List[S3Object]:
+    """
+    List all objects with the given prefix.
+    A depth > 0 lists sub-prefix shards concurrently (see iter_objects_sharded).
+    """
+    print("(This may take a while for large prefixes...)")
+    objects = list(select_listing(s3_client, bucket, prefix, depth, threads))
+    print(f"\nFound {len(objects):,} total objects")
+    return objects
+
+
+def _read_s3_or_local(s3_client, path: str) -> bytes:
+    """Read a local file or an s3://bucket/key object into memory"""
+    if path.startswith('s3://'):
+        bucket, _, key = path[len('s3://'):].partition('/')
+        return s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _inventory_data_path(manifest_path: str, manifest: dict, data_key: str) -> str:
+    """
+    Resolve an inventory data file listed in the manifest. Files next to a
+    local manifest (or in the usual ../../data/ folder) are read locally,
+    anything else is fetched from the inventory destination bucket.
+    """
+    if not manifest_path.startswith('s3://'):
+        manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+        name = os.path.basename(data_key)
+        for candidate in [data_key,
+                          os.path.join(manifest_dir, name),
+                          os.path.join(manifest_dir, 'data', name),
+                          os.path.join(manifest_dir, '..', '..', 'data', name)]:
+            if os.path.exists(candidate):
+                return candidate
+    # destinationBucket is an ARN: arn:aws:s3:::bucket-name
+    dest_bucket = manifest['destinationBucket'].split(':::')[-1]
+    return f"s3://{dest_bucket}/{data_key}"
+
+
+def iter_inventory_objects(
+    s3_client,
+    manifest_path: str,
+    bucket: str,
+    prefix: str,
+    contains_pattern: Optional[str] = None,
+    ignore_pattern: Optional[str] = None
+) -> Iterator[S3Object]:
+    """
+    Use an S3 Inventory report (CSV or Parquet) as the key source instead of
+    list_objects_v2.
+    
+    Each data file is loaded as a DataFrame and the prefix, contains and
+    ignore filters are applied as vectorized string operations over the
+    Key column, so only matching keys ever reach the worker pool.
+    """
+    import io
+    import json
+    import pandas as pd
+    from urllib.parse import unquote_plus
+    
+    manifest = json.loads(_read_s3_or_local(s3_client, manifest_path))
+    # An inventory of another bucket would plan moves for keys that are not here
+    inventory_bucket = manifest.get('sourceBucket')
+    if inventory_bucket != bucket:
+        print(f"Error: {manifest_path} is an inventory of bucket '{inventory_bucket}', "
+              f"not --source_bucket '{bucket}'", file=sys.stderr)
+        sys.exit(1)
+    file_format = manifest.get('fileFormat', 'CSV').upper()
+    if file_format not in ('CSV', 'PARQUET'):
+        print(f"Error: unsupported inventory format {file_format} (CSV or Parquet only)", file=sys.stderr)
+        sys.exit(1)
+    
+    search_prefix = f"{prefix}/" if not prefix.endswith('/') else prefix
+    files = manifest.get('files', [])
+    print(f"Reading {len(files):,} {file_format} inventory files from {manifest_path}...")
+    
+    rows = 0
+    selected = 0
+    for entry in files:
+        data = _read_s3_or_local(s3_client, _inventory_data_path(manifest_path, manifest, entry['key']))
+        
+        if file_format == 'CSV':
+            # CSV inventories have no header; the column order is in fileSchema
+            columns = [c.strip() for c in manifest['fileSchema'].split(',')]
+            df = pd.read_csv(
+                io.BytesIO(data), header=None, names=columns, dtype=str, keep_default_na=False,
+                compression='gzip' if entry['key'].endswith('.gz') else None
+            )
+            # Keys are URL-encoded in CSV inventories
+            encoded = df['Key'].str.contains('%|\\+', regex=True)
+            df.loc[encoded, 'Key'] = df.loc[encoded, 'Key'].map(unquote_plus)
+        else:
+            df = pd.read_parquet(io.BytesIO(data))
+            df = df.rename(columns={'key': 'Key', 'size': 'Size', 'e_tag': 'ETag',
+                                    'is_latest': 'IsLatest', 'is_delete_marker': 'IsDeleteMarker'})
+        rows += len(df)
+        
+        keys = df['Key']
+        mask = keys.str.startswith(search_prefix)
+        if contains_pattern:
+            mask &= keys.str.contains(contains_pattern, regex=False)
+        if ignore_pattern:
+            mask &= ~keys.str.contains(ignore_pattern, regex=False)
+        # Versioned inventories also list old versions and delete markers
+        if 'IsLatest' in df:
+            mask &= df['IsLatest'].astype(str).str.lower() == 'true'
+        if 'IsDeleteMarker' in df:
+            mask &= df['IsDeleteMarker'].astype(str).str.lower() != 'true'
+        
+        df = df[mask]
+        selected += len(df)
+        sizes = pd.to_numeric(df['Size'], errors='coerce').fillna(0).astype('int64') if 'Size' in df else [0] * len(df)
+        etags = df['ETag'] if 'ETag' in df else [None] * len(df)
+        for key, size, etag in zip(df['Key'], sizes, etags):
+            # Listings return quoted ETags; inventories do not
+            yield S3Object(key, int(size), f'"{etag}"' if etag else None)
+    
+    print(f"Inventory: {rows:,} rows, {selected:,} selected under {search_prefix}")
+
+
+def select_listing(
+    s3_client,
+    bucket: str,
+    prefix: str,
+    depth: int = 0,
+    threads: int = 1
+) -> Iterator[S3Object]:
+    """Pick the serial or sharded listing engine"""
+    if depth > 0:
+        return iter_objects_sharded(s3_client, bucket, prefix, depth, threads)
+    return iter_objects(s3_client, bucket, prefix)
+
+
+PLAN_COLUMNS = ['source_key', 'dest_key', 'size', 'etag']
+PLAN_CSV_MARKER = "# s3mv plan "
+
+
+class PlanWriter:
+    """
+    Stream planned moves to a plan file: Parquet (.parquet, needs pyarrow)
+    for a compact columnar plan, or CSV (.csv / .csv.gz) for reviewing and
+    diffing. The move the plan was made for is stored in the Parquet schema
+    metadata or a leading comment line, so --apply_plan needs no listing
+    arguments.
+    """
+    def __init__(self, path: str, move: dict, batch_size: int = 100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows: List[Tuple[str, str, int, Optional[str]]] = []
+        self.count = 0
+        self.bytes = 0
+        self.csv_file = None
+        self.parquet = None
+        if path.endswith('.parquet'):
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                print("Error: Parquet plans require pyarrow (pip install pyarrow); "
+                      "use a .csv or .csv.gz plan instead", file=sys.stderr)
+                sys.exit(1)
+            self.schema = pa.schema(
+                [('source_key', pa.string()), ('dest_key', pa.string()), ('size', pa.int64()), ('etag', pa.string())],
+                metadata={b's3mv_plan': json.dumps(move).encode()}
+            )
+            # One row group per batch, so --plan_rows can skip whole groups
+            self.parquet = pq.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            import csv
+            import gzip
+            self.csv_file = gzip.open(path, 'wt', newline='') if path.endswith('.gz') else open(path, 'w', newline='')
+            self.csv_file.write(f"{PLAN_CSV_MARKER}{json.dumps(move)}\n")
+            self.csv = csv.writer(self.csv_file)
+            self.csv.writerow(PLAN_COLUMNS)
+    
+    def add(self, obj: S3Object, dest_key: str) -> None:
+        self.count += 1
+        self.bytes += obj.size
+        if self.csv_file is not None:
+            self.csv.writerow((obj.key, dest_key, obj.size, obj.etag or ''))
+            return
+        self.rows.append((obj.key, dest_key, obj.size, obj.etag))
+        if len(self.rows) >= self.batch_size:
+            self._write_batch()
+    
+    def _write_batch(self) -> None:
+        import pyarrow as pa
+        columns = dict(zip(PLAN_COLUMNS, (list(c) for c in zip(*self.rows))))
+        self.parquet.write_table(pa.Table.from_pydict(columns, schema=self.schema))
+        self.rows = []
+    
+    def close(self) -> None:
+        if self.csv_file is not None:
+            self.csv_file.close()
+            return
+        if self.rows:
+            self._write_batch()
+        self.parquet.close()
+
+
+def _open_plan(s3_client, path: str):
+    """A local plan path, or an s3:// plan read into memory"""
+    import io
+    if path.startswith('s3://'):
+        return io.BytesIO(_read_s3_or_local(s3_client, path))
+    return path
+
+
+def _open_plan_text(s3_client, path: str):
+    """Open a CSV plan (optionally gzipped, local or s3://) as text"""
+    import gzip
+    import io
+    source = _open_plan(s3_client, path)
+    if path.endswith('.gz'):
+        return gzip.open(source, 'rt', newline='')
+    if isinstance(source, str):
+        return open(source, newline='')
+    return io.TextIOWrapper(source, newline='')
+
+
+def read_plan_move(s3_client, path: str) -> dict:
+    """The move (buckets and prefixes) a plan file was written for"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        metadata = pq.read_schema(_open_plan(s3_client, path)).metadata or {}
+        return json.loads(metadata.get(b's3mv_plan', b'{}'))
+    with _open_plan_text(s3_client, path) as f:
+        first = f.readline()
+    return json.loads(first[len(PLAN_CSV_MARKER):]) if first.startswith(PLAN_CSV_MARKER) else {}
+
+
+def iter_plan_objects(s3_client, path: str, start: int = 0, end: Optional[int] = None) -> Iterator[S3Object]:
+    """
+    Yield the moves in rows [start, end) of a plan file, with their
+    destination keys, so a large plan can be split across machines.
+    Parquet row groups outside the range are never read.
+    """
+    import csv
+    print(f"Reading plan {path} (rows {start:,}:{'' if end is None else f'{end:,}'})...")
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        plan = pq.ParquetFile(_open_plan(s3_client, path))
+        offset = 0
+        for group in range(plan.num_row_groups):
+            n_rows = plan.metadata.row_group(group).num_rows
+            if end is not None and offset >= end:
+                break
+            if offset + n_rows > start:
+                lo = max(start - offset, 0)
+                hi = n_rows if end is None else min(end - offset, n_rows)
+                table = plan.read_row_group(group, columns=PLAN_COLUMNS).slice(lo, hi - lo)
+                columns = [table.column(name).to_pylist() for name in PLAN_COLUMNS]
+                for source_key, dest_key, size, etag in zip(*columns):
+                    yield S3Object(source_key, size or 0, etag, dest_key)
+            offset += n_rows
+        return
+    
+    with _open_plan_text(s3_client, path) as f:
+        # Only the first line can be the move comment; plan rows may be keys starting with '#'
+        first = f.readline()
+        lines = f if first.startswith(PLAN_CSV_MARKER) else itertools.chain([first], f)
+        rows = csv.reader(lines)
+        next(rows, None)  # Header
+        for source_key, dest_key, size, etag in itertools.islice(rows, start, end):
+            yield S3Object(source_key, int(size or 0), etag or None, dest_key)
+
+
+def parse_plan_rows(value: str) -> Tuple[int, Optional[int]]:
+    """Parse a START:END row range (either side may be empty)"""
+    start, sep, end = value.partition(':')
+    if not sep:
+        raise ValueError(f"expected START:END, got {value!r}")
+    start = int(start) if start else 0
+    end = int(end) if end else None
+    if start < 0 or (end is not None and end < start):
+        raise ValueError(f"invalid row range {value!r}")
+    return start, end
+
+
+def open_listing(args: argparse.Namespace, config: MoveConfig) -> Iterator[S3Object]:
+    """
+    The key source chosen on the command line (a saved plan, an inventory
+    or a bucket listing), minus keys the journal already has.
+    """
+    if args.apply_plan:
+        start, end = args.plan_range
+        listing = iter_plan_objects(config.s3_client, args.apply_plan, start, end)
+    elif args.inventory_manifest:
+        listing = iter_inventory_objects(
+            config.s3_client, args.inventory_manifest, config.source_bucket, config.prefix_old,
+            args.contains_pattern, args.ignore_pattern
+        )
+    else:
+        listing = select_listing(
+            config.s3_client, config.source_bucket, config.prefix_old, args.list_depth, args.threads
+        )
+    if config.journal is not None:
+        listing = config.journal.skip_completed(listing)
+    return listing
+
+
+def write_plan(
+    objects: Iterable[S3Object],
+    config: MoveConfig,
+    stats: MoveStats,
+    writer: PlanWriter,
+    progress_interval: int
+) -> None:
+    """
+    Filter and rewrite a listing exactly as a move would, but record each
+    move in the plan instead of performing it.
+    """
+    for obj in objects:
+        should_process, skip_reason = should_process_object(
+            obj.key, config.contains_pattern, config.ignore_pattern, config.rules, config.prefix_old
+        )
+        if not should_process:
+            record_outcome(config, stats, progress_interval, skipped=True)
+            continue
+        new_key = obj.dest_key or compute_dest_key(obj.key, config)
+        if is_self_move(config, obj.key, new_key):
+            record_outcome(config, stats, progress_interval, skipped=True)
+            continue
+        if config.sync is not None and config.sync.is_in_sync(obj, new_key):
+            stats.increment_in_sync()
+            record_outcome(config, stats, progress_interval, skipped=True)
+            continue
+        writer.add(obj, new_key)
+        record_outcome(config, stats, progress_interval, object_key=obj.key, success=True)
+
+
+def format_verify_report(verifier: Verifier) -> str:
+    checked, rate, p50, p99, heads, lists = verifier.get_report()
+    return (f"{checked:,} checked at {rate:.1f} keys/sec | {heads:,} HEAD + {lists:,} LIST requests, "
+            f"p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+
+
+def finish_stages(config: MoveConfig) -> None:
+    """Drain the deferred stages once all workers are done, in dependency order"""
+    # Verified keys feed the delete stage, so verification drains first
+    if config.verifier is not None:
+        config.verifier.flush()
+    if config.deleter is not None:
+        config.deleter.flush()
+    if config.multipart is not None:
+        config.multipart.shutdown()
+    # Last, so keys recorded by the final delete batches reach the journal
+    if config.journal is not None:
+        config.journal.close()
+
+
+def run_batch(
+    objects: List[S3Object],
+    config: MoveConfig,
+    stats: MoveStats,
+    threads: int,
+    progress_interval: int
+) -> None:
+    """
+    Move a fully listed set of objects with a thread pool.
+    """
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [
+            executor.submit(process_object, obj, config, stats, progress_interval)
+            for obj in objects
+        ]
+        
+        # Wait for all tasks to complete
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"[ERROR] Unexpected error: {e}", file=sys.stderr)
+                stats.increment_errors()
+
+
+def run_streaming(
+    objects: Iterable[S3Object],
+    config: MoveConfig,
+    stats: MoveStats,
+    threads: int,
+    progress_interval: int,
+    queue_size: int,
+    skip: int = 0
+) -> int:
+    """
+    Move objects while they are still being listed.
+    
+    The calling thread feeds listing entries into a bounded queue and worker
+    threads drain it, so moves start with the first page and memory stays
+    flat regardless of how many objects are under the prefix.
     
     Returns:
-        Tuple of (should_process, skip_reason)
+        Number of listing entries consumed (including skipped ones)
     """
-    # Check contains pattern
-    if contains_pattern and contains_pattern not in key:
-        return False, f"does not contain required pattern '{contains_pattern}'"
+    work_queue: "queue.Queue[Optional[S3Object]]" = queue.Queue(maxsize=queue_size)
     
-    # Check ignore pattern
-    if ignore_pattern and ignore_pattern in key:
-        return False, f"matches ignore pattern '{ignore_pattern}'"
+    def worker():
+        while True:
+            obj = work_queue.get()
+            if obj is None:
+                return
+            try:
+                process_object(obj, config, stats, progress_interval)
+            except Exception as e:
+                print(f"[ERROR] Unexpected error: {e}", file=sys.stderr)
+                stats.increment_errors()
     
-    return True, None
+    workers = [threading.Thread(target=worker, name=f"s3mv-worker-{i}") for i in range(threads)]
+    for t in workers:
+        t.start()
+    
+    consumed = 0
+    try:
+        for obj in objects:
+            consumed += 1
+            if consumed <= skip:
+                continue
+            # Blocks while the queue is full, throttling the listing to the move rate
+            work_queue.put(obj)
+    finally:
+        # One sentinel per worker, queued behind any remaining work
+        for _ in workers:
+            work_queue.put(None)
+        for t in workers:
+            t.join()
+    
+    return consumed
 
 
-def move_object(
-    s3_client,
-    source_bucket: str,
-    dest_bucket: str,
-    source_key: str,
-    dest_key: str,
-    dry_run: bool,
-    stats: Optional[MoveStats] = None,
-    replace_pattern: Optional[str] = None
-) -> Tuple[bool, Optional[str]]:
+def run_async(
+    objects: Iterable[S3Object],
+    config: MoveConfig,
+    stats: MoveStats,
+    progress_interval: int,
+    queue_size: int,
+    skip: int = 0,
+    max_inflight: int = 200,
+    profile: Optional[str] = None,
+    region: Optional[str] = None,
+    events: Optional[List[Tuple[str, Callable]]] = None
+) -> int:
     """
-    Move a single S3 object using copy + delete (same as 'aws s3 mv').
-    Supports both same-bucket and cross-bucket moves.
-    Includes retry logic for rate limiting and transient errors.
+    Move objects with an asyncio engine on an aiobotocore client.
+    
+    Copies and deletes are pure I/O waits, so a single event loop can keep
+    max_inflight requests outstanding without an OS thread per request.
+    The (blocking) listing runs on a feeder thread and is handed to the loop
+    in page-sized chunks; filtering, rewriting, sync, batched deletes and
+    the journal behave as in the thread engine.
+    
+    events are extra (event name, handler) pairs registered on the client,
+    which s3mv_bench uses to inject latency and errors.
     
     Returns:
-        Tuple of (success, error_message)
+        Number of listing entries consumed (including skipped ones)
     """
-    if dry_run:
-        # Record sample move for display
-        if stats:
-            has_pattern = replace_pattern and replace_pattern in source_key
-            stats.add_sample_move(source_bucket, source_key, dest_bucket, dest_key, has_pattern)
-        return True, None
+    try:
+        from aiobotocore.config import AioConfig
+        from aiobotocore.session import AioSession
+    except ImportError:
+        print("Error: --engine async requires aiobotocore (pip install aiobotocore)", file=sys.stderr)
+        sys.exit(1)
+    import asyncio
     
-    import time
-    max_retries = 3
-    retry_delay = 1  # Start with 1 second
+    chunk_size = 1000
+    consumed = 0
     
-    for attempt in range(max_retries):
-        try:
-            # Copy object (server-side copy for same region, otherwise downloads/uploads)
-            copy_source = {'Bucket': source_bucket, 'Key': source_key}
-            s3_client.copy_object(
-                CopySource=copy_source,
-                Bucket=dest_bucket,
-                Key=dest_key
-            )
+    async def engine() -> None:
+        nonlocal consumed
+        loop = asyncio.get_running_loop()
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size // chunk_size))
+        obj_queue: asyncio.Queue = asyncio.Queue(maxsize=max_inflight * 2)
+        feeder_error: List[BaseException] = []
+        
+        def feed() -> None:
+            nonlocal consumed
+            def put(item) -> None:
+                asyncio.run_coroutine_threadsafe(chunk_queue.put(item), loop).result()
+            chunk = []
+            try:
+                for obj in objects:
+                    consumed += 1
+                    if consumed <= skip:
+                        continue
+                    chunk.append(obj)
+                    if len(chunk) >= chunk_size:
+                        put(chunk)
+                        chunk = []
+                if chunk:
+                    put(chunk)
+            except BaseException as e:  # SystemExit from the listing included
+                feeder_error.append(e)
+            finally:
+                put(None)
+        
+        part_semaphore = asyncio.Semaphore(config.multipart.part_threads if config.multipart else 10)
+        delete_tasks = set()
+        
+        session = AioSession(profile=profile)
+        pool_size = max_inflight + (config.multipart.part_threads if config.multipart else 0)
+        client_config = AioConfig(max_pool_connections=pool_size, retries={'mode': 'standard', 'max_attempts': 5})
+        async with session.create_client('s3', region_name=region, config=client_config) as client:
+            # Report on the pool the moves actually use
+            config.pool = PoolMonitor(pool_size).attach(client)
+            for event_name, handler in events or []:
+                client.meta.events.register(event_name, handler)
             
-            # Delete original
-            s3_client.delete_object(Bucket=source_bucket, Key=source_key)
+            async def call_with_retry(method, max_retries: int = 3, **kwargs):
+                retry_delay = 1
+                for attempt in range(max_retries):
+                    try:
+                        return await method(**kwargs)
+                    except ClientError as e:
+                        error_code = e.response.get('Error', {}).get('Code', '')
+                        if error_code in RETRYABLE_ERRORS and attempt < max_retries - 1:
+                            await asyncio.sleep(retry_delay)
+                            retry_delay = min(retry_delay * 2, 30)
+                            continue
+                        raise
             
-            return True, None
-        
-        except ClientError as e:
-            error_code = e.response.get('Error', {}).get('Code', '')
+            async def send_delete_batch(batch) -> None:
+                try:
+                    response = await client.delete_objects(**config.deleter.request(batch))
+                    failures = DeleteBatcher.failures_from_response(response)
+                except ClientError as e:
+                    failures = {key: str(e) for key, _ in batch}
+                config.deleter.record_results(batch, failures)
             
-            # Retry on throttling or transient errors
-            if error_code in ['SlowDown', 'ServiceUnavailable', 'RequestTimeout'] and attempt < max_retries - 1:
-                time.sleep(retry_delay)
-                retry_delay *= 2  # Exponential backoff
-                continue
+            async def delete_source_async(key: str) -> None:
+                if config.deleter is not None:
+                    batch = config.deleter.offer(key)
+                    if batch:
+                        task = asyncio.create_task(send_delete_batch(batch))
+                        delete_tasks.add(task)
+                        task.add_done_callback(delete_tasks.discard)
+                else:
+                    await call_with_retry(client.delete_object, Bucket=config.source_bucket, Key=key)
+                    if config.journal is not None:
+                        config.journal.record(key)
             
-            error_msg = f"Error moving {source_key}: {str(e)}"
-            return False, error_msg
+            async def copy_multipart(obj: S3Object, dest_key: str) -> None:
+                head = await client.head_object(Bucket=config.source_bucket, Key=obj.key)
+                create_kwargs = {k: head[k] for k in MultipartCopier.COPIED_HEADERS if head.get(k)}
+                upload_id = (await client.create_multipart_upload(
+                    Bucket=config.dest_bucket, Key=dest_key, **create_kwargs
+                ))['UploadId']
+                copy_source = {'Bucket': config.source_bucket, 'Key': obj.key}
+                
+                async def copy_part(part: Tuple[int, int, int]) -> dict:
+                    part_number, first, last = part
+                    async with part_semaphore:
+                        response = await call_with_retry(
+                            client.upload_part_copy,
+                            Bucket=config.dest_bucket, Key=dest_key, UploadId=upload_id,
+                            PartNumber=part_number, CopySource=copy_source,
+                            CopySourceRange=f"bytes={first}-{last}"
+                        )
+                    return {'PartNumber': part_number, 'ETag': response['CopyPartResult']['ETag']}
+                
+                try:
+                    parts = await asyncio.gather(*(copy_part(p) for p in config.multipart.part_ranges(obj.size)))
+                    await client.complete_multipart_upload(
+                        Bucket=config.dest_bucket, Key=dest_key, UploadId=upload_id,
+                        MultipartUpload={'Parts': list(parts)}
+                    )
+                except Exception:
+                    try:
+                        await client.abort_multipart_upload(Bucket=config.dest_bucket, Key=dest_key, UploadId=upload_id)
+                    except ClientError as e:
+                        print(f"[ERROR] Could not abort multipart upload for {dest_key}: {e}", file=sys.stderr)
+                    raise
+            
+            async def handle(obj: S3Object) -> None:
+                should_process, skip_reason = should_process_object(
+                    obj.key, config.contains_pattern, config.ignore_pattern, config.rules, config.prefix_old
+                )
+                if not should_process:
+                    record_outcome(config, stats, progress_interval, skipped=True)
+                    return
+                
+                new_key = obj.dest_key or compute_dest_key(obj.key, config)
+                if is_self_move(config, obj.key, new_key):
+                    record_outcome(config, stats, progress_interval, skipped=True)
+                    return
+                
+                if config.sync is not None and config.sync.is_in_sync(obj, new_key):
+                    stats.increment_in_sync()
+                    if config.sync.delete_synced and not config.dry_run:
+                        try:
+                            await delete_source_async(obj.key)
+                        except ClientError as e:
+                            stats.increment_errors()
+                            print(f"[ERROR] Error deleting {obj.key}: {e}", file=sys.stderr)
+                    record_outcome(config, stats, progress_interval, skipped=True)
+                    return
+                
+                if config.dry_run:
+                    has_pattern = config.replace_pattern and config.replace_pattern in obj.key
+                    stats.add_sample_move(config.source_bucket, obj.key, config.dest_bucket, new_key, has_pattern)
+                    record_outcome(config, stats, progress_interval, object_key=obj.key, success=True)
+                    return
+                
+                try:
+                    single_copy = config.multipart is None or not config.multipart.should_use(obj.size)
+                    if not single_copy:
+                        await copy_multipart(obj, new_key)
+                    else:
+                        await call_with_retry(
+                            client.copy_object,
+                            CopySource={'Bucket': config.source_bucket, 'Key': obj.key},
+                            Bucket=config.dest_bucket, Key=new_key
+                        )
+                    if config.verifier is not None:
+                        # May block while verification catches up, so keep it off the loop
+                        await loop.run_in_executor(
+                            None, config.verifier.add, obj.key, new_key, obj.size, obj.etag, single_copy
+                        )
+                    else:
+                        await delete_source_async(obj.key)
+                except ClientError as e:
+                    record_outcome(config, stats, progress_interval, object_key=obj.key, success=False,
+                                   error=f"Error moving {obj.key}: {str(e)}")
+                    return
+                record_outcome(config, stats, progress_interval, object_key=obj.key, success=True)
+            
+            async def worker() -> None:
+                while True:
+                    obj = await obj_queue.get()
+                    if obj is None:
+                        return
+                    try:
+                        await handle(obj)
+                    except Exception as e:
+                        print(f"[ERROR] Unexpected error: {e}", file=sys.stderr)
+                        stats.increment_errors()
+            
+            if config.sync is not None:
+                await loop.run_in_executor(None, config.sync.wait)
+            
+            workers = [asyncio.create_task(worker()) for _ in range(max_inflight)]
+            feeder = loop.run_in_executor(None, feed)
+            while True:
+                chunk = await chunk_queue.get()
+                if chunk is None:
+                    break
+                for obj in chunk:
+                    await obj_queue.put(obj)
+            for _ in workers:
+                await obj_queue.put(None)
+            await asyncio.gather(*workers)
+            await feeder
+            
+            # Drain the delete stage on the async client, retries included
+            if config.deleter is not None:
+                await asyncio.gather(*delete_tasks)
+                retry_delay = 1
+                while True:
+                    batch, had_retries = config.deleter.next_flush_batch()
+                    if not batch:
+                        break
+                    if had_retries:
+                        await asyncio.sleep(retry_delay)
+                        retry_delay = min(retry_delay * 2, 30)
+                    await send_delete_batch(batch)
+        
+        if feeder_error:
+            raise feeder_error[0]
     
-    return False, f"Failed after {max_retries} retries"
+    asyncio.run(engine())
+    return consumed
 
 
+def worker_count(args: argparse.Namespace) -> int:
+    """Size of the move worker pool"""
+    return args.max_threads if args.adaptive and not args.dry_run else args.threads
 
 
-def process_object(
-    args: Tuple,
-    stats: MoveStats,
-    progress_interval: int
-) -> None:
+def client_pool_size(args: argparse.Namespace) -> int:
     """
-    Process a single object (check patterns and move if needed).
-    This function is called by worker threads.
+    Connections the shared client needs so that no thread using it has to
+    wait for one: the workers plus every stage that runs alongside them.
+    """
+    size = worker_count(args)
+    if not args.dry_run:
+        size += args.part_threads
+        if args.verify:
+            size += args.verify_threads
+    # Sharded source and destination listings run while the workers move
+    size += args.threads * ((args.list_depth > 0) + bool(args.sync))
+    return max(size, 10)
+
+
+def make_s3_client(profile: Optional[str] = None, region: Optional[str] = None, pool_size: int = 10):
+    """
+    Create an S3 client on a fresh boto3 session, with a connection pool of
+    pool_size, TCP keepalive, and botocore's standard retry mode (jittered
+    backoff on throttling).
     """
-    (s3_client, source_bucket, dest_bucket, object_key, prefix_old, prefix_new,
-     contains_pattern, ignore_pattern, replace_pattern, with_pattern, dry_run) = args
+    from botocore.config import Config
+    session_kwargs = {}
+    if profile:
+        session_kwargs['profile_name'] = profile
+    if region:
+        session_kwargs['region_name'] = region
     
-    # Check if object should be processed
-    should_process, skip_reason = should_process_object(
-        object_key, contains_pattern, ignore_pattern
+    session = boto3.Session(**session_kwargs)
+    client_config = Config(
+        max_pool_connections=pool_size,
+        tcp_keepalive=True,
+        retries={'mode': 'standard', 'max_attempts': 5},
     )
+    return session.client('s3', config=client_config)
+
+
+def build_config(
+    args: argparse.Namespace,
+    s3_client,
+    stats: MoveStats,
+    dest_bucket: str,
+    prefix_old: str,
+    prefix_new: str,
+    rules: Optional[RuleSet] = None
+) -> Tuple[MoveConfig, int]:
+    """
+    Assemble the move configuration and its optional stages from the command
+    line arguments. rules is the RuleSet main() loaded from --rules.
     
-    if not should_process:
-        stats.increment_total()
-        stats.increment_skipped()
-        # Print progress after incrementing
-        should_print, current_total = stats.should_print_progress(progress_interval)
-        if should_print:
-            total, moved, skipped, errors = stats.get_stats()
-            rate = stats.get_rate()
-            print(f"Progress: {total:,} processed | {moved:,} moved | {skipped:,} skipped | {errors:,} errors | Rate: {rate:.1f} files/sec")
-        return
-    
-    # Calculate new key
-    relative_path = object_key[len(prefix_old):].lstrip('/')
-    
-    # Apply pattern replacement if specified
-    if replace_pattern is not None:
-        # Allow empty string for with_pattern (to delete the pattern)
-        replacement = with_pattern if with_pattern is not None else ""
-        relative_path = relative_path.replace(replace_pattern, replacement)
-    
-    new_key = f"{prefix_new}/{relative_path}"
-    
-    # Move the object
-    success, error = move_object(
-        s3_client, source_bucket, dest_bucket, object_key, new_key, dry_run, stats, replace_pattern
+    Returns:
+        Tuple of (config, number of worker threads)
+    """
+    config = MoveConfig(
+        s3_client=s3_client,
+        source_bucket=args.source_bucket,
+        dest_bucket=dest_bucket,
+        prefix_old=prefix_old,
+        prefix_new=prefix_new,
+        contains_pattern=args.contains_pattern,
+        ignore_pattern=args.ignore_pattern,
+        replace_pattern=args.replace_pattern,
+        with_pattern=args.with_pattern,
+        dry_run=args.dry_run,
     )
+    config.rules = rules
+    if args.journal:
+        config.journal = MoveJournal(args.journal)
+        if not config.journal.bind(args.source_bucket, prefix_old, dest_bucket, prefix_new):
+            print(f"Error: journal {args.journal} was written by a different move; use a new --journal path")
+            sys.exit(1)
+    if not args.dry_run and args.delete_batch_size > 0:
+        config.deleter = DeleteBatcher(
+            s3_client, args.source_bucket, stats, args.delete_batch_size, journal=config.journal
+        )
+    if args.sync:
+        # Listed concurrently with the source; workers wait for it before copying
+        config.sync = SyncIndex(
+            s3_client, dest_bucket, prefix_new, args.list_depth, args.threads, args.delete_synced
+        )
+    workers = worker_count(args)
+    if args.adaptive and not args.dry_run:
+        config.limiter = AdaptiveLimiter(args.threads, args.max_threads, args.throttle_prefix_depth)
+    if args.verify and not args.dry_run:
+        def verified(key: str) -> None:
+            stats.increment_verified()
+            stats.increment_moved()
+            success, error = delete_source(config, key)
+            if not success:
+                stats.increment_errors()
+                print(f"[ERROR] {error}", file=sys.stderr)
+        
+        def verify_failed(key: str, problem: str) -> None:
+            stats.increment_verify_failed()
+            print(f"[ERROR] Verification failed for {key}, source kept: {problem}", file=sys.stderr)
+        
+        config.verifier = Verifier(
+            s3_client, dest_bucket, verified, verify_failed, args.verify_threads, args.verify_batch_size,
+            compare_etag=args.verify == 'etag'
+        )
+    if not args.dry_run:
+        config.multipart = MultipartCopier(
+            args.multipart_threshold_mb * 1024 ** 2, args.part_size_mb * 1024 ** 2, args.part_threads
+        )
+    return config, workers
+
+
+def _iter_shard_queue(s3_client, bucket: str, shard_queue) -> Iterator[S3Object]:
+    """
+    Pull work from the shared shard queue until its sentinel: a shard prefix
+    is listed here, a list of objects is yielded as-is.
+    """
+    while True:
+        item = shard_queue.get()
+        if item is None:
+            return
+        if isinstance(item, list):
+            yield from item
+        else:
+            yield from iter_objects(s3_client, bucket, item, verbose=False)
+
+
+def _iter_chunk_queue(chunk_queue) -> Iterator[S3Object]:
+    """Yield the objects routed to this process until its sentinel"""
+    while True:
+        chunk = chunk_queue.get()
+        if chunk is None:
+            return
+        yield from chunk
+
+
+def _process_worker(
+    worker_id: int,
+    args: argparse.Namespace,
+    dest_bucket: str,
+    prefix_old: str,
+    prefix_new: str,
+    rules: Optional[RuleSet] = None,
+    shard_queue=None,
+    chunk_queue=None
+) -> dict:
+    """
+    Body of one --processes worker. It builds its own session, client and
+    stages, runs the streaming thread engine on its share of the keys and
+    returns its statistics for the parent to merge.
+    """
+    pool_size = client_pool_size(args)
+    s3_client = make_s3_client(args.profile, args.region, pool_size)
+    stats = MoveStats()
+    config, workers = build_config(args, s3_client, stats, dest_bucket, prefix_old, prefix_new, rules)
+    config.pool = PoolMonitor(pool_size).attach(s3_client)
+    config.progress_label = f"[worker {worker_id}] "
     
-    if success:
-        stats.increment_total()
-        stats.increment_moved()
+    stats.start()
+    if shard_queue is not None:
+        listing = _iter_shard_queue(s3_client, args.source_bucket, shard_queue)
+        if config.journal is not None:
+            listing = config.journal.skip_completed(listing)
     else:
-        stats.increment_total()
-        stats.increment_errors()
-        # Always print errors
-        print(f"[ERROR] {error}", file=sys.stderr)
+        listing = _iter_chunk_queue(chunk_queue)
+    try:
+        run_streaming(listing, config, stats, workers, args.progress_interval, args.queue_size)
+    finally:
+        finish_stages(config)
     
-    # Print progress after incrementing
-    should_print, current_total = stats.should_print_progress(progress_interval)
-    if should_print:
-        total, moved, skipped, errors = stats.get_stats()
-        rate = stats.get_rate()
-        print(f"Progress: {total:,} processed | {moved:,} moved | {skipped:,} skipped | {errors:,} errors | Rate: {rate:.1f} files/sec")
+    summary = stats.summary()
+    summary['journal_skipped'] = config.journal.skipped if config.journal is not None else 0
+    total, moved, skipped, errors = stats.get_stats()
+    print(f"[worker {worker_id}] Done: {total:,} processed | {moved:,} moved | "
+          f"{skipped:,} skipped | {errors:,} errors | {stats.get_rate():.1f} files/sec")
+    if config.verifier is not None:
+        print(f"[worker {worker_id}] Verify: {format_verify_report(config.verifier)}")
+    inflight, pool_size, peak, over, discarded = config.pool.get_report()
+    print(f"[worker {worker_id}] Connection pool: {pool_size} (peak {peak} in flight, {over:,} over, "
+          f"{discarded:,} discarded)")
+    return summary
 
 
-def list_objects(s3_client, bucket: str, prefix: str) -> List[str]:
-    """
-    List all objects with the given prefix.
+def run_processes(
+    args: argparse.Namespace,
+    config: MoveConfig,
+    stats: MoveStats,
+    processes: int,
+    shard_by: str,
+    chunk_size: int = 1000
+) -> None:
     """
-    objects = []
-    paginator = s3_client.get_paginator('list_objects_v2')
+    Fan the move out over several worker processes, each with its own boto3
+    client and thread pool, to get past the single-interpreter ceiling.
     
-    print(f"Listing objects at s3://{bucket}/{prefix}/...")
-    print("(This may take a while for large prefixes...)")
+    With shard_by='prefix' the parent only discovers sub-prefix shards
+    (--list_depth, 3 levels by default) and the workers pull shards from a
+    shared queue and list them themselves. With shard_by='hash' the parent
+    produces the listing (bucket, inventory or plan) and routes every key to the
+    process given by crc32(key) % processes, in chunks of chunk_size.
     
-    # Ensure prefix ends with / for proper filtering
-    search_prefix = f"{prefix}/" if not prefix.endswith('/') else prefix
+    Worker statistics are merged into stats when all of them are done.
+    """
+    import multiprocessing
+    import zlib
+    from concurrent.futures import ProcessPoolExecutor
     
-    try:
-        page_count = 0
-        for page in paginator.paginate(Bucket=bucket, Prefix=search_prefix):
-            if 'Contents' in page:
-                page_count += 1
-                for obj in page['Contents']:
-                    # Double-check that the object actually starts with our prefix/
-                    # This prevents matching "v2.2abc/" when we want "v2.2/"
-                    if obj['Key'].startswith(search_prefix):
-                        objects.append(obj['Key'])
-                
-                # Print progress every 10 pages (10,000 objects)
-                if page_count % 10 == 0:
-                    print(f"  Listed {len(objects):,} objects so far...")
+    # Spawn rather than fork: the parent may already be running listing threads
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Manager() as manager, ProcessPoolExecutor(max_workers=processes, mp_context=ctx) as executor:
+        task_args = (args, config.dest_bucket, config.prefix_old, config.prefix_new, config.rules)
         
-        print(f"\nFound {len(objects):,} total objects")
-        return objects
-    
-    except ClientError as e:
-        print(f"Error listing objects: {e}", file=sys.stderr)
-        sys.exit(1)
+        if shard_by == 'prefix':
+            depth = args.list_depth or 3
+            print(f"Discovering shards under s3://{config.source_bucket}/{config.prefix_old}/ (depth {depth})...")
+            try:
+                shards, direct_objects = discover_shards(
+                    config.s3_client, config.source_bucket, config.prefix_old, depth, args.threads
+                )
+            except ClientError as e:
+                print(f"Error listing objects: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"Listing and moving {len(shards):,} shards with {processes} processes...")
+            print()
+            
+            # Workers pull the next shard when they finish one, which evens out
+            # the very uneven shard sizes of the NRDS layout
+            shard_queue = manager.Queue()
+            if direct_objects:
+                shard_queue.put(direct_objects)
+            for shard_prefix in shards:
+                shard_queue.put(shard_prefix)
+            for _ in range(processes):
+                shard_queue.put(None)
+            futures = [
+                executor.submit(_process_worker, i, *task_args, shard_queue=shard_queue)
+                for i in range(processes)
+            ]
+        else:
+            chunk_queues = [manager.Queue(maxsize=max(2, args.queue_size // chunk_size)) for _ in range(processes)]
+            futures = [
+                executor.submit(_process_worker, i, *task_args, chunk_queue=chunk_queues[i])
+                for i in range(processes)
+            ]
+            
+            def put(i: int, item) -> None:
+                # Keep an eye on the workers so a crashed one cannot block the listing forever
+                while True:
+                    try:
+                        chunk_queues[i].put(item, timeout=1)
+                        return
+                    except queue.Full:
+                        if futures[i].done():
+                            futures[i].result()
+                            raise RuntimeError(f"worker process {i} exited before the listing finished")
+            
+            listing = open_listing(args, config)
+            
+            print(f"Routing keys to {processes} processes by key hash...")
+            print()
+            buffers: List[List[S3Object]] = [[] for _ in range(processes)]
+            try:
+                for obj in listing:
+                    i = zlib.crc32(obj.key.encode()) % processes
+                    buffers[i].append(obj)
+                    if len(buffers[i]) >= chunk_size:
+                        put(i, buffers[i])
+                        buffers[i] = []
+                for i, buffer in enumerate(buffers):
+                    if buffer:
+                        put(i, buffer)
+            finally:
+                # Sentinels go out even if the listing failed, so no worker waits forever
+                for i in range(processes):
+                    if not futures[i].done():
+                        chunk_queues[i].put(None)
+        
+        for future in futures:
+            summary = future.result()
+            stats.merge(summary)
+            if config.journal is not None:
+                config.journal.skipped += summary['journal_skipped']
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
+    """The s3mv command line (also used by s3mv_bench to configure runs)"""
     parser = argparse.ArgumentParser(
         description='Move S3 objects from one prefix to another with multithreading',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -303,6 +2440,32 @@ Examples:
     --delete_pattern metadata.csv/ \\
     --threads 30
   
+  # Stream a very large prefix (moves start with the first listing page)
+  %(prog)s --source_bucket my-bucket --prefix_old v2.2 --prefix_new outputs/v2.2 \\
+    --stream --queue_size 20000 --threads 30
+  
+  # Keep hundreds of copies in flight from one process (needs aiobotocore)
+  %(prog)s --source_bucket my-bucket --prefix_old v2.2 --prefix_new outputs/v2.2 \\
+    --engine async --max_inflight 300
+  
+  # Spread a very large move over 8 processes, each listing its own shards
+  %(prog)s --source_bucket my-bucket --prefix_old v2.2 --prefix_new outputs/v2.2 \\
+    --processes 8 --shard_by prefix --list_depth 3 --threads 20
+  
+  # List the NRDS hierarchy in parallel shards (ngen.YYYYMMDD/<run_type>/<init>/)
+  %(prog)s --source_bucket my-bucket --prefix_old v2.2 --prefix_new outputs/v2.2 \\
+    --stream --list_depth 3 --threads 30
+  
+  # Lower-case run types and drop metadata.csv/ in one pass (rules.json, see RuleSet)
+  %(prog)s --source_bucket my-bucket --prefix_old v2.2 --prefix_new v2.2 \\
+    --rules rules.json --dry-run
+  
+  # Plan once, review the plan, then apply it on two machines
+  %(prog)s --source_bucket my-bucket --prefix_old v2.2 --prefix_new outputs/v2.2 \\
+    --list_depth 3 --threads 30 --plan_out plan.parquet
+  %(prog)s --apply_plan plan.parquet --plan_rows 0:5000000 --stream --threads 30
+  %(prog)s --apply_plan plan.parquet --plan_rows 5000000: --stream --threads 30
+  
   # Move only files containing 'forcing', replace pattern in path
   %(prog)s --source_bucket my-bucket --prefix_old v2.2 --prefix_new v2.2_new \\
     --contains_pattern forcing --replace_pattern UPPER --with_pattern lower \\
@@ -310,14 +2473,14 @@ Examples:
         """
     )
     
-    parser.add_argument('--source_bucket', required=True,
-                        help='Source S3 bucket name')
+    parser.add_argument('--source_bucket', required=False, default=None,
+                        help='Source S3 bucket name (taken from the plan with --apply_plan)')
     parser.add_argument('--dest_bucket', required=False, default=None,
                         help='Destination S3 bucket name (defaults to source_bucket if not specified)')
-    parser.add_argument('--prefix_old', required=True,
-                        help='Current prefix path in source bucket')
-    parser.add_argument('--prefix_new', required=True,
-                        help='New prefix path in destination bucket')
+    parser.add_argument('--prefix_old', required=False, default=None,
+                        help='Current prefix path in source bucket (taken from the plan with --apply_plan)')
+    parser.add_argument('--prefix_new', required=False, default=None,
+                        help='New prefix path in destination bucket (taken from the plan with --apply_plan)')
     parser.add_argument('--ignore_pattern', default=None,
                         help='Pattern to ignore (files containing this will be skipped)')
     parser.add_argument('--contains_pattern', default=None,
@@ -328,6 +2491,9 @@ Examples:
                         help='Replacement pattern (used with --replace_pattern). Use empty string "" to delete.')
     parser.add_argument('--delete_pattern', default=None,
                         help='Pattern to delete from the file path (shorthand for --replace_pattern X --with_pattern "")')
+    parser.add_argument('--rules', default=None,
+                        help='JSON rules file with ordered include/exclude filters and rewrites applied in one pass '
+                             '(see RuleSet for the format); combines with the pattern options above')
     parser.add_argument('--threads', type=int, default=10,
                         help='Number of parallel threads (default: 10)')
     parser.add_argument('--dry-run', action='store_true',
@@ -336,11 +2502,77 @@ Examples:
                         help='Print progress every N files (default: 1000)')
     parser.add_argument('--skip', type=int, default=0,
                         help='Skip the first N files (useful for resuming, default: 0)')
+    parser.add_argument('--journal', default=None,
+                        help='SQLite checkpoint file recording completed keys; rerunning with the same file '
+                             'skips keys that were already moved (crash-safe alternative to --skip)')
+    parser.add_argument('--inventory_manifest', default=None,
+                        help='S3 Inventory manifest.json (local path or s3://...) to read keys from instead of '
+                             'listing the bucket; CSV and Parquet inventories are supported')
+    parser.add_argument('--plan_out', default=None,
+                        help='List, filter and rewrite as usual but write every move (source_key, dest_key, size, '
+                             'etag) to this plan file instead of moving: .parquet (needs pyarrow), .csv or .csv.gz')
+    parser.add_argument('--apply_plan', default=None,
+                        help='Run the moves in a plan file written by --plan_out (local or s3://) with no listing')
+    parser.add_argument('--plan_rows', default=None,
+                        help='With --apply_plan, only run plan rows START:END (0-based, end exclusive, '
+                             'either side may be empty) to split a plan across machines')
+    parser.add_argument('--verify', nargs='?', const='etag', choices=['etag', 'size'], default=None,
+                        help='HEAD each copy and only delete the source if it matches the listing: size and '
+                             'ETag (default) or size only (e.g. for SSE-KMS objects, whose ETags change on copy)')
+    parser.add_argument('--verify_threads', type=int, default=10,
+                        help='Number of verification threads (default: 10)')
+    parser.add_argument('--verify_batch_size', type=int, default=100,
+                        help='Copies verified per batch; keys of one batch sharing a destination directory '
+                             'are checked with a single listing (default: 100)')
+    parser.add_argument('--sync', action='store_true',
+                        help='List the destination too and only copy objects that are missing there or differ '
+                             'in size/ETag (idempotent reruns)')
+    parser.add_argument('--delete_synced', action='store_true',
+                        help='With --sync, delete source objects that are already identical at the destination')
+    parser.add_argument('--stream', action='store_true',
+                        help='Start moving as soon as the first listing page arrives instead of listing everything first')
+    parser.add_argument('--queue_size', type=int, default=10000,
+                        help='Maximum number of listed objects waiting for a worker in --stream mode (default: 10000)')
+    parser.add_argument('--delete_batch_size', type=int, default=1000,
+                        help='Delete copied sources with DeleteObjects in batches of up to N keys '
+                             '(max 1000, default: 1000; 0 = delete each key right after its copy)')
+    parser.add_argument('--multipart_threshold_mb', type=int, default=1024,
+                        help='Copy objects of at least this size (MiB) with parallel multipart upload_part_copy '
+                             '(capped at the 5 GiB CopyObject limit, default: 1024)')
+    parser.add_argument('--part_size_mb', type=int, default=256,
+                        help='Part size (MiB) for multipart copies (default: 256)')
+    parser.add_argument('--part_threads', type=int, default=10,
+                        help='Number of parallel part copies shared by all multipart copies (default: 10)')
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread',
+                        help='Execution engine: thread pool (default) or asyncio on aiobotocore (always streams)')
+    parser.add_argument('--max_inflight', type=int, default=200,
+                        help='Number of concurrent requests for --engine async (default: 200)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adapt concurrency per prefix with AIMD: start at --threads per prefix, '
+                             'grow while requests succeed and halve on SlowDown/ServiceUnavailable')
+    parser.add_argument('--max_threads', type=int, default=100,
+                        help='Worker pool size and per-prefix concurrency cap in --adaptive mode (default: 100)')
+    parser.add_argument('--throttle_prefix_depth', type=int, default=3,
+                        help='Number of leading key path components that define a throttling prefix '
+                             'in --adaptive mode (default: 3, e.g. v2.2/ngen.YYYYMMDD/<run_type>)')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Number of worker processes, each with its own client and --threads pool (default: 1)')
+    parser.add_argument('--shard_by', choices=['prefix', 'hash'], default='prefix',
+                        help='How --processes splits the keys: by sub-prefix shard, listed by the workers '
+                             '(default), or by key hash over a listing made by the parent')
+    parser.add_argument('--list_depth', type=int, default=0,
+                        help='Split the listing into sub-prefix shards this many levels deep and list them concurrently '
+                             '(e.g. 3 for ngen.YYYYMMDD/<run_type>/<init>/, default: 0 = single serial listing)')
     parser.add_argument('--profile', default=None,
                         help='AWS profile name to use (optional)')
     parser.add_argument('--region', default=None,
                         help='AWS region (optional)')
     
+    return parser
+
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
     
     # Validate pattern replacement/deletion args
@@ -352,11 +2584,85 @@ Examples:
         print("Error: --with_pattern requires --replace_pattern to be specified")
         sys.exit(1)
     
+    if not 0 <= args.delete_batch_size <= DeleteBatcher.MAX_BATCH_SIZE:
+        print(f"Error: --delete_batch_size must be between 0 and {DeleteBatcher.MAX_BATCH_SIZE}")
+        sys.exit(1)
+    
+    if args.engine == 'async' and args.adaptive:
+        print("Error: --adaptive is only supported by the thread engine; use --max_inflight with --engine async")
+        sys.exit(1)
+    
+    if args.delete_synced and not args.sync:
+        print("Error: --delete_synced requires --sync")
+        sys.exit(1)
+    
+    if args.inventory_manifest and args.list_depth > 0:
+        print("Error: --list_depth has no effect with --inventory_manifest")
+        sys.exit(1)
+    
+    if args.skip and args.list_depth > 0:
+        print("Error: --skip relies on a stable listing order and cannot be used with --list_depth")
+        sys.exit(1)
+    
+    if args.processes > 1:
+        if args.engine == 'async' or args.sync or args.skip:
+            print("Error: --processes cannot be combined with --engine async, --sync or --skip")
+            sys.exit(1)
+        if args.shard_by == 'prefix' and (args.inventory_manifest or args.apply_plan):
+            print("Error: --inventory_manifest and --apply_plan need --shard_by hash with --processes")
+            sys.exit(1)
+    
+    if args.plan_out and args.apply_plan:
+        print("Error: --plan_out and --apply_plan cannot be used together")
+        sys.exit(1)
+    
+    if args.apply_plan and (args.inventory_manifest or args.list_depth > 0):
+        print("Error: --apply_plan reads its keys from the plan; drop --inventory_manifest/--list_depth")
+        sys.exit(1)
+    
+    if args.plan_out and args.processes > 1:
+        print("Error: --plan_out runs in a single process")
+        sys.exit(1)
+    
+    # Planning only lists; nothing is copied or deleted
+    if args.plan_out:
+        args.dry_run = True
+    
+    if args.plan_rows and not args.apply_plan:
+        print("Error: --plan_rows requires --apply_plan")
+        sys.exit(1)
+    args.plan_range = (0, None)
+    if args.plan_rows:
+        try:
+            args.plan_range = parse_plan_rows(args.plan_rows)
+        except ValueError as e:
+            print(f"Error: --plan_rows: {e}")
+            sys.exit(1)
+    
     # Convert delete_pattern to replace_pattern with empty replacement
     if args.delete_pattern:
         args.replace_pattern = args.delete_pattern
         args.with_pattern = ""
     
+    # Create boto3 session and client, with a connection for every thread that shares it
+    pool_size = client_pool_size(args)
+    s3_client = make_s3_client(args.profile, args.region, pool_size)
+    
+    # A plan carries its own buckets and prefixes
+    if args.apply_plan:
+        move = read_plan_move(s3_client, args.apply_plan)
+        for name in ('source_bucket', 'dest_bucket', 'prefix_old', 'prefix_new'):
+            given = getattr(args, name)
+            if given is not None and move.get(name) is not None and given.rstrip('/') != move[name]:
+                print(f"Error: --{name} {given} does not match the plan ({move[name]})")
+                sys.exit(1)
+            if given is None:
+                setattr(args, name, move.get(name))
+    missing = [name for name in ('source_bucket', 'prefix_old', 'prefix_new') if getattr(args, name) is None]
+    if missing:
+        print(f"Error: --{', --'.join(missing)} required")
+        sys.exit(1)
+    
     # Set destination bucket to source bucket if not specified
     dest_bucket = args.dest_bucket if args.dest_bucket else args.source_bucket
     
@@ -364,6 +2670,14 @@ Examples:
     prefix_old = args.prefix_old.rstrip('/')
     prefix_new = args.prefix_new.rstrip('/')
     
+    rules = None
+    if args.rules:
+        try:
+            rules = RuleSet.from_file(args.rules)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot load rules file {args.rules}: {e}")
+            sys.exit(1)
+    
     # Print configuration
     print("=" * 60)
     print("S3 Object Move Script (Multithreaded)")
@@ -379,67 +2693,155 @@ Examples:
             print(f"Replace Pattern:  '{args.replace_pattern}' -> '{args.with_pattern}'")
         else:
             print(f"Delete Pattern:   '{args.replace_pattern}' (remove from path)")
-    print(f"Threads:          {args.threads}")
+    if rules is not None:
+        print(f"Rules:            {args.rules} ({rules.n_filters} filters, {rules.n_rewrites} rewrites)")
+    if args.processes > 1:
+        print(f"Processes:        {args.processes} (sharded by {args.shard_by})")
+    if args.engine == 'async':
+        print(f"Engine:           async ({args.max_inflight} requests in flight)")
+    elif args.adaptive:
+        print(f"Threads:          adaptive ({args.threads} per prefix to start, max {args.max_threads})")
+    else:
+        print(f"Threads:          {args.threads}")
+    if args.engine == 'thread':
+        print(f"Connection Pool:  {client_pool_size(args)}")
+    print(f"Streaming:        {args.stream or args.engine == 'async' or args.processes > 1}")
+    if args.apply_plan:
+        print(f"Key Source:       plan {args.apply_plan} (rows {args.plan_rows or 'all'})")
+    elif args.inventory_manifest:
+        print(f"Key Source:       inventory {args.inventory_manifest}")
+    else:
+        print(f"Listing Depth:    {args.list_depth or '(serial)'}")
+    print(f"Delete Batch:     {args.delete_batch_size or '(per key)'}")
+    if args.sync:
+        print(f"Sync Mode:        True (delete synced sources: {args.delete_synced})")
+    if args.verify:
+        print(f"Verify:           {args.verify} ({args.verify_threads} threads, batches of {args.verify_batch_size})")
+    print(f"Multipart Above:  {args.multipart_threshold_mb:,} MiB ({args.part_size_mb:,} MiB parts, {args.part_threads} threads)")
     print(f"Progress Every:   {args.progress_interval:,} files")
+    if args.plan_out:
+        print(f"Plan Output:      {args.plan_out}")
     print(f"Dry Run:          {args.dry_run}")
     print("=" * 60)
     print()
     
-    # Create boto3 session and client
-    session_kwargs = {}
-    if args.profile:
-        session_kwargs['profile_name'] = args.profile
-    if args.region:
-        session_kwargs['region_name'] = args.region
-    
-    session = boto3.Session(**session_kwargs)
-    s3_client = session.client('s3')
+    # Initialize statistics
+    stats = MoveStats()
     
-    # List all objects from source bucket
-    objects = list_objects(s3_client, args.source_bucket, prefix_old)
+    config, workers = build_config(args, s3_client, stats, dest_bucket, prefix_old, prefix_new, rules)
+    config.pool = PoolMonitor(pool_size).attach(s3_client)
+    if config.journal is not None:
+        print(f"Journal: {args.journal} ({config.journal.count():,} completed keys recorded)")
+        print()
     
-    if not objects:
-        print("No objects found to process")
+    if args.plan_out:
+        writer = PlanWriter(args.plan_out, {
+            'source_bucket': args.source_bucket, 'dest_bucket': dest_bucket,
+            'prefix_old': prefix_old, 'prefix_new': prefix_new,
+        })
+        stats.start()
+        try:
+            write_plan(open_listing(args, config), config, stats, writer, args.progress_interval)
+        finally:
+            writer.close()
+            finish_stages(config)
+        total, planned, skipped, errors = stats.get_stats()
+        print()
+        print(f"Plan: {planned:,} moves ({writer.bytes / 1024 ** 3:,.1f} GiB) written to {args.plan_out}; "
+              f"{skipped:,} of {total:,} listed objects filtered out")
+        print(f"Run it with: --apply_plan {args.plan_out} [--plan_rows START:END]")
         return
     
-    # Apply skip if specified (for resume capability)
-    if args.skip > 0:
-        if args.skip >= len(objects):
-            print(f"Skip value ({args.skip}) is >= total objects ({len(objects)}). Nothing to do.")
+    if args.processes > 1:
+        # Each process runs its own stages and limiter; this one only lists and merges
+        config.limiter = None
+        config.verifier = None
+        config.pool = None
+        stats.start()
+        try:
+            run_processes(args, config, stats, args.processes, args.shard_by)
+        finally:
+            finish_stages(config)
+        if stats.get_stats()[0] == 0:
+            if config.journal is not None and config.journal.skipped:
+                print(f"All {config.journal.skipped:,} listed objects are already recorded in the journal. Nothing to do.")
+            else:
+                print("No objects found to process")
             return
-        print(f"Skipping first {args.skip:,} objects (resume mode)")
-        objects = objects[args.skip:]
-    
-    print()
-    print(f"Processing {len(objects):,} objects with {args.threads} threads...")
-    print()
-    
-    # Initialize statistics
-    stats = MoveStats()
-    stats.start()
-    
-    # Prepare arguments for each worker
-    worker_args = [
-        (s3_client, args.source_bucket, dest_bucket, obj, prefix_old, prefix_new,
-         args.contains_pattern, args.ignore_pattern, args.replace_pattern, 
-         args.with_pattern, args.dry_run)
-        for obj in objects
-    ]
-    
-    # Process objects in parallel
-    with ThreadPoolExecutor(max_workers=args.threads) as executor:
-        futures = [
-            executor.submit(process_object, arg, stats, args.progress_interval)
-            for arg in worker_args
-        ]
+    elif args.stream or args.engine == 'async':
+        # Move while listing; nothing is materialised beyond the bounded queue
+        if args.engine == 'async':
+            print(f"Streaming objects to the async engine ({args.max_inflight} requests in flight)...")
+        else:
+            print(f"Streaming objects to {workers} threads (queue size {args.queue_size:,})...")
+        if args.skip > 0:
+            print(f"Skipping first {args.skip:,} objects (resume mode)")
+        print()
+        stats.start()
+        listing = open_listing(args, config)
+        try:
+            if args.engine == 'async':
+                consumed = run_async(
+                    listing, config, stats, args.progress_interval, args.queue_size, args.skip,
+                    args.max_inflight, args.profile, args.region
+                )
+            else:
+                consumed = run_streaming(
+                    listing, config, stats, workers, args.progress_interval, args.queue_size, args.skip
+                )
+        finally:
+            finish_stages(config)
+        if consumed == 0:
+            if config.journal is not None and config.journal.skipped:
+                print(f"All {config.journal.skipped:,} listed objects are already recorded in the journal. Nothing to do.")
+            else:
+                print("No objects found to process")
+            return
+        if args.skip >= consumed:
+            print(f"Skip value ({args.skip}) is >= total objects ({consumed}). Nothing to do.")
+            return
+    else:
+        # List all objects from source bucket
+        if args.apply_plan:
+            start, end = args.plan_range
+            objects = list(iter_plan_objects(s3_client, args.apply_plan, start, end))
+        elif args.inventory_manifest:
+            objects = list(iter_inventory_objects(
+                s3_client, args.inventory_manifest, args.source_bucket, prefix_old,
+                args.contains_pattern, args.ignore_pattern
+            ))
+        else:
+            objects = list_objects(s3_client, args.source_bucket, prefix_old, args.list_depth, args.threads)
         
-        # Wait for all tasks to complete
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                print(f"[ERROR] Unexpected error: {e}", file=sys.stderr)
-                stats.increment_errors()
+        if not objects:
+            print("No objects found to process")
+            return
+        
+        # Drop keys a previous run already finished
+        if config.journal is not None:
+            objects = list(config.journal.skip_completed(objects))
+            print(f"Skipping {config.journal.skipped:,} objects already recorded in the journal")
+            if not objects:
+                print("Nothing left to do.")
+                return
+        
+        # Apply skip if specified (for resume capability)
+        if args.skip > 0:
+            if args.skip >= len(objects):
+                print(f"Skip value ({args.skip}) is >= total objects ({len(objects)}). Nothing to do.")
+                return
+            print(f"Skipping first {args.skip:,} objects (resume mode)")
+            objects = objects[args.skip:]
+        
+        print()
+        print(f"Processing {len(objects):,} objects with {workers} threads...")
+        print()
+        
+        stats.start()
+        try:
+            run_batch(objects, config, stats, workers, args.progress_interval)
+        finally:
+            finish_stages(config)
     
     # Print summary
     total, moved, skipped, errors = stats.get_stats()
@@ -453,7 +2855,29 @@ Examples:
     print(f"Objects moved:          {moved:,}")
     print(f"Objects skipped:        {skipped:,}")
     print(f"Errors:                 {errors:,}")
+    if config.deleter is not None:
+        deleted, delete_errors = stats.get_delete_stats()
+        print(f"Sources deleted:        {deleted:,}")
+        print(f"Delete errors:          {delete_errors:,} (copied, source kept)")
+    if args.verify and not args.dry_run:
+        verified, verify_failed = stats.get_verify_stats()
+        print(f"Verified copies:        {verified:,}")
+        print(f"Verify failures:        {verify_failed:,} (source kept)")
+    if config.verifier is not None:
+        print(f"Verify throughput:      {format_verify_report(config.verifier)}")
+    if config.sync is not None:
+        print(f"Already in sync:        {stats.get_in_sync():,} (counted as skipped)")
+    if config.journal is not None:
+        print(f"Already moved (journal): {config.journal.skipped:,}")
     print(f"Average rate:           {rate:.1f} files/sec")
+    if config.pool is not None:
+        inflight, pool_size, peak, over, discarded = config.pool.get_report()
+        print(f"Connection pool:        {pool_size} (peak {peak} in flight, {over:,} requests over the pool, "
+              f"{discarded:,} connections discarded)")
+    if config.limiter is not None:
+        inflight, n_prefixes, mean_limit, throttles = config.limiter.get_concurrency()
+        print(f"Throttled responses:    {throttles:,}")
+        print(f"Final avg prefix limit: {mean_limit:.1f} over {n_prefixes:,} prefixes")
     print("=" * 60)
     
     if args.dry_run:
@@ -472,8 +2896,7 @@ Examples:
             
             # If pattern replacement is active, show samples with the pattern
             if args.replace_pattern:
-                pattern_affected = len(stats.pattern_sample_moves)
-                total_samples = len(stats.sample_moves)
+                total_samples, pattern_affected = stats.get_sample_counts()
                 print(f"\nPattern '{args.replace_pattern}' found in {pattern_affected:,} of {total_samples:,} files")
                 
                 if pattern_affected == 0:
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark harness for s3mv.
+
+Seeds a synthetic NRDS-shaped key tree (dates x run types x inits x members
+x VPUs) into a local S3 stand-in (a moto server started here, or any
+S3-compatible endpoint such as MinIO), then times the s3mv listing and move
+engines against it with optional injected latency and SlowDown errors.
+
+Every configuration runs in its own subprocess so peak RSS is measured per
+configuration. Reported per run: objects/sec, p50/p99 per-object latency
+(from the engine's filter check to its recorded outcome), errors, injected
+SlowDowns and peak RSS.
+
+Usage:
+    python s3mv_bench.py --objects 20000 --engines thread,async --threads 10,50,100
+    python s3mv_bench.py --endpoint_url http://localhost:9000 --latency_ms 20 --slowdown_rate 0.01
+    python s3mv_bench.py --rules rules.json --objects 1000000
+    python s3mv_bench.py --regressions
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+try:
+    from research_datastream import s3mv
+except ImportError:
+    import s3mv
+
+# Only these requests get SlowDown errors; listings only get latency
+FAULT_OPERATIONS = {'CopyObject', 'DeleteObject', 'DeleteObjects', 'UploadPartCopy'}
+
+
+class FaultInjector:
+    """
+    botocore before-send handlers that delay every request and fail a
+    fraction of write requests with SlowDown, before they leave the client.
+    The error is raised straight to s3mv, which handles it with its own
+    retry logic.
+    """
+    def __init__(self, latency_ms: float = 0.0, slowdown_rate: float = 0.0, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.slowdown_rate = slowdown_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.injected = 0
+
+    def _fault(self, event_name: str) -> Optional[ClientError]:
+        operation = event_name.rsplit('.', 1)[-1]
+        if operation not in FAULT_OPERATIONS or not self.slowdown_rate:
+            return None
+        with self.lock:
+            if self.random.random() >= self.slowdown_rate:
+                return None
+            self.injected += 1
+        return ClientError(
+            {'Error': {'Code': 'SlowDown', 'Message': 'Please reduce your request rate. (injected)'},
+             'ResponseMetadata': {'HTTPStatusCode': 503}},
+            operation
+        )
+
+    def before_send(self, event_name: str, **kwargs) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        error = self._fault(event_name)
+        if error is not None:
+            raise error
+
+    async def before_send_async(self, event_name: str, **kwargs) -> None:
+        import asyncio
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        error = self._fault(event_name)
+        if error is not None:
+            raise error
+
+
+class ObjectTimer:
+    """
+    Per-object latency for any engine, measured from should_process_object
+    (the first thing an engine does with an object) to record_outcome.
+    """
+    def __init__(self):
+        self.started = {}
+        self.latencies: List[float] = []
+
+    def install(self) -> None:
+        should_process_object = s3mv.should_process_object
+        record_outcome = s3mv.record_outcome
+
+        def timed_should_process_object(key, *args, **kwargs):
+            self.started[key] = time.perf_counter()
+            return should_process_object(key, *args, **kwargs)
+
+        def timed_record_outcome(config, stats, progress_interval, object_key=None, *args, **kwargs):
+            start = self.started.pop(object_key, None) if object_key is not None else None
+            if start is not None:
+                self.latencies.append(time.perf_counter() - start)
+            return record_outcome(config, stats, progress_interval, object_key, *args, **kwargs)
+
+        s3mv.should_process_object = timed_should_process_object
+        s3mv.record_outcome = timed_record_outcome
+
+    def percentiles(self) -> tuple:
+        """(p50, p99) in milliseconds"""
+        if not self.latencies:
+            return 0.0, 0.0
+        latencies = sorted(self.latencies)
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        return p50 * 1000, p99 * 1000
+
+
+def peak_rss_mib() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_config(spec: dict) -> dict:
+    """Run one benchmark configuration in this process and measure it"""
+    injector = FaultInjector(spec['latency_ms'], spec['slowdown_rate'], spec.get('seed', 0))
+    result = {'kind': spec['kind'], 'engine': spec.get('engine', '-'), 'threads': spec['threads']}
+
+    if spec['kind'] == 'list':
+        s3_client = s3mv.make_s3_client(pool_size=max(spec['threads'], 10))
+        s3_client.meta.events.register('before-send.s3', injector.before_send)
+        start = time.perf_counter()
+        listed = sum(1 for _ in s3mv.select_listing(
+            s3_client, spec['bucket'], spec['source'], spec['list_depth'], spec['threads']
+        ))
+        elapsed = time.perf_counter() - start
+        result.update(engine=f"list depth {spec['list_depth']}", objects=listed, seconds=elapsed,
+                      p50_ms=0.0, p99_ms=0.0, errors=0)
+    else:
+        timer = ObjectTimer()
+        timer.install()
+        engine = spec['engine']
+        argv = ['--source_bucket', spec['bucket'], '--prefix_old', spec['source'], '--prefix_new', spec['dest'],
+                '--threads', str(spec['threads']), '--progress_interval', str(10 ** 9)]
+        if engine == 'adaptive':
+            argv += ['--adaptive', '--max_threads', str(spec['threads'] * 4)]
+        args = s3mv.build_parser().parse_args(argv + spec.get('extra_args', []))
+        s3_client = s3mv.make_s3_client(pool_size=s3mv.client_pool_size(args))
+        s3_client.meta.events.register('before-send.s3', injector.before_send)
+        stats = s3mv.MoveStats()
+        rules = s3mv.RuleSet.from_file(args.rules) if args.rules else None
+        config, workers = s3mv.build_config(
+            args, s3_client, stats, spec['bucket'], spec['source'], spec['dest'], rules
+        )
+        listing = s3mv.open_listing(args, config)
+
+        stats.start()
+        start = time.perf_counter()
+        try:
+            if engine == 'async':
+                s3mv.run_async(
+                    listing, config, stats, args.progress_interval, args.queue_size,
+                    max_inflight=spec['threads'], events=[('before-send.s3', injector.before_send_async)]
+                )
+            else:
+                s3mv.run_streaming(listing, config, stats, workers, args.progress_interval, args.queue_size)
+        finally:
+            s3mv.finish_stages(config)
+        elapsed = time.perf_counter() - start
+
+        total, moved, skipped, errors = stats.get_stats()
+        p50, p99 = timer.percentiles()
+        result.update(objects=moved, seconds=elapsed, p50_ms=p50, p99_ms=p99, errors=errors)
+
+    result['rate'] = result['objects'] / result['seconds'] if result['seconds'] else 0.0
+    result['injected_slowdowns'] = injector.injected
+    result['peak_rss_mib'] = peak_rss_mib()
+    return result
+
+
+def run_in_subprocess(spec: dict, env: dict, verbose: bool) -> dict:
+    """Run a configuration in a fresh interpreter and read back its result"""
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec)],
+        env=env, stdout=subprocess.PIPE, stderr=None if verbose else subprocess.DEVNULL, text=True
+    )
+    if proc.returncode != 0 or not proc.stdout.strip():
+        raise RuntimeError(f"benchmark run failed ({proc.returncode}): {spec}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def synthetic_nrds_keys(prefix: str, n: int) -> Iterator[str]:
+    """
+    Yield n keys shaped like an NRDS output tree, for benchmarks:
+    <prefix>/ngen.YYYYMMDD/<run_type>/<init>/[member/]VPU_xx/<file>
+    """
+    run_types = [('short_range', 24, 1), ('medium_range', 4, 7), ('analysis_assim_extend', 1, 1),
+                 ('SHORT_RANGE', 24, 1)]
+    files = ['ngen-run.tar.gz', 'metadata.csv/realization.csv', 'datastream-metadata/profile.txt',
+             'datastream-metadata/conf_datastream.json', 'merkdir.file']
+    vpus = ['01', '02', '03N', '03S', '03W', '04', '05', '06', '07', '08', '09',
+            '10L', '10U', '11', '12', '13', '14', '15', '16', '17', '18']
+    count = 0
+    day = 0
+    while True:
+        date = f"ngen.2025{(day // 28) % 12 + 1:02d}{day % 28 + 1:02d}"
+        for run_type, n_inits, n_members in run_types:
+            for init in range(n_inits):
+                for member in range(n_members):
+                    member_dir = f"{member + 1}/" if n_members > 1 else ""
+                    for vpu in vpus:
+                        for name in files:
+                            if count == n:
+                                return
+                            yield f"{prefix}/{date}/{run_type}/{init:02d}/{member_dir}VPU_{vpu}/{name}"
+                            count += 1
+        day += 1
+
+
+def benchmark_rules(rules: s3mv.RuleSet, prefix: str, n: int) -> None:
+    """Time the rules against n synthetic NRDS keys and print the per-key cost"""
+    keys = list(synthetic_nrds_keys(prefix, n))
+    accepted = 0
+    rewritten = 0
+    start = time.perf_counter()
+    for key in keys:
+        relative_path = key[len(prefix):].lstrip('/')
+        if rules.accepts(relative_path):
+            accepted += 1
+            if rules.rewrite(relative_path) != relative_path:
+                rewritten += 1
+    elapsed = time.perf_counter() - start
+    print(f"Rules benchmark: {rules.n_filters} filters, {rules.n_rewrites} rewrites over {len(keys):,} synthetic keys")
+    print(f"  {accepted:,} accepted, {rewritten:,} rewritten")
+    print(f"  {elapsed:.2f}s total, {len(keys) / elapsed:,.0f} keys/sec, {elapsed / len(keys) * 1e6:.2f} µs/key")
+
+
+def seed_objects(s3_client, bucket: str, prefix: str, n: int, size: int, threads: int = 32) -> int:
+    """Upload n synthetic NRDS keys under prefix"""
+    body = b'x' * size
+    keys = list(synthetic_nrds_keys(prefix, n))
+
+    def put(key: str) -> None:
+        s3_client.put_object(Bucket=bucket, Key=key, Body=body)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(put, keys))
+    return len(keys)
+
+
+def delete_prefix(s3_client, bucket: str, prefix: str) -> None:
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        objects = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+        if objects:
+            s3_client.delete_objects(Bucket=bucket, Delete={'Objects': objects, 'Quiet': True})
+
+
+def check_self_move(s3_client, bucket: str, env: dict) -> List[str]:
+    """
+    Regression: with --prefix_new equal to --prefix_old, keys the move leaves
+    unchanged map onto themselves and must survive --sync --delete_synced.
+    Returns the failures, one per engine.
+    """
+    prefix = 'bench/self'
+    keep = f"{prefix}/ngen.20250101/a/keep.txt"
+    moved = f"{prefix}/ngen.20250101/a/metadata.csv/x.csv"
+    expected = {keep, moved.replace('metadata.csv/', '')}
+    failures = []
+    for engine in ('thread', 'async'):
+        delete_prefix(s3_client, bucket, f"{prefix}/")
+        s3_client.put_object(Bucket=bucket, Key=keep, Body=b'keep')
+        s3_client.put_object(Bucket=bucket, Key=moved, Body=b'move')
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(s3mv.__file__), '--source_bucket', bucket,
+             '--prefix_old', prefix, '--prefix_new', prefix, '--delete_pattern', 'metadata.csv/',
+             '--sync', '--delete_synced', '--engine', engine],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        page = s3_client.list_objects_v2(Bucket=bucket, Prefix=f"{prefix}/")
+        keys = {obj['Key'] for obj in page.get('Contents', [])}
+        if proc.returncode != 0 or keys != expected:
+            failures.append(f"self-move with --sync --delete_synced ({engine}): exit {proc.returncode}, "
+                            f"left {sorted(keys)}")
+    delete_prefix(s3_client, bucket, f"{prefix}/")
+    return failures
+
+
+def start_moto_server():
+    """Start an in-process moto S3 server on a free port; returns (server, endpoint_url)"""
+    import socket
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        print("Error: without --endpoint_url the benchmark needs moto (pip install 'moto[server]')", file=sys.stderr)
+        sys.exit(1)
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def print_results(results: List[dict]) -> None:
+    print()
+    print(f"{'run':<18} {'threads':>7} {'objects':>9} {'secs':>8} {'obj/s':>9} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'errors':>7} {'slowdown':>9} {'rss MiB':>8}")
+    print("-" * 100)
+    for r in results:
+        print(f"{r['engine']:<18} {r['threads']:>7} {r['objects']:>9,} {r['seconds']:>8.2f} {r['rate']:>9,.0f} "
+              f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>7,} {r['injected_slowdowns']:>9,} "
+              f"{r['peak_rss_mib']:>8.1f}")
+
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark s3mv listing and move engines against a local S3 stand-in',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--endpoint_url', default=None,
+                        help='S3-compatible endpoint to use (e.g. MinIO); default: start a moto server')
+    parser.add_argument('--bucket', default='s3mv-bench',
+                        help='Bucket to seed and move within (created if missing, default: s3mv-bench)')
+    parser.add_argument('--objects', type=int, default=10000,
+                        help='Number of synthetic NRDS keys to seed (default: 10000)')
+    parser.add_argument('--object_size', type=int, default=1024,
+                        help='Object size in bytes (default: 1024)')
+    parser.add_argument('--engines', default='thread,async',
+                        help='Comma-separated engines to run: thread, adaptive, async (default: thread,async)')
+    parser.add_argument('--threads', type=int_list, default=[10, 50],
+                        help='Comma-separated thread counts (max in-flight requests for async, default: 10,50)')
+    parser.add_argument('--list_depths', type=int_list, default=[0, 3],
+                        help='Comma-separated --list_depth values to benchmark the listing with (default: 0,3)')
+    parser.add_argument('--latency_ms', type=float, default=0.0,
+                        help='Latency added to every request (default: 0)')
+    parser.add_argument('--slowdown_rate', type=float, default=0.0,
+                        help='Fraction of copy/delete requests failed with SlowDown (default: 0)')
+    parser.add_argument('--json_out', default=None,
+                        help='Also write the results to this JSON file')
+    parser.add_argument('--keep', action='store_true',
+                        help='Leave the benchmark objects in the bucket')
+    parser.add_argument('--rules', default=None,
+                        help='Only time this s3mv --rules file against --objects synthetic keys (no S3 needed)')
+    parser.add_argument('--regressions', action='store_true',
+                        help='Run the data-safety regression cases against the stand-in instead of benchmarking '
+                             '(exit status 1 on failure)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Show the output of the benchmark runs')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Keep stdout for the result line
+        spec = json.loads(args.child)
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_config(spec)
+        print(json.dumps(result))
+        return
+
+    if args.rules:
+        try:
+            rules = s3mv.RuleSet.from_file(args.rules)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot load rules file {args.rules}: {e}")
+            sys.exit(1)
+        benchmark_rules(rules, 'bench/a', args.objects)
+        return
+
+    engines = [e for e in args.engines.split(',') if e]
+    unknown = set(engines) - {'thread', 'adaptive', 'async'}
+    if unknown:
+        print(f"Error: unknown engines {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    server = None
+    env = dict(os.environ)
+    if args.endpoint_url is None:
+        server, args.endpoint_url = start_moto_server()
+        env.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+        env.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+    env['AWS_ENDPOINT_URL'] = args.endpoint_url
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    s3_client = boto3.client(
+        's3', endpoint_url=args.endpoint_url, region_name=env['AWS_DEFAULT_REGION'],
+        aws_access_key_id=env.get('AWS_ACCESS_KEY_ID'), aws_secret_access_key=env.get('AWS_SECRET_ACCESS_KEY')
+    )
+    try:
+        try:
+            s3_client.create_bucket(Bucket=args.bucket)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('BucketAlreadyOwnedByYou', 'BucketAlreadyExists'):
+                raise
+
+        if args.regressions:
+            failures = check_self_move(s3_client, args.bucket, env)
+            for failure in failures:
+                print(f"FAILED: {failure}")
+            print(f"Regressions: {'failed' if failures else 'passed'}")
+            if failures:
+                sys.exit(1)
+            return
+
+        print(f"Seeding {args.objects:,} objects of {args.object_size:,} bytes into s3://{args.bucket}/bench/a "
+              f"at {args.endpoint_url}...")
+        start = time.perf_counter()
+        seed_objects(s3_client, args.bucket, 'bench/a', args.objects, args.object_size)
+        print(f"  seeded in {time.perf_counter() - start:.1f}s")
+        print(f"Injected latency {args.latency_ms:g} ms, SlowDown rate {args.slowdown_rate:g}")
+
+        common = {'bucket': args.bucket, 'latency_ms': args.latency_ms, 'slowdown_rate': args.slowdown_rate}
+        results = []
+        for depth in args.list_depths:
+            spec = dict(common, kind='list', source='bench/a', list_depth=depth, threads=max(args.threads))
+            results.append(run_in_subprocess(spec, env, args.verbose))
+            print(f"  listing depth {depth}: {results[-1]['rate']:,.0f} objects/sec")
+
+        # Objects move back and forth between two prefixes, so nothing is re-seeded
+        source, dest = 'bench/a', 'bench/b'
+        for engine in engines:
+            for threads in args.threads:
+                spec = dict(common, kind='move', engine=engine, threads=threads, source=source, dest=dest)
+                results.append(run_in_subprocess(spec, env, args.verbose))
+                print(f"  {engine} x {threads}: {results[-1]['rate']:,.0f} objects/sec")
+                source, dest = dest, source
+
+        print_results(results)
+        if args.json_out:
+            with open(args.json_out, 'w') as f:
+                json.dump({'objects': args.objects, 'latency_ms': args.latency_ms,
+                           'slowdown_rate': args.slowdown_rate, 'results': results}, f, indent=2)
+    finally:
+        if not args.keep:
+            delete_prefix(s3_client, args.bucket, 'bench/')
+        if server is not None:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
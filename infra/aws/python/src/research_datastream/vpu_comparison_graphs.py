@@ -17,10 +17,19 @@ Written by Quinn Lee, qylee@ua.edu
 
 from s3fs import S3FileSystem
 import matplotlib.pyplot as plt
-from datetime import datetime
 import numpy as np
 import argparse
 
+try:
+    from research_datastream.content_cache import ContentCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+except ImportError:
+    from content_cache import ContentCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_MB
+
+try:
+    from research_datastream.profile_parser import load_profiles
+except ImportError:
+    from profile_parser import load_profiles
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-d", "--date", type=str, required=True, help="Date in YYYYMMDD format")
@@ -28,6 +37,9 @@ def main():
                         choices=['analysis_assim_extend', 'medium_range', 'short_range'], 
                         help="Run type")
     parser.add_argument("-t", "--time", type=str, required=True, help="Time (e.g., 00, 06, 12, 18)")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR, help="Directory for the local profile cache")
+    parser.add_argument("--cache_max_mb", type=float, default=DEFAULT_MAX_MB,
+                        help="Size bound of the profile cache in MiB")
     args = parser.parse_args()
     date = args.date
     runtype = args.runtype 
@@ -56,6 +68,7 @@ def main():
     'VPU_18': 41955}
 
     s3 = S3FileSystem(anon=True)
+    cache = ContentCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
     url = f"s3://ciroh-community-ngen-datastream/v2.2/ngen.{date}/{runtype}/{time}/"
     try:
         vpu_urls = sorted(s3.ls(url))
@@ -65,44 +78,22 @@ def main():
     vpus = [vpu_url.split("/")[-1] for vpu_url in vpu_urls]
 
     # collect data for graphs
-    durations = {}
-    durations_normed = {}
+    profiles = {}
     for url in vpu_urls:
         vpu = url.split("/")[-1]
-        with s3.open(f"{url}/datastream-metadata/profile.txt", "r") as raw_profile:
-            lines = raw_profile.readlines()
-            profile = {}
-            for line in lines:
-                cleaned_line = line.strip().split(": ")
-                profile[cleaned_line[0]] = datetime.strptime(cleaned_line[1], "%Y%m%d%H%M%S")
-        steps = []
-        for key in list(profile.keys()):
-            if key == "DATASTREAM_START" or key == "DATASTREAM_END":
-                continue
-            if "_START" in key:
-                step = key.replace("_START", "")
-                steps.append(step)
-            else:
-                step = key.replace("_END", "")
-                if step not in steps:
-                    steps.append(step)
-        
-        # unnormed data
-        for step in steps:
-            start_key = f"{step}_START"
-            end_key = f"{step}_END"
-
-            duration = (profile[end_key] - profile[start_key]).total_seconds()
-            if durations.get(step) is None:
-                durations[step] = np.array([])
-            durations[step] = np.append(durations[step], duration)
-
-        # normed data
-        for step in steps:
-            if durations_normed.get(step) is None:
-                durations_normed[step] = np.array([])
-            durations_normed[step] = np.append(durations_normed[step],
-                                               durations[step][-1] / vpu_num_cats[vpu])
+        profile_path = f"{url}/datastream-metadata/profile.txt"
+        bucket, key = profile_path.split("/", 1)
+        etag = s3.info(profile_path)["ETag"]
+        profiles[vpu] = cache.get(bucket, key, etag, lambda: s3.cat_file(profile_path)).decode("utf-8")
+
+    # one row per VPU, one duration column (s) per step; a step a VPU did not run counts as 0
+    table = load_profiles(profiles).drop(columns=["DATASTREAM", "start"], errors="ignore").fillna(0)
+    num_cats = np.array([vpu_num_cats[vpu] for vpu in vpus])
+    durations = {step: table[step].to_numpy() for step in table.columns}
+    durations_normed = {step: length / num_cats for step, length in durations.items()}
+
+    cache.save()
+    print(cache.report())
 
     # unnormed graph
     fig, ax = plt.subplots()
@@ -15,6 +15,15 @@ REGION_NAME_MAP = {
     "eu-central-1": "EU (Frankfurt)",
 }
 
+# On-demand prices are memoized in PRICE_CACHE for the life of the execution
+# environment, i.e. across warm invocations only; a cold start refetches. Keys
+# follow datastream_cost_nrds InstanceCache.key ("<type>|<region>[|<os>]", no os
+# suffix for Linux). The lambda is deployed as a single file, so it cannot
+# import InstanceCache and keeps only the cost_per_hour and fetched fields.
+PRICE_CACHE_TTL_S = float(os.environ.get('PRICE_CACHE_TTL_S', 86400))
+PRICE_CACHE = {}
+client_pricing = None
+
 def get_ondemand_price(instance_type: str, region: str, os: str = "Linux") -> float:
     """
     Query AWS Pricing API to get the On-Demand hourly price for an EC2 instance.
@@ -27,7 +36,15 @@ def get_ondemand_price(instance_type: str, region: str, os: str = "Linux") -> fl
     Returns:
         float: On-Demand hourly price in USD.
     """
-    client = boto3.client("pricing", region_name="us-east-1")  # Pricing is only available in us-east-1
+    global client_pricing
+    cache_key = f"{instance_type}|{region}" if os == "Linux" else f"{instance_type}|{region}|{os}"
+    entry = PRICE_CACHE.get(cache_key)
+    if entry and entry.get("cost_per_hour") and time.time() - entry.get("fetched", 0) < PRICE_CACHE_TTL_S:
+        return float(entry["cost_per_hour"])
+
+    if client_pricing is None:
+        client_pricing = boto3.client("pricing", region_name="us-east-1")  # Pricing is only available in us-east-1
+    client = client_pricing
 
     location = REGION_NAME_MAP.get(region)
     if not location:
@@ -54,6 +71,8 @@ def get_ondemand_price(instance_type: str, region: str, os: str = "Linux") -> fl
     price_dimensions = next(iter(next(iter(terms.values()))["priceDimensions"].values()))
     price_per_hour = float(price_dimensions["pricePerUnit"]["USD"])
 
+    PRICE_CACHE[cache_key] = {"cost_per_hour": price_per_hour, "fetched": time.time()}
+
     return price_per_hour
 
 def wait_for_instance_running(instance_id, timeout=300):